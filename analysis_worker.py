@@ -0,0 +1,148 @@
+import datetime
+import queue
+import sys
+import threading
+import time
+import traceback
+from array import array
+from typing import Callable, Optional
+
+from daegu_bank.aggregation_engine import PeriodAggregate
+from daegu_bank.monthly_statistics import MonthlyStatistics
+from monthly_statistics_folder import MonthlyStatisticsFolder
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+class AnalysisSnapshot:
+    # Everything the viewer draws, copied out of an analyzer so that later jobs can change the analyzer while the
+    # snapshot is on screen: its own aggregates, class codes, balance forecasts and timeline pyramid, and views over
+    # table rows that jobs only ever append after. Months are built from those copies on first access through a
+    # MonthlyStatisticsFolder, which also builds the months next to the one shown in the background.
+
+    def __init__(self, version: int, pfa: PersonalFinancialAnalyzer, max_cached_months: Optional[int] = None,
+                 prefetch: bool = True, today: Optional[datetime.date] = None):
+        self.version = version
+        self.dates = list(pfa.analysis_target_dates)
+        self.spans = dict(pfa.analysis_target_dates)
+        self.class_names = list(pfa.class_names)
+        self.aggregates = {date: PeriodAggregate.from_dict(pfa.aggregation_engine.aggregates[date].to_dict()) for
+                           date in self.dates}
+        self.period_tables = {date: pfa.period_table(date) for date in self.dates}
+        self.period_class_codes = {date: array('H', pfa.period_class_codes(date)) for date in self.dates}
+        self.monthly_statistics = MonthlyStatisticsFolder(self.dates, self.build_monthly_statistics,
+                                                          max_entries=max_cached_months, prefetch=prefetch)
+        # Forecasts of the periods still running on forecast_day, simulated here on the worker rather than by the
+        # viewer; they start from that day, so a snapshot kept past midnight is published again for the new one
+        today = self.forecast_day = today if today is not None else datetime.date.today()
+        self.forecasts = {date: pfa.forecast_balance(date, today=today) for [date, [start_date, end_date]] in
+                          self.spans.items() if end_date >= max(start_date + datetime.timedelta(days=1), today)}
+        self.timeline_pyramid = pfa.timeline_pyramid.copy()
+        self.total_seconds = pfa.total_seconds
+        self.row_count = len(pfa.transaction_table)
+        self.policy_file = pfa.policy_file
+
+    def build_monthly_statistics(self, date: str) -> MonthlyStatistics:
+        return MonthlyStatistics(self.period_tables[date], date=date, span=self.spans[date],
+                                 aggregate=self.aggregates[date], class_codes=self.period_class_codes[date],
+                                 class_names=self.class_names)
+
+
+class AnalysisWorker:
+    # Runs jobs against one analyzer on a background thread, one at a time in submission order, and publishes an
+    # AnalysisSnapshot after every job that changed something. The viewer polls latest() between frames, so it
+    # only ever sees whole results and never waits on a job.
+
+    def __init__(self, pfa: Optional[PersonalFinancialAnalyzer] = None):
+        # An analyzer given here is published right away, on the calling thread
+        self.pfa = pfa
+        self.version = 0
+        self.jobs = queue.Queue()
+        self.snapshots = queue.Queue()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.job_name = None
+        self.job_started = None
+        self.error = None
+        # The day the forecasts of the last snapshot start from
+        self.forecast_day = None
+        if pfa is not None:
+            self.publish()
+        self.thread = threading.Thread(target=self.run, name='analysis', daemon=True)
+        self.thread.start()
+
+    def submit(self, name: str, job: Callable[[], bool]):
+        # job returns whether it changed the analyzer
+        with self.lock:
+            self.pending += 1
+        self.jobs.put((name, job))
+
+    def analyze(self, build: Callable[[], PersonalFinancialAnalyzer]):
+        def job() -> bool:
+            self.pfa = build()
+            return True
+        self.submit('analyze', job)
+
+    def refresh(self):
+        self.submit('refresh', lambda: self.pfa is not None and self.pfa.refresh() > 0)
+
+    def reload_policies(self):
+        self.submit('reload_policies', lambda: self.pfa is not None and self.pfa.reload_policies() > 0)
+
+    def refresh_forecasts(self, today: Optional[datetime.date] = None):
+        # Publishes the analyzer again with forecasts from today on, unless the last snapshot already has them
+        today = today if today is not None else datetime.date.today()
+
+        def job() -> bool:
+            if self.pfa is not None and self.forecast_day != today:
+                self.publish(today)
+            # Published above, with the day given
+            return False
+        self.submit('refresh_forecasts', job)
+
+    def stop(self):
+        self.jobs.put(None)
+
+    @property
+    def busy(self) -> bool:
+        return self.pending > 0
+
+    def progress_text(self) -> Optional[str]:
+        with self.lock:
+            if self.pending == 0 or self.job_name is None:
+                return None
+            return f'{self.job_name} {time.perf_counter() - self.job_started:.1f}s ({self.pending} pending)'
+
+    def latest(self) -> Optional[AnalysisSnapshot]:
+        # The newest snapshot published since the last call, or None
+        snapshot = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                return snapshot
+
+    def publish(self, today: Optional[datetime.date] = None):
+        self.version += 1
+        snapshot = AnalysisSnapshot(self.version, self.pfa, today=today)
+        self.forecast_day = snapshot.forecast_day
+        self.snapshots.put(snapshot)
+
+    def run(self):
+        while True:
+            item = self.jobs.get()
+            if item is None:
+                return
+            [name, job] = item
+            with self.lock:
+                [self.job_name, self.job_started] = [name, time.perf_counter()]
+            try:
+                if job():
+                    self.publish()
+                self.error = None
+            except Exception as error:
+                self.error = f'{name}: {error}'
+                print(traceback.format_exc(), file=sys.stderr)
+            finally:
+                with self.lock:
+                    self.pending -= 1
+                    self.job_name = None
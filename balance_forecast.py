@@ -0,0 +1,138 @@
+import datetime
+import random
+from typing import Dict, List, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from business_calendar import business_calendar
+from rolling_window import RollingWindows
+
+percentiles = (5, 25, 50, 75, 95)
+
+
+class BalanceForecast:
+    # Where a period's balance may end up: the end balance at each of percentiles over simulation_count runs of its
+    # left days, and the share of runs that end below threshold. payday_count of the left days are paydays.
+
+    def __init__(self, date: str, start_balance: int, left_day_count: int, threshold: int, bands: Dict[int, int],
+                 below_probability: float, simulation_count: int, history_day_count: int, payday_count: int = 0):
+        self.date = date
+        self.start_balance = start_balance
+        self.left_day_count = left_day_count
+        self.threshold = threshold
+        self.bands = bands
+        self.below_probability = below_probability
+        self.simulation_count = simulation_count
+        self.history_day_count = history_day_count
+        self.payday_count = payday_count
+
+    def __repr__(self):
+        bands = ' '.join(f'p{percentile}={balance:,}원' for [percentile, balance] in self.bands.items())
+        return f'<BalanceForecast {self.date} {self.start_balance:,}원+{self.left_day_count}days' \
+               f'({self.payday_count} paydays) {bands} P(<{self.threshold:,}원)={self.below_probability:.1%}/>'
+
+
+class BalanceForecaster:
+    # Monte Carlo forecasts of end-of-period balances. Each run adds, on every left day and for every category
+    # independently, what that category earned less what it spent on a day drawn from the days already lived since
+    # the first period, so categories keep their own spread. Paydays, from the business calendar, draw from the
+    # paydays lived and other days from the other days, so pay lands when it is due rather than smeared over the
+    # month.
+    # With NumPy the runs are drawn and summed as one (runs, days) matrix per category. Without it each kind of day
+    # first gets day_sample_size per-day totals over all categories, and the runs draw from those, so the cost is
+    # one draw per run and day rather than one per category too.
+    # Forecasts are kept per period until invalidate(), which the analyzer calls when rows arrive.
+
+    day_sample_size = 4096
+
+    def __init__(self, rolling_windows: RollingWindows, analysis_target_dates: Dict[str, list], payday_of_month: int,
+                 simulation_count: int = 4000, seed: int = 0):
+        self.rolling_windows = rolling_windows
+        self.analysis_target_dates = analysis_target_dates
+        self.payday_of_month = payday_of_month
+        self.simulation_count = simulation_count
+        # Seeded, so that asking again after an invalidation without real changes gives the same bands
+        self.seed = seed
+        self.forecasts: Dict[Tuple[str, datetime.date, datetime.date, int], BalanceForecast] = {}
+
+    def invalidate(self):
+        self.forecasts.clear()
+
+    def history(self, first_left_day: datetime.date) -> Tuple[int, List[Sequence[int]], List[Sequence[int]]]:
+        # The number of days from the first period's start to first_left_day that the rows cover, and the daily net
+        # flows over them of each category that moved any money, on paydays and on the other days
+        rolling_windows = self.rolling_windows
+        if rolling_windows.first_ordinal is None:
+            return 0, [], []
+        first_date = min(span[0] for span in self.analysis_target_dates.values())
+        start = max(0, first_date.toordinal() - rolling_windows.first_ordinal)
+        stop = max(start, min(len(rolling_windows), first_left_day.toordinal() - rolling_windows.first_ordinal))
+        if start == stop:
+            return 0, [], []
+        paydays = {payday.toordinal() - rolling_windows.first_ordinal for payday in
+                   business_calendar.paydays(datetime.date.fromordinal(rolling_windows.first_ordinal + start),
+                                             datetime.date.fromordinal(rolling_windows.first_ordinal + stop - 1),
+                                             self.payday_of_month)}
+        [payday_days, other_days] = [[], []]
+        for day in range(start, stop):
+            (payday_days if day in paydays else other_days).append(day)
+        [payday_flows, other_flows] = [[], []]
+        for series in rolling_windows.categories.values():
+            [incomes, losses] = [series.incomes, series.losses]
+            if any(incomes[start:stop]) or any(losses[start:stop]):
+                payday_flows.append([incomes[day] - losses[day] for day in payday_days])
+                other_flows.append([incomes[day] - losses[day] for day in other_days])
+        return stop - start, payday_flows if payday_days else [], other_flows if other_days else []
+
+    def forecast(self, date: str, first_left_day: datetime.date, start_balance: int, threshold: int = 0,
+                 end_date: datetime.date = None) -> BalanceForecast:
+        # start_balance is the balance before first_left_day; the days from it through end_date, by default the
+        # period's last day, are simulated
+        end_date = self.analysis_target_dates[date][1] if end_date is None else end_date
+        key = (date, first_left_day, end_date, threshold)
+        forecast = self.forecasts.get(key)
+        if forecast is None or forecast.start_balance != start_balance:
+            forecast = self.forecasts[key] = self.simulate(date, first_left_day, end_date, start_balance, threshold)
+        return forecast
+
+    def simulate(self, date: str, first_left_day: datetime.date, end_date: datetime.date, start_balance: int,
+                 threshold: int) -> BalanceForecast:
+        left_day_count = max(0, (end_date - first_left_day).days + 1)
+        payday_count = len(business_calendar.paydays(first_left_day, end_date, self.payday_of_month)) if \
+            left_day_count > 0 else 0
+        [history_day_count, payday_history, other_history] = self.history(first_left_day)
+        # Paydays draw from the other days when none has been lived yet, and the other way round
+        draws = [(payday_history or other_history, payday_count), (other_history or payday_history,
+                                                                    left_day_count - payday_count)]
+        draws = [(history, day_count) for [history, day_count] in draws if history and day_count > 0]
+        if len(draws) == 0:
+            end_balances = [start_balance] * self.simulation_count
+        elif numpy is not None:
+            generator = numpy.random.default_rng(self.seed)
+            deltas = numpy.zeros(self.simulation_count, dtype=numpy.int64)
+            for [history, day_count] in draws:
+                for flows in history:
+                    days = numpy.array(flows, dtype=numpy.int64)
+                    deltas += days[generator.integers(0, len(days), (self.simulation_count, day_count))].sum(axis=1)
+            end_balances = numpy.sort(start_balance + deltas).tolist()
+        else:
+            generator = random.Random(self.seed)
+            deltas = [0] * self.simulation_count
+            for [history, day_count] in draws:
+                totals = [sum(day) for day in
+                          zip(*(generator.choices(flows, k=self.day_sample_size) for flows in history))]
+                drawn = generator.choices(totals, k=self.simulation_count * day_count)
+                for run in range(self.simulation_count):
+                    deltas[run] += sum(drawn[run * day_count:(run + 1) * day_count])
+            end_balances = sorted(start_balance + delta for delta in deltas)
+
+        # Nearest-rank percentiles, so that both paths report balances some run actually ended at
+        bands = {percentile: end_balances[min(len(end_balances) - 1, len(end_balances) * percentile // 100)] for
+                 percentile in percentiles}
+        below_count = sum(1 for balance in end_balances if balance < threshold)
+        return BalanceForecast(date, start_balance, left_day_count, threshold, bands,
+                               below_count / len(end_balances), self.simulation_count, history_day_count,
+                               payday_count)
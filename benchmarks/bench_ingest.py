@@ -0,0 +1,56 @@
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.mydata_reader import default_encoding, load_my_data_tables
+from daegu_bank.mydata_row import MyDataRow
+
+
+def load_legacy(filenames: list) -> list:
+    # PersonalFinancialAnalyzer.load_my_data as it was before the chunked reader, once per file: the whole file
+    # read and split at once, and every row parsed through strptime into a MyDataRow
+    my_data_rows = []
+    for filename in filenames:
+        buffer_my_data = open(filename, encoding=default_encoding()).read()
+
+        for row in buffer_my_data.split('\n')[1:]:
+            cells = row.split('|')
+            if cells[0] == '합계':
+                break
+            assert len(cells) == 9, f'{len(cells)} == 9'
+            my_data_rows.append(MyDataRow.from_row(cells))
+    return my_data_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times legacy MyDataRow parsing against parallel columnar parsing.')
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        filenames = [os.path.join(directory, f'mydata_{index}.txt') for index in range(args.files)]
+        for [index, filename] in enumerate(filenames):
+            write_ledger(filename, args.rows // args.files, seed=index)
+
+        start = time.perf_counter()
+        legacy_rows = load_legacy(filenames)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        [table, malformed_lines, read_positions] = load_my_data_tables(os.path.join(directory, 'mydata_*.txt'),
+                                                                       args.workers)
+        parallel_seconds = time.perf_counter() - start
+
+    assert len(table) == len(legacy_rows) and len(malformed_lines) == 0
+    print(f'rows={len(table):,} files={args.files}')
+    print(f'legacy   : {legacy_seconds:8.3f}s ({len(table) / legacy_seconds:12,.0f} rows/s)')
+    print(f'parallel : {parallel_seconds:8.3f}s ({len(table) / parallel_seconds:12,.0f} rows/s)')
+    print(f'speed-up : {legacy_seconds / parallel_seconds:8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
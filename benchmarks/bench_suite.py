@@ -0,0 +1,116 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks.synthetic_ledger import write_ledger
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+sizes = {'10k': 10000, '1M': 1000000, '10M': 10000000}
+stages = ('load', 'bucket', 'classify', 'aggregate', 'render')
+results_dir = os.path.join(os.path.dirname(__file__), 'results')
+data_dir = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def ledger(size: str, seed: int) -> str:
+    # Generated once per size and seed, then reused across runs
+    filename = os.path.join(data_dir, f'mydata_{size}_{seed}.txt')
+    if not os.path.exists(filename):
+        os.makedirs(data_dir, exist_ok=True)
+        write_ledger(filename + '.tmp', sizes[size], seed=seed)
+        os.replace(filename + '.tmp', filename)
+    return filename
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def render(pfa: PersonalFinancialAnalyzer) -> dict:
+    # Draws every month's layer and the timeline once on SDL's dummy driver; needs pygame and batang.ttc
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    try:
+        import main
+    except ImportError as error:
+        return {'skipped': str(error)}
+    if not os.path.exists('batang.ttc'):
+        return {'skipped': 'batang.ttc not found'}
+    viewer = main.Viewer(main.AnalysisWorker(pfa))
+    try:
+        start = time.perf_counter()
+        for index in range(len(pfa.analysis_target_dates)):
+            viewer.selected_date_index = index
+            viewer.surf.blit(viewer.month_layer(), [0, 0])
+        viewer.surf.blit(viewer.timeline(), main.Viewer.timeline_canvas[:2], area=main.Viewer.timeline_canvas)
+        return {'seconds': time.perf_counter() - start}
+    finally:
+        main.pygame.quit()
+
+
+def run(size: str, seed: int) -> dict:
+    filename = ledger(size, seed)
+    pfa = PersonalFinancialAnalyzer(None, prefetch=False)
+    result = {'rows': sizes[size]}
+    for stage in stages[:-1]:
+        result[stage] = timed(getattr(pfa, stage), filename) if stage == 'load' else timed(getattr(pfa, stage))
+    rendering = render(pfa)
+    result['render'] = rendering.get('seconds')
+    if 'skipped' in rendering:
+        result['render_skipped'] = rendering['skipped']
+    result['total'] = sum(result[stage] for stage in stages if result[stage] is not None)
+    return result
+
+
+def compare(results: dict, baseline: dict):
+    for [size, result] in results['sizes'].items():
+        previous = baseline['sizes'].get(size)
+        if previous is None:
+            continue
+        for stage in stages + ('total',):
+            if result.get(stage) is not None and previous.get(stage):
+                print(f'{size:>4} {stage:<10} {previous[stage]:9.3f}s -> {result[stage]:9.3f}s '
+                      f'({result[stage] / previous[stage]:5.2f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Times each analysis stage on synthetic ledgers of several sizes.')
+    parser.add_argument('--sizes', default=','.join(sizes), help=f'comma separated, out of {", ".join(sizes)}')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', help='a results file of an earlier run to compare against')
+    args = parser.parse_args()
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+
+    results = {
+        'started': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'sizes': {}
+    }
+    for size in args.sizes.split(','):
+        result = results['sizes'][size] = run(size, args.seed)
+        print(f'{size:>4}: ' + ' '.join(f'{stage}={result[stage]:.3f}s' for stage in stages + ('total',) if
+                                        result.get(stage) is not None) +
+              (f' (render skipped: {result["render_skipped"]})' if 'render_skipped' in result else ''))
+
+    os.makedirs(results_dir, exist_ok=True)
+    filename = os.path.join(results_dir, datetime.datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    with open(filename, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f'saved {filename}')
+
+    if baseline is not None:
+        compare(results, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import datetime
+import random
+
+import defs
+from daegu_bank.mydata_reader import default_encoding
+from defs import ClassificationPolicies
+
+# Keywords of the 구분 column as MyDataReader expects them, with a rough share of rows for each
+keyword_weights = {
+    '대체': 20, '인터넷': 10, 'BC': 25, 'C/D': 4, 'CD공동': 2, '예금이자': 1, '오픈뱅킹': 8, 'IM뱅크': 10, '펌뱅킹': 3,
+    '모바일': 10, '자동이체': 5, 'P/G결제': 2
+}
+header = '순번|거래일시|구분|출금|입금|잔액|내용|메모|거래점'
+footer = '합계|||||||'
+
+
+def policy_notes(model: type) -> list:
+    # Notes that the model's exact-match filters classify; regex-only policies get no examples
+    return [note for policy in model.get_policies() for note in policy._note_filter if len(note) > 0]
+
+
+def analysis_span() -> list:
+    # A month either side of the analysis dates in defs, so that some rows fall outside every period
+    start = datetime.datetime(int(defs.analysis_start_date[0:4]), int(defs.analysis_start_date[5:7]), 1)
+    stop = datetime.datetime(int(defs.analysis_end_date[0:4]), int(defs.analysis_end_date[5:7]), 28)
+    return [start - datetime.timedelta(days=31), stop + datetime.timedelta(days=62)]
+
+
+def write_ledger(filename: str, row_count: int, seed: int = 0, start: datetime.datetime = None,
+                 stop: datetime.datetime = None, unknown_ratio: float = 0.2, first_pk: int = 1, encoding: str = None):
+    # Writes a Daegu Bank export of row_count rows spread evenly over [start, stop), streaming so any size fits.
+    # Like a real export it is in the system encoding that MyDataReader reads by default, unless encoding is given.
+    rng = random.Random(seed)
+    [default_start, default_stop] = analysis_span()
+    start = default_start if start is None else start
+    stop = default_stop if stop is None else stop
+    step = (stop - start).total_seconds() / max(1, row_count)
+
+    keywords = list(keyword_weights)
+    weights = list(keyword_weights.values())
+    income_notes = policy_notes(ClassificationPolicies.Income)
+    loss_notes = policy_notes(ClassificationPolicies.Loss)
+    unknown_notes = [f'가맹점{index:04d}' for index in range(500)] + ['모름', '?출금', '?입금']
+
+    balance = 1000000
+    with open(filename, 'w', encoding=default_encoding() if encoding is None else encoding) as file:
+        file.write(header + '\n')
+        lines = []
+        for index in range(row_count):
+            timestamp = start + datetime.timedelta(seconds=int(index * step + rng.random() * step))
+            keyword = rng.choices(keywords, weights)[0]
+            if rng.random() < 0.3:
+                [loss, income] = [0, rng.randint(1, 3000000)]
+                note = rng.choice(income_notes)
+            else:
+                [loss, income] = [rng.randint(1, min(300000, max(1, balance))), 0]
+                note = rng.choice(loss_notes)
+            if rng.random() < unknown_ratio:
+                note = rng.choice(unknown_notes)
+            balance += income - loss
+            lines.append(f'{first_pk + index}|{timestamp:%Y-%m-%d [%H:%M:%S]}|{keyword}|{loss:,}|{income:,}|'
+                         f'{balance:,}|{note}|memo|branch\n')
+            if len(lines) >= 10000:
+                file.writelines(lines)
+                lines.clear()
+        file.writelines(lines)
+        file.write(footer + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Writes a synthetic Daegu Bank export.')
+    parser.add_argument('filename')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--unknown-ratio', type=float, default=0.2, help='share of rows with notes no policy knows')
+    args = parser.parse_args()
+    write_ledger(args.filename, args.rows, seed=args.seed, unknown_ratio=args.unknown_ratio)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+import calendar
+import datetime
+import functools
+from array import array
+from typing import Callable, Dict, List, Tuple
+
+# Month-day of 설날, 부처님오신날 and 추석 by year. These follow the Korean lunisolar calendar (new moons and solar
+# terms in KST) and were computed offline, so nothing is converted at run time.
+lunar_holidays = {
+    1990: ('01-27', '05-02', '10-03'), 1991: ('02-15', '05-21', '09-22'), 1992: ('02-04', '05-10', '09-11'),
+    1993: ('01-23', '05-28', '09-30'), 1994: ('02-10', '05-18', '09-20'), 1995: ('01-31', '05-07', '09-09'),
+    1996: ('02-19', '05-24', '09-27'), 1997: ('02-08', '05-14', '09-16'), 1998: ('01-28', '05-03', '10-05'),
+    1999: ('02-16', '05-22', '09-24'), 2000: ('02-05', '05-11', '09-12'), 2001: ('01-24', '05-01', '10-01'),
+    2002: ('02-12', '05-19', '09-21'), 2003: ('02-01', '05-08', '09-11'), 2004: ('01-22', '05-26', '09-28'),
+    2005: ('02-09', '05-15', '09-18'), 2006: ('01-29', '05-05', '10-06'), 2007: ('02-18', '05-24', '09-25'),
+    2008: ('02-07', '05-12', '09-14'), 2009: ('01-26', '05-02', '10-03'), 2010: ('02-14', '05-21', '09-22'),
+    2011: ('02-03', '05-10', '09-12'), 2012: ('01-23', '05-28', '09-30'), 2013: ('02-10', '05-17', '09-19'),
+    2014: ('01-31', '05-06', '09-08'), 2015: ('02-19', '05-25', '09-27'), 2016: ('02-08', '05-14', '09-15'),
+    2017: ('01-28', '05-03', '10-04'), 2018: ('02-16', '05-22', '09-24'), 2019: ('02-05', '05-12', '09-13'),
+    2020: ('01-25', '04-30', '10-01'), 2021: ('02-12', '05-19', '09-21'), 2022: ('02-01', '05-08', '09-10'),
+    2023: ('01-22', '05-27', '09-29'), 2024: ('02-10', '05-15', '09-17'), 2025: ('01-29', '05-05', '10-06'),
+    2026: ('02-17', '05-24', '09-25'), 2027: ('02-07', '05-13', '09-15'), 2028: ('01-27', '05-02', '10-03'),
+    2029: ('02-13', '05-20', '09-22'), 2030: ('02-03', '05-09', '09-12'), 2031: ('01-23', '05-28', '10-01'),
+    2032: ('02-11', '05-16', '09-19'), 2033: ('01-31', '05-06', '09-08'), 2034: ('02-19', '05-25', '09-27'),
+    2035: ('02-08', '05-15', '09-16'), 2036: ('01-28', '05-03', '10-04'), 2037: ('02-15', '05-22', '09-24'),
+    2038: ('02-04', '05-11', '09-13'), 2039: ('01-24', '04-30', '10-02'), 2040: ('02-12', '05-18', '09-21'),
+    2041: ('02-01', '05-07', '09-10'), 2042: ('01-22', '05-26', '09-28'), 2043: ('02-10', '05-16', '09-17'),
+    2044: ('01-30', '05-05', '10-05'), 2045: ('02-17', '05-24', '09-25'), 2046: ('02-06', '05-13', '09-15'),
+    2047: ('01-26', '05-02', '10-04'), 2048: ('02-14', '05-20', '09-22'), 2049: ('02-02', '05-09', '09-11'),
+    2050: ('01-23', '05-28', '09-30'), 2051: ('02-11', '05-17', '09-19'), 2052: ('02-01', '05-06', '09-07'),
+    2053: ('02-19', '05-25', '09-26'), 2054: ('02-08', '05-15', '09-16'), 2055: ('01-28', '05-04', '10-05'),
+    2056: ('02-15', '05-22', '09-24'), 2057: ('02-04', '05-11', '09-13'), 2058: ('01-24', '04-30', '10-02'),
+    2059: ('02-12', '05-19', '09-21'), 2060: ('02-02', '05-07', '09-09')
+}
+
+# Holidays declared one at a time: election days and temporary holidays
+extra_holidays = {
+    '1995-06-27': '지방선거', '1996-04-11': '국회의원선거', '1997-12-18': '대통령선거', '1998-06-04': '지방선거',
+    '2000-04-13': '국회의원선거', '2002-06-13': '지방선거', '2002-07-01': '임시공휴일', '2002-12-19': '대통령선거',
+    '2004-04-15': '국회의원선거', '2006-05-31': '지방선거', '2007-12-19': '대통령선거', '2008-04-09': '국회의원선거',
+    '2010-06-02': '지방선거', '2012-04-11': '국회의원선거', '2012-12-19': '대통령선거', '2014-06-04': '지방선거',
+    '2015-08-14': '임시공휴일', '2016-04-13': '국회의원선거', '2017-05-09': '대통령선거', '2017-10-02': '임시공휴일',
+    '2018-06-13': '지방선거', '2020-04-15': '국회의원선거', '2020-08-17': '임시공휴일', '2022-03-09': '대통령선거',
+    '2022-06-01': '지방선거', '2023-10-02': '임시공휴일', '2024-04-10': '국회의원선거', '2024-10-01': '임시공휴일',
+    '2025-01-27': '임시공휴일', '2025-06-03': '대통령선거', '2026-06-03': '지방선거'
+}
+
+
+def korean_holidays(year: int) -> Dict[datetime.date, str]:
+    # Public holidays of a year, substitute holidays included, as the rules stood in that year
+    holidays: Dict[datetime.date, List[str]] = {}
+
+    def add(day: datetime.date, name: str):
+        holidays.setdefault(day, []).append(name)
+
+    fixed = [(1, 1, '신정'), (3, 1, '삼일절'), (5, 5, '어린이날'), (6, 6, '현충일'), (8, 15, '광복절'), (10, 3, '개천절'),
+             (12, 25, '기독탄신일')]
+    fixed += [(1, 2, '신정')] if year <= 1998 else []
+    fixed += [(4, 5, '식목일')] if year <= 2005 else []
+    fixed += [(7, 17, '제헌절')] if year <= 2007 else []
+    fixed += [(10, 1, '국군의 날')] if year <= 1990 else []
+    fixed += [(10, 9, '한글날')] if year <= 1990 or year >= 2013 else []
+    for [month, day, name] in fixed:
+        add(datetime.date(year, month, day), name)
+    [seollal, buddha, chuseok] = [datetime.date(year, int(month_day[:2]), int(month_day[3:])) for month_day in
+                                  lunar_holidays[year]]
+    blocks = []
+    for [center, name] in [(seollal, '설날'), (chuseok, '추석')]:
+        blocks.append([center + datetime.timedelta(days=offset) for offset in (-1, 0, 1)])
+        for day in blocks[-1]:
+            add(day, name)
+    add(buddha, '부처님오신날')
+    for [date, name] in extra_holidays.items():
+        if date.startswith(f'{year}-'):
+            add(datetime.date.fromisoformat(date), name)
+
+    # Substitute holidays: 설날, 추석 and 어린이날 since 2014, the national days since August 2021, and
+    # 부처님오신날 and 기독탄신일 since May 2023
+    substituted = []
+    if year >= 2014:
+        for [block, name] in zip(blocks, ['설날', '추석']):
+            if any(day.weekday() == 6 or len(holidays[day]) > 1 for day in block):
+                substituted.append((block[-1], name))
+        children = datetime.date(year, 5, 5)
+        if children.weekday() >= 5 or len(holidays[children]) > 1:
+            substituted.append((children, '어린이날'))
+    for [month, day, name, since] in [(3, 1, '삼일절', '2021-08-04'), (8, 15, '광복절', '2021-08-04'),
+                                      (10, 3, '개천절', '2021-08-04'), (10, 9, '한글날', '2021-08-04'),
+                                      (buddha.month, buddha.day, '부처님오신날', '2023-05-04'),
+                                      (12, 25, '기독탄신일', '2023-05-04')]:
+        holiday = datetime.date(year, month, day)
+        if holiday >= datetime.date.fromisoformat(since) and holiday.weekday() >= 5:
+            substituted.append((holiday, name))
+    for [holiday, name] in sorted(substituted):
+        substitute = holiday + datetime.timedelta(days=1)
+        while substitute.weekday() >= 5 or substitute in holidays:
+            substitute += datetime.timedelta(days=1)
+        add(substitute, f'대체공휴일({name})')
+    return {day: names[0] for [day, names] in sorted(holidays.items())}
+
+
+class BusinessCalendar:
+    # Business days (weekdays that are not public holidays) from first_year through last_year. previous and
+    # following hold, for every day of the range, the ordinal of the nearest business day on or before and on or
+    # after it, so a lookup is a subtraction and an index.
+
+    def __init__(self, first_year: int = min(lunar_holidays), last_year: int = max(lunar_holidays),
+                 holidays: Callable[[int], Dict[datetime.date, str]] = korean_holidays):
+        self.first_ordinal = datetime.date(first_year, 1, 1).toordinal()
+        self.last_ordinal = datetime.date(last_year, 12, 31).toordinal()
+        self.holidays: Dict[datetime.date, str] = {}
+        for year in range(first_year, last_year + 1):
+            self.holidays.update(holidays(year))
+        holiday_ordinals = {day.toordinal() for day in self.holidays}
+        ordinals = range(self.first_ordinal, self.last_ordinal + 1)
+        self.business = bytes(ordinal % 7 not in [6, 0] and ordinal not in holiday_ordinals for ordinal in ordinals)
+        [self.previous, self.following] = [array('l'), array('l')]
+        last = -1
+        for ordinal in ordinals:
+            last = ordinal if self.business[ordinal - self.first_ordinal] else last
+            self.previous.append(last)
+        last = -1
+        for ordinal in reversed(ordinals):
+            last = ordinal if self.business[ordinal - self.first_ordinal] else last
+            self.following.append(last)
+        self.following.reverse()
+
+    def position(self, day: datetime.date) -> int:
+        position = day.toordinal() - self.first_ordinal
+        if not 0 <= position < len(self.business):
+            raise ValueError(f'{day} is outside {datetime.date.fromordinal(self.first_ordinal)} to '
+                             f'{datetime.date.fromordinal(self.last_ordinal)}')
+        return position
+
+    def is_business_day(self, day: datetime.date) -> bool:
+        return bool(self.business[self.position(day)])
+
+    def on_or_before(self, day: datetime.date) -> datetime.date:
+        ordinal = self.previous[self.position(day)]
+        if ordinal < 0:
+            raise ValueError(f'no business day on or before {day} in the calendar')
+        return datetime.date.fromordinal(ordinal)
+
+    def on_or_after(self, day: datetime.date) -> datetime.date:
+        ordinal = self.following[self.position(day)]
+        if ordinal < 0:
+            raise ValueError(f'no business day on or after {day} in the calendar')
+        return datetime.date.fromordinal(ordinal)
+
+    @functools.lru_cache(maxsize=None)
+    def payday(self, year: int, month: int, day: int) -> datetime.date:
+        # The nearest business day on or before the given day of the month, or its last day if it is shorter
+        return self.on_or_before(datetime.date(year, month, min(day, calendar.monthrange(year, month)[1])))
+
+    @functools.lru_cache(maxsize=None)
+    def payday_span(self, year: int, month: int, day: int) -> Tuple[datetime.date, datetime.date]:
+        # From this month's payday through the day before next month's
+        [next_year, next_month] = [year + month // 12, month % 12 + 1]
+        return self.payday(year, month, day), self.payday(next_year, next_month, day) - datetime.timedelta(days=1)
+
+    def paydays(self, first_date: datetime.date, last_date: datetime.date, day: int) -> List[datetime.date]:
+        # Every payday from first_date through last_date. Paydays only ever move earlier, so the month after
+        # last_date is looked at too: its payday may fall in the last days of the month before.
+        [year, month] = [first_date.year, first_date.month]
+        [last_year, last_month] = [last_date.year + last_date.month // 12, last_date.month % 12 + 1]
+        paydays = []
+        while (year, month) <= (last_year, last_month):
+            payday = self.payday(year, month, day)
+            if first_date <= payday <= last_date:
+                paydays.append(payday)
+            [year, month] = [year + month // 12, month % 12 + 1]
+        return paydays
+
+
+business_calendar = BusinessCalendar()
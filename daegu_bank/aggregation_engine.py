@@ -0,0 +1,254 @@
+import sys
+from typing import Callable, Dict, Iterable, List, Sequence, Set, Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .transaction_table import TransactionTable
+
+
+class CategoryAggregate:
+    __slots__ = ('income', 'loss', 'row_count', 'first_pk')
+
+    def __init__(self, income=0, loss=0, row_count=0, first_pk=sys.maxsize):
+        self.income = income
+        self.loss = loss
+        self.row_count = row_count
+        self.first_pk = first_pk
+
+    @property
+    def balance(self) -> int:
+        return self.income - self.loss
+
+    def merge(self, other):
+        self.income += other.income
+        self.loss += other.loss
+        self.row_count += other.row_count
+        self.first_pk = min(self.first_pk, other.first_pk)
+
+    def to_list(self) -> list:
+        return [self.income, self.loss, self.row_count, self.first_pk]
+
+
+class PeriodAggregate:
+    # Sums for one period; merge() appends another slice of the same account's rows, in any order
+    __slots__ = ('first_pk', 'last_pk', 'start_balance', 'end_balance', 'total_income', 'total_loss', 'row_count',
+                 'categories')
+
+    def __init__(self):
+        self.first_pk = sys.maxsize
+        self.last_pk = -1
+        self.start_balance = 0
+        self.end_balance = 0
+        self.total_income = 0
+        self.total_loss = 0
+        self.row_count = 0
+        self.categories: Dict[str, CategoryAggregate] = {}
+
+    @property
+    def total_delta(self) -> int:
+        return self.total_income - self.total_loss
+
+    def merge(self, other):
+        if other.first_pk < self.first_pk:
+            [self.first_pk, self.start_balance] = [other.first_pk, other.start_balance]
+        if other.last_pk > self.last_pk:
+            [self.last_pk, self.end_balance] = [other.last_pk, other.end_balance]
+        self.total_income += other.total_income
+        self.total_loss += other.total_loss
+        self.row_count += other.row_count
+        for [class_name, category] in other.categories.items():
+            if class_name in self.categories:
+                self.categories[class_name].merge(category)
+            else:
+                self.categories[class_name] = CategoryAggregate(*category.to_list())
+        # Categories are listed in the order their first row appears, as when rows were filed one by one
+        self.categories = dict(sorted(self.categories.items(), key=lambda item: item[1].first_pk))
+
+    def combine(self, other):
+        # Adds another account's aggregate of the same period: balances add up as well as the flows
+        self.first_pk = min(self.first_pk, other.first_pk)
+        self.last_pk = max(self.last_pk, other.last_pk)
+        self.start_balance += other.start_balance
+        self.end_balance += other.end_balance
+        self.total_income += other.total_income
+        self.total_loss += other.total_loss
+        self.row_count += other.row_count
+        for [class_name, category] in other.categories.items():
+            if class_name in self.categories:
+                self.categories[class_name].merge(category)
+            else:
+                self.categories[class_name] = CategoryAggregate(*category.to_list())
+
+    def to_dict(self) -> dict:
+        return {
+            'first_pk': self.first_pk, 'last_pk': self.last_pk,
+            'start_balance': self.start_balance, 'end_balance': self.end_balance,
+            'total_income': self.total_income, 'total_loss': self.total_loss, 'row_count': self.row_count,
+            'categories': [[class_name, category.to_list()] for [class_name, category] in self.categories.items()]
+        }
+
+    @staticmethod
+    def from_dict(data: dict):
+        aggregate = PeriodAggregate()
+        for name in PeriodAggregate.__slots__[:-1]:
+            setattr(aggregate, name, data[name])
+        aggregate.categories = {class_name: CategoryAggregate(*category) for [class_name, category] in
+                                data['categories']}
+        return aggregate
+
+
+class AggregationEngine:
+    # Aggregates every period and category of a table in one grouped pass over its columns. With NumPy the rows are
+    # sorted by (period, class, pk) and each group is summed by reduceat; without it every (period, class) pair gets
+    # a slot in flat lists, so a row costs a few list updates and no dict lookups.
+
+    def __init__(self, periods: Iterable[str]):
+        self.periods = list(periods)
+        self.aggregates = {period: PeriodAggregate() for period in self.periods}
+
+    def add_rows(self, table: TransactionTable, period_codes: Sequence[int], class_codes: Sequence[int],
+                 class_names: List[str], positions: Iterable[int] = None):
+        # period_codes holds a position in self.periods (or -1) and class_codes a position in class_names for
+        # every row of table; only the rows at positions are aggregated when given
+        if numpy is not None:
+            partials = self.grouped_partials(table, period_codes, class_codes, class_names, positions)
+        else:
+            partials = self.scanned_partials(table, period_codes, class_codes, class_names, positions)
+        for [period_code, partial] in partials.items():
+            self.aggregates[self.periods[period_code]].merge(partial)
+
+    @staticmethod
+    def grouped_partials(table: TransactionTable, period_codes: Sequence[int], class_codes: Sequence[int],
+                         class_names: List[str], positions: Iterable[int] = None) -> Dict[int, PeriodAggregate]:
+        [pks, incomes, losses, balances] = [numpy.asarray(table.column(name), dtype=numpy.int64) for name in
+                                            ['pk', 'income', 'loss', 'balance']]
+        periods = numpy.asarray(period_codes, dtype=numpy.int64)[:len(table)]
+        classes = numpy.asarray(class_codes, dtype=numpy.int64)[:len(table)]
+        selected = numpy.flatnonzero(periods >= 0)
+        if positions is not None:
+            selected = numpy.fromiter(positions, dtype=numpy.int64)
+            selected = selected[periods[selected] >= 0]
+        if len(selected) == 0:
+            return {}
+        [pks, incomes, losses, balances, periods, classes] = [column[selected] for column in
+                                                              [pks, incomes, losses, balances, periods, classes]]
+
+        partials = {}
+        # First and last row of every period by pk
+        order = numpy.lexsort((pks, periods))
+        starts = numpy.flatnonzero(numpy.r_[True, periods[order][1:] != periods[order][:-1]])
+        [firsts, lasts] = [order[starts], order[numpy.r_[starts[1:], len(order)] - 1]]
+        for [period_code, first, last] in zip(periods[firsts].tolist(), firsts.tolist(), lasts.tolist()):
+            partial = partials[period_code] = PeriodAggregate()
+            [partial.first_pk, partial.start_balance] = [int(pks[first]),
+                                                         int(balances[first] - incomes[first] + losses[first])]
+            [partial.last_pk, partial.end_balance] = [int(pks[last]), int(balances[last])]
+
+        # Sums of every (period, class) group, whose first row is its smallest pk
+        keys = periods * len(class_names) + classes
+        order = numpy.lexsort((pks, keys))
+        starts = numpy.flatnonzero(numpy.r_[True, keys[order][1:] != keys[order][:-1]])
+        groups = zip(keys[order][starts].tolist(), numpy.add.reduceat(incomes[order], starts).tolist(),
+                     numpy.add.reduceat(losses[order], starts).tolist(),
+                     numpy.diff(numpy.r_[starts, len(order)]).tolist(), pks[order][starts].tolist())
+        for [key, income, loss, row_count, first_pk] in groups:
+            partial = partials[key // len(class_names)]
+            partial.categories[class_names[key % len(class_names)]] = CategoryAggregate(income, loss, row_count,
+                                                                                        first_pk)
+            partial.total_income += income
+            partial.total_loss += loss
+            partial.row_count += row_count
+        return partials
+
+    def scanned_partials(self, table: TransactionTable, period_codes: Sequence[int], class_codes: Sequence[int],
+                         class_names: List[str], positions: Iterable[int] = None) -> Dict[int, PeriodAggregate]:
+        columns = table.columns
+        [pks, incomes, losses, balances] = [columns['pk'], columns['income'], columns['loss'], columns['balance']]
+        if positions is None:
+            positions = range(len(table))
+
+        partials = {}
+        [class_count, slot_count] = [len(class_names), len(self.periods) * len(class_names)]
+        [group_incomes, group_losses, group_row_counts] = [[0] * slot_count, [0] * slot_count, [0] * slot_count]
+        group_first_pks = [sys.maxsize] * slot_count
+        [period_first_pks, period_last_pks] = [[sys.maxsize] * len(self.periods), [-1] * len(self.periods)]
+        [period_firsts, period_lasts] = [[0] * len(self.periods), [0] * len(self.periods)]
+        for position in positions:
+            period_code = period_codes[position]
+            if period_code < 0:
+                continue
+            index = table.start + position
+            [pk, income, loss] = [pks[index], incomes[index], losses[index]]
+            if pk < period_first_pks[period_code]:
+                [period_first_pks[period_code], period_firsts[period_code]] = [pk, index]
+            if pk > period_last_pks[period_code]:
+                [period_last_pks[period_code], period_lasts[period_code]] = [pk, index]
+            slot = period_code * class_count + class_codes[position]
+            group_incomes[slot] += income
+            group_losses[slot] += loss
+            group_row_counts[slot] += 1
+            if pk < group_first_pks[slot]:
+                group_first_pks[slot] = pk
+
+        for period_code in range(len(self.periods)):
+            if period_last_pks[period_code] < 0:
+                continue
+            partial = partials[period_code] = PeriodAggregate()
+            [first, last] = [period_firsts[period_code], period_lasts[period_code]]
+            [partial.first_pk, partial.start_balance] = [pks[first], balances[first] - incomes[first] + losses[first]]
+            [partial.last_pk, partial.end_balance] = [pks[last], balances[last]]
+            for class_code in range(class_count):
+                slot = period_code * class_count + class_code
+                if group_row_counts[slot] == 0:
+                    continue
+                partial.categories[class_names[class_code]] = CategoryAggregate(
+                    group_incomes[slot], group_losses[slot], group_row_counts[slot], group_first_pks[slot])
+                partial.total_income += group_incomes[slot]
+                partial.total_loss += group_losses[slot]
+                partial.row_count += group_row_counts[slot]
+        return partials
+
+    def reclassify_rows(self, table: TransactionTable, period_codes: Sequence[int], class_codes: Sequence[int],
+                        class_names: List[str], changes: Iterable[Tuple[int, int]],
+                        period_positions: Callable[[str], Iterable[int]]) -> Set[str]:
+        # Moves rows whose class changed from their old category to their new one. changes holds (position, old
+        # class code) pairs and class_codes already holds the new codes. Totals stay as they are; a period is only
+        # scanned, through period_positions, when a category loses its first row. Returns the periods touched.
+        columns = table.columns
+        [pks, incomes, losses] = [columns['pk'], columns['income'], columns['loss']]
+        touched = set()
+        stale = set()
+        for [position, old_class_code] in changes:
+            period_code = period_codes[position]
+            if period_code < 0:
+                continue
+            categories = self.aggregates[self.periods[period_code]].categories
+            index = table.start + position
+            [pk, income, loss] = [pks[index], incomes[index], losses[index]]
+            old = categories[class_names[old_class_code]]
+            old.income -= income
+            old.loss -= loss
+            old.row_count -= 1
+            if old.row_count == 0:
+                del categories[class_names[old_class_code]]
+            elif pk == old.first_pk:
+                stale.add((period_code, old_class_code))
+            new = categories.get(class_names[class_codes[position]])
+            if new is None:
+                new = categories[class_names[class_codes[position]]] = CategoryAggregate()
+            new.merge(CategoryAggregate(income, loss, 1, pk))
+            touched.add(period_code)
+
+        for [period_code, class_code] in stale:
+            category = self.aggregates[self.periods[period_code]].categories.get(class_names[class_code])
+            if category is not None:
+                category.first_pk = min(pks[table.start + position] for position in
+                                        period_positions(self.periods[period_code]) if
+                                        class_codes[position] == class_code)
+        for period_code in touched:
+            aggregate = self.aggregates[self.periods[period_code]]
+            aggregate.categories = dict(sorted(aggregate.categories.items(), key=lambda item: item[1].first_pk))
+        return {self.periods[period_code] for period_code in touched}
@@ -0,0 +1,169 @@
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Sequence
+from typing import List, Tuple
+
+from .mydata_reader import load_my_data_tables
+from .transaction_table import TransactionTable
+
+# A ledger file is: magic, u32 header length, JSON header, padding to 8 bytes, then the data section. The data
+# section holds every numeric column as one contiguous little-endian block, and every string column as an 'q'
+# block of n + 1 offsets into a UTF-8 blob. Rows are sorted by (timestamp, pk). All header offsets are relative
+# to the start of the data section, and every block starts 8-byte aligned.
+magic = b'PFALEDG1'
+
+
+class StringColumn(Sequence):
+    # Strings decoded on access from a UTF-8 blob; offsets[i]:offsets[i + 1] delimits string i
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: memoryview, offsets: memoryview):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            [start, stop, step] = item.indices(len(self))
+            assert step == 1, f'{step} == 1'
+            return StringColumn(self.data, self.offsets[start:max(start, stop) + 1])
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return str(self.data[self.offsets[item]:self.offsets[item + 1]], 'utf-8')
+
+    def __iter__(self):
+        data = self.data
+        offsets = self.offsets
+        for index in range(len(offsets) - 1):
+            yield str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+
+
+def is_binary_ledger(filename: str) -> bool:
+    with open(filename, 'rb') as file:
+        return file.read(len(magic)) == magic
+
+
+def read_header(filename: str) -> bytes:
+    # The JSON header alone, without mapping the file
+    with open(filename, 'rb') as file:
+        assert file.read(len(magic)) == magic, f'{filename} is not a binary ledger'
+        [header_size] = struct.unpack('<I', file.read(4))
+        return file.read(header_size)
+
+
+def aligned(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def write_binary_ledger(table: TransactionTable, filename: str):
+    timestamps = table.column('timestamp')
+    pks = table.column('pk')
+    if any((timestamps[index], pks[index]) > (timestamps[index + 1], pks[index + 1]) for index in
+           range(len(table) - 1)):
+        table = table.take(sorted(range(len(table)), key=lambda index: (timestamps[index], pks[index])))
+
+    blocks = []
+    header = {
+        'row_count': len(table),
+        'min_timestamp': table.column('timestamp')[0] if len(table) > 0 else 0,
+        'max_timestamp': table.column('timestamp')[-1] if len(table) > 0 else 0,
+        'max_pk': max(table.column('pk')) if len(table) > 0 else 0,
+        'columns': {},
+        'strings': {}
+    }
+    offset = 0
+    for [name, typecode] in TransactionTable.numeric_columns.items():
+        block = array(typecode, table.column(name)).tobytes()
+        header['columns'][name] = [offset, typecode]
+        blocks.append(block)
+        offset += aligned(len(block))
+    for name in TransactionTable.string_columns:
+        encoded = [value.encode('utf-8') for value in table.column(name)]
+        offsets = array('q', [0])
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        data = b''.join(encoded)
+        header['strings'][name] = [offset, offset + aligned(len(offsets) * 8), len(data)]
+        blocks.extend([offsets.tobytes(), data])
+        offset += aligned(len(offsets) * 8) + aligned(len(data))
+
+    header = json.dumps(header).encode('utf-8')
+    with open(filename + '.tmp', 'wb') as file:
+        file.write(magic)
+        file.write(struct.pack('<I', len(header)))
+        file.write(header)
+        file.write(bytes(aligned(file.tell()) - file.tell()))
+        for block in blocks:
+            file.write(block)
+            file.write(bytes(aligned(len(block)) - len(block)))
+    os.replace(filename + '.tmp', filename)
+
+
+class BinaryLedger:
+    # A ledger file mapped read-only; columns are memoryviews straight into the mapping, so opening costs the header
+    # only and pages are read when rows are touched
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        assert self.mmap[:len(magic)] == magic, f'{filename} is not a binary ledger'
+        [header_size] = struct.unpack_from('<I', self.mmap, len(magic))
+        header_start = len(magic) + 4
+        header = json.loads(bytes(self.mmap[header_start:header_start + header_size]).decode('utf-8'))
+        data_start = aligned(header_start + header_size)
+        buffer = memoryview(self.mmap)[data_start:]
+
+        self.row_count = header['row_count']
+        self.min_timestamp = header['min_timestamp']
+        self.max_timestamp = header['max_timestamp']
+        self.max_pk = header['max_pk']
+        self.columns = {}
+        for [name, [offset, typecode]] in header['columns'].items():
+            size = array(typecode).itemsize
+            self.columns[name] = buffer[offset:offset + self.row_count * size].cast(typecode)
+        for [name, [offsets_offset, data_offset, data_size]] in header['strings'].items():
+            offsets = buffer[offsets_offset:offsets_offset + (self.row_count + 1) * 8].cast('q')
+            self.columns[name] = StringColumn(buffer[data_offset:data_offset + data_size], offsets)
+
+    def window(self, start_timestamp: int, stop_timestamp: int) -> Tuple[int, int]:
+        # The rows in [start_timestamp, stop_timestamp), found by bisecting the timestamp column
+        timestamps = self.columns['timestamp']
+        return bisect.bisect_left(timestamps, start_timestamp), bisect.bisect_left(timestamps, stop_timestamp)
+
+    def table(self, start: int = 0, stop: int = None) -> TransactionTable:
+        # An owning TransactionTable over rows [start, stop) whose columns are slices of the mapping
+        stop = self.row_count if stop is None else stop
+        return TransactionTable({name: column[start:stop] for [name, column] in self.columns.items()})
+
+
+def convert(sources, filename: str) -> Tuple[int, List[Tuple[str, int, str, str]]]:
+    # Parses Daegu Bank exports (a path, a glob or a list) into one binary ledger; returns the row count and the
+    # malformed lines that were skipped
+    [table, malformed_lines, read_positions] = load_my_data_tables(sources)
+    write_binary_ledger(table, filename)
+    return len(table), malformed_lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts Daegu Bank exports into a memory-mapped binary ledger.')
+    parser.add_argument('sources', nargs='+', help='exports, paths or glob patterns')
+    parser.add_argument('output')
+    args = parser.parse_args()
+    [row_count, malformed_lines] = convert(args.sources, args.output)
+    for [filename, line_number, line, reason] in malformed_lines:
+        print(f'{filename}:{line_number}: {reason}: "{line}"')
+    print(f'{row_count:,} rows written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import re
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from .instrumentation import instrumentation
+
+# What in a regex refers to its own groups, by name or number, and so would refer to the wrong group, or clash with
+# the policy groups, once spliced into one alternation
+group_reference = re.compile(r'\\[1-9]|\(\?P[<=]|\(\?\(')
+
+
+def combinable(regex: str) -> bool:
+    return group_reference.search(regex) is None
+
+
+class ClassificationEngine:
+    # A ClassificationModel compiled once: first match wins in get_policies() order, as with pass_filter
+    _engines = {}
+
+    def __init__(self, model: type):
+        self.model = model
+        self.policies = model.get_policies()
+
+        self.exact_notes: Dict[str, int] = {}
+        alternatives = []
+        # Policies whose regexes cannot share the alternation, by index; they are matched one by one, as
+        # pass_filter does
+        self.separate_regexes: List[Tuple[int, List[Pattern]]] = []
+        for [index, policy] in enumerate(self.policies):
+            for note in policy._note_filter:
+                self.exact_notes.setdefault(note, index)
+            if len(policy._note_regex) == 0:
+                continue
+            if all(combinable(regex) for regex in policy._note_regex):
+                alternatives.append(f'(?P<p{index}>' + '|'.join(f'(?:{regex})' for regex in policy._note_regex) + ')')
+            else:
+                self.separate_regexes.append((index, [re.compile(regex) for regex in policy._note_regex]))
+        self.note_regex = None
+        if len(alternatives) > 0:
+            try:
+                self.note_regex = re.compile('|'.join(alternatives))
+            except re.error:
+                # Such as inline flags, which only compile at the start of a whole pattern
+                self.separate_regexes = [(index, [re.compile(regex) for regex in policy._note_regex]) for
+                                         [index, policy] in enumerate(self.policies) if len(policy._note_regex) > 0]
+
+        self.classified_notes: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def of(cls, model: type):
+        engine = cls._engines.get(model)
+        if engine is None:
+            engine = cls._engines[model] = ClassificationEngine(model)
+        return engine
+
+    def classify(self, note: str) -> Optional[str]:
+        # Returns the name of the first matching policy, or None
+        if instrumentation.enabled:
+            instrumentation.count('classification.engine_calls')
+        try:
+            return self.classified_notes[note]
+        except KeyError:
+            name = self.classified_notes[note] = self._classify(note)
+            return name
+
+    def _classify(self, note: str) -> Optional[str]:
+        index = self.exact_notes.get(note, len(self.policies))
+        if self.note_regex is not None:
+            if instrumentation.enabled:
+                instrumentation.count('classification.regex_evaluations')
+            match = self.note_regex.match(note)
+            if match is not None:
+                index = min(index, int(match.lastgroup[1:]))
+        for [policy_index, regexes] in self.separate_regexes:
+            if policy_index >= index:
+                break
+            if any(regex.match(note) is not None for regex in regexes):
+                index = policy_index
+                break
+        if index < len(self.policies):
+            return self.policies[index].name()
+        return None
@@ -53,4 +53,8 @@ class ClassificationModel:
 
     @classmethod
     def get_policies(cls) -> List[ClassificationPolicy]:
-        return [getattr(cls, attr) for attr in set(dir(cls)).difference(cls.default_properties)]
+        # In definition order, base classes first, so that the first policy defined is the first one tried
+        names = set(dir(cls)).difference(cls.default_properties)
+        names = [name for klass in reversed(cls.__mro__) for name in vars(klass) if name in names]
+        policies = [getattr(cls, attr) for attr in dict.fromkeys(names)]
+        return [policy for policy in policies if isinstance(policy, type) and issubclass(policy, ClassificationPolicy)]
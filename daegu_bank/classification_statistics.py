@@ -1,9 +1,11 @@
-from collections import defaultdict
-from typing import List
+from array import array
+from typing import Iterable, List, Sequence
 
-from daegu_bank.mydata_row import MyDataRow
+from daegu_bank.aggregation_engine import CategoryAggregate, PeriodAggregate
+from daegu_bank.instrumentation import instrumentation
+from daegu_bank.policy_set import PolicySet
+from daegu_bank.transaction_table import TransactionTable
 from daegu_bank.transcation_type import TransactionType
-from defs import ClassificationPolicies, special_exceptions
 
 
 def contains(keywords: list, string: str):
@@ -14,63 +16,118 @@ def contains(keywords: list, string: str):
 
 
 class ClassificationStatistics:
-    unclassified_rows = []
-
-    class ClassifiedTransactions(list):
-        def __init__(self):
-            super().__init__()
-            self.balance = 0
-            self.loss = 0
-            self.income = 0
-
-        def process_data(self):
-            for row in self:
-                self.balance += row.income
-                self.balance -= row.loss
-                self.income += row.income
-                self.loss += row.loss
+    _default_policy_set = None
+
+    class ClassifiedTransactions(Sequence):
+        # The rows of one class within a period; the totals come from the period's CategoryAggregate. An
+        # aggregate-only period holds no rows, so it has a row_count but is empty as a sequence.
+        def __init__(self, data: TransactionTable, class_codes: Sequence[int], class_code: int,
+                     category: CategoryAggregate, aggregate_only: bool = False):
+            self.data = data
+            self.class_codes = class_codes
+            self.class_code = class_code
+            self.category = category
+            self.aggregate_only = aggregate_only
+
+        @property
+        def balance(self) -> int:
+            return self.category.balance
+
+        @property
+        def income(self) -> int:
+            return self.category.income
+
+        @property
+        def loss(self) -> int:
+            return self.category.loss
+
+        @property
+        def row_count(self) -> int:
+            # Rows of the class in the period, held or not
+            return self.category.row_count
+
+        def __len__(self):
+            return 0 if self.aggregate_only else self.category.row_count
+
+        def __iter__(self):
+            for [row, class_code] in zip(self.data, self.class_codes):
+                if class_code == self.class_code:
+                    yield row
+
+        def __getitem__(self, item):
+            return list(self)[item]
 
         def convert_to_text(self, class_name: str):
             text = '\t\t{0: <24}: {1: 12,}원\n'.format(class_name, self.balance)
             return text
 
-    def __init__(self, my_data_rows_group_by_month: List[MyDataRow]):
-        self.data = my_data_rows_group_by_month
-        self.classified_transactions_folder = defaultdict(ClassificationStatistics.ClassifiedTransactions)
-        for row in self.data:
-            not_classified = True
-
-            date = str(row.transaction_datetime)
-            if date in special_exceptions.keys():
-                self.classified_transactions_folder[special_exceptions[date]].append(row)
-                not_classified = False
-            elif row.income > 0 and row.loss == 0:
-                money_flow_type = 'I'
-                for income_policy in ClassificationPolicies.Income.get_policies():
-                    if income_policy.pass_filter(row):
-                        self.classified_transactions_folder[income_policy.name()].append(row)
-                        not_classified = False
-                        break
-            elif row.income == 0 and row.loss > 0:
-                money_flow_type = 'L'
-                for loss_policy in ClassificationPolicies.Loss.get_policies():
-                    if loss_policy.pass_filter(row):
-                        self.classified_transactions_folder[loss_policy.name()].append(row)
-                        not_classified = False
-                        break
-            elif row.income == 0 and row.loss == 0:
-                money_flow_type = 'N'
-            else:
-                assert False, repr(row)
-            if not_classified:
-                if row.transaction_type in [TransactionType.cash_dispenser, TransactionType.cash_dispenser_partner]:
-                    self.classified_transactions_folder[f'{money_flow_type}-ATM'].append(row)
-                else:
-                    self.classified_transactions_folder[f'{money_flow_type}-other'].append(row)
-                    ClassificationStatistics.unclassified_rows.append(row)
-
-        for pair in self.classified_transactions_folder.items():
-            pair[1].process_data()
+    def __init__(self, my_data_rows_group_by_month: TransactionTable, class_codes: Sequence[int],
+                 class_names: List[str], aggregate: PeriodAggregate, aggregate_only: bool = False):
+        # A view over one period: class_codes holds a position in class_names for every row of the period. With
+        # aggregate_only there are no rows, and every figure comes from aggregate.
+        self.aggregate = aggregate
+        self.aggregate_only = aggregate_only
+        self.update_data(my_data_rows_group_by_month, class_codes, class_names)
+
+    def update_data(self, data: TransactionTable, class_codes: Sequence[int], class_names: List[str]):
+        self.data = data
+        self.class_codes = class_codes
+        self.class_names = class_names
+        class_code_by_name = {class_name: class_code for [class_code, class_name] in enumerate(class_names)}
+        self.classified_transactions_folder = {
+            class_name: ClassificationStatistics.ClassifiedTransactions(data, class_codes,
+                                                                        class_code_by_name[class_name], category,
+                                                                        self.aggregate_only)
+            for [class_name, category] in self.aggregate.categories.items()}
+
+    @classmethod
+    def default_policy_set(cls) -> PolicySet:
+        # The policies and special exceptions of defs.py
+        if cls._default_policy_set is None:
+            cls._default_policy_set = PolicySet.from_defs()
+        return cls._default_policy_set
+
+    @classmethod
+    def classify_table(cls, table: TransactionTable, class_names: List[str], positions: Iterable[int] = None,
+                       policy_set: PolicySet = None) -> array:
+        # Returns a class code per row (or per position given); class_names grows as new classes turn up.
+        # policy_set defaults to the policies of defs.py.
+        policy_set = cls.default_policy_set() if policy_set is None else policy_set
+        columns = table.columns
+        if positions is None:
+            positions = range(len(table))
+        class_code_by_name = {class_name: class_code for [class_code, class_name] in enumerate(class_names)}
+        class_name_by_key = {}
+        special_exception_names = policy_set.special_exception_names
+
+        class_codes = array('H')
+        for position in positions:
+            index = table.start + position
+            class_name = special_exception_names.get(columns['timestamp'][index])
+            if class_name is None:
+                key = (columns['income'][index], columns['loss'][index], columns['type_code'][index],
+                       columns['note'][index])
+                key = (key[0] > 0, key[1] > 0, key[0] == 0, key[1] == 0, key[2], key[3])
+                class_name = class_name_by_key.get(key)
+                if class_name is None:
+                    class_name = class_name_by_key[key] = policy_set.classify(
+                        columns['income'][index], columns['loss'][index], TransactionType(columns['type_code'][index]),
+                        columns['note'][index])
+            class_code = class_code_by_name.get(class_name)
+            if class_code is None:
+                class_code = class_code_by_name[class_name] = len(class_names)
+                class_names.append(class_name)
+            class_codes.append(class_code)
+        if instrumentation.enabled:
+            instrumentation.count('classification.rows', len(class_codes))
+            instrumentation.count('classification.classify_calls', len(class_name_by_key))
+        return class_codes
+
+    @staticmethod
+    def classify(income: int, loss: int, transaction_type: TransactionType, note: str,
+                 policy_set: PolicySet = None) -> str:
+        policy_set = ClassificationStatistics.default_policy_set() if policy_set is None else policy_set
+        return policy_set.classify(income, loss, transaction_type, note)
 
     def __repr__(self):
         text = '\t<ClassificationStatistics>\n'
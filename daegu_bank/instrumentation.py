@@ -0,0 +1,98 @@
+import atexit
+import collections
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+# Stage timings and counters for the analysis pipeline. Off unless PFA_TRACE names a JSON trace file (or a
+# command line flag calls enable()); PFA_PROFILE additionally names a stage to run under cProfile, and
+# PFA_TRACE_MEMORY=1 records each stage's peak allocation too. tracemalloc slows every allocation down, several
+# times over in allocation-heavy stages, so memory is only traced when asked for and its timings are best read
+# from a separate run without it. While off, stage() hands back a shared no-op context and callers guard count()
+# with `if instrumentation.enabled`.
+
+
+class Instrumentation:
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_path = None
+        self.profile_stage = None
+        self.trace_memory = False
+        self.stages = []
+        self.counters = collections.Counter()
+        self.local = threading.local()
+        self.disabled_stage = contextlib.nullcontext({})
+
+    def enable(self, trace_path: str, profile_stage: Optional[str] = None, trace_memory: bool = False):
+        trace_memory = trace_memory or os.environ.get('PFA_TRACE_MEMORY', '') not in ['', '0']
+        if not self.enabled:
+            atexit.register(self.dump)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+        self.trace_path = trace_path
+        self.profile_stage = profile_stage
+        self.trace_memory = self.trace_memory or trace_memory
+
+    def configure_from_environment(self):
+        if os.environ.get('PFA_TRACE'):
+            self.enable(os.environ['PFA_TRACE'], os.environ.get('PFA_PROFILE') or None)
+
+    def stage(self, name: str, rows: Optional[int] = None):
+        # Yields a dict the caller may set 'rows' in once the row count is known
+        if not self.enabled:
+            return self.disabled_stage
+        return self.record_stage(name, rows)
+
+    @contextlib.contextmanager
+    def record_stage(self, name: str, rows: Optional[int]):
+        parents = getattr(self.local, 'parents', None)
+        if parents is None:
+            parents = self.local.parents = []
+        record = {'name': name, 'parent': parents[-1] if len(parents) > 0 else None, 'thread':
+                  threading.current_thread().name, 'rows': rows}
+        profile = cProfile.Profile() if name == self.profile_stage else None
+        trace_memory = self.trace_memory
+        if trace_memory:
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            [memory_start, _] = tracemalloc.get_traced_memory()
+        [wall_start, cpu_start] = [time.perf_counter(), time.process_time()]
+        parents.append(name)
+        if profile is not None:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(f'{os.path.splitext(self.trace_path)[0]}.{name}.prof')
+            parents.pop()
+            record['wall_seconds'] = time.perf_counter() - wall_start
+            record['cpu_seconds'] = time.process_time() - cpu_start
+            if trace_memory:
+                # Peak traced allocation above what was live when the stage started; stages running on other
+                # threads at the same time share the peak
+                record['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1] - memory_start
+            self.stages.append(record)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def to_dict(self) -> dict:
+        return {'stages': self.stages, 'counters': dict(self.counters)}
+
+    def dump(self):
+        if self.trace_path is not None:
+            with open(self.trace_path, 'w', encoding='utf-8') as file:
+                json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+
+instrumentation = Instrumentation()
+instrumentation.configure_from_environment()
@@ -1,49 +1,89 @@
 import datetime
 import math
+from typing import List, Sequence
 
+from .aggregation_engine import AggregationEngine, PeriodAggregate
 from .classification_statistics import ClassificationStatistics
+from .transaction_table import TransactionTable
 
 
 class MonthlyStatistics:
 
-    def __init__(self, my_data_rows_group_by_month: list, date=None, span=None):
+    def __init__(self, my_data_rows_group_by_month: TransactionTable, date=None, span=None,
+                 aggregate: PeriodAggregate = None, class_codes: Sequence[int] = None, class_names: List[str] = None,
+                 aggregate_only: bool = False):
+        # A view over one period of an AggregationEngine. class_codes holds a position in class_names for every row;
+        # without an aggregate the rows are classified and aggregated here. An aggregate_only period has its
+        # figures and classes but no rows, as when it merges several accounts.
         self.date = date
         self.start_date = span[0]
         self.end_date = span[1]
         self.data = my_data_rows_group_by_month
-        if len(self.data) == 0:
-            return
-
-        my_data_rows_group_by_month.sort(key=lambda row: row.pk)
-        self.start_balance = \
-            my_data_rows_group_by_month[0].balance - my_data_rows_group_by_month[0].income + \
-            my_data_rows_group_by_month[0].loss
-        self.end_balance = my_data_rows_group_by_month[-1].balance
-        self.increase_rate = ((self.end_balance - self.start_balance) / self.start_balance * 100) \
+        if aggregate is None:
+            class_names = []
+            class_codes = ClassificationStatistics.classify_table(self.data, class_names)
+            engine = AggregationEngine([date])
+            engine.add_rows(self.data, [0] * len(self.data), class_codes, class_names)
+            aggregate = engine.aggregates[date]
+        self.aggregate = aggregate
+        self.aggregate_only = aggregate_only
+        self.classification_statistics = ClassificationStatistics(self.data, class_codes, class_names, aggregate,
+                                                                  aggregate_only)
+
+    def update_data(self, data: TransactionTable, class_codes: Sequence[int]):
+        # data is the whole period again after rows were appended; the aggregate has already taken them in
+        self.data = data
+        self.classification_statistics.update_data(data, class_codes, self.classification_statistics.class_names)
+
+    @property
+    def start_balance(self) -> int:
+        return self.aggregate.start_balance
+
+    @property
+    def end_balance(self) -> int:
+        return self.aggregate.end_balance
+
+    @property
+    def total_income(self) -> int:
+        return self.aggregate.total_income
+
+    @property
+    def total_loss(self) -> int:
+        return -self.aggregate.total_loss
+
+    @property
+    def total_delta(self) -> int:
+        return self.total_income + self.total_loss
+
+    @property
+    def increase_rate(self) -> float:
+        return ((self.end_balance - self.start_balance) / self.start_balance * 100) \
             if self.start_balance > 0 else math.nan
 
-        self.total_income = sum([row.income for row in my_data_rows_group_by_month])
-        self.total_loss = -sum([row.loss for row in my_data_rows_group_by_month])
-        self.total_delta = self.total_income + self.total_loss
+    @property
+    def day_count(self) -> int:
+        return (self.end_date - self.start_date).days + 1
+
+    @property
+    def left_day_count(self) -> int:
+        # Days after the first one that are today or later
+        first_left_day = max(self.start_date + datetime.timedelta(days=1), datetime.datetime.now().date())
+        return max(0, (self.end_date - first_left_day).days + 1)
 
-        now_day = datetime.datetime.now().date()
-        iter_day = self.start_date
-        self.day_count = 1
-        self.left_day_count = 0
-        while iter_day != self.end_date:
-            iter_day += datetime.timedelta(days=1)
-            if iter_day >= now_day:
-                self.left_day_count += 1
-            self.day_count += 1
+    @property
+    def income_by_day(self) -> int:
+        return math.floor(self.total_income / self.day_count)
 
-        self.income_by_day = math.floor(self.total_income / self.day_count)
-        self.loss_by_day = math.floor(self.total_loss / self.day_count)
-        self.delta_by_day = math.floor(self.total_delta / self.day_count)
+    @property
+    def loss_by_day(self) -> int:
+        return math.floor(self.total_loss / self.day_count)
 
-        self.classification_statistics = ClassificationStatistics(self.data)
+    @property
+    def delta_by_day(self) -> int:
+        return math.floor(self.total_delta / self.day_count)
 
     def __repr__(self):
-        if len(self.data) == 0:
+        if self.aggregate.row_count == 0:
             return f'<MonthlyStatistics {self.date} (empty)/>'
         text = f'<MonthlyStatistics {self.date}>' '\n'
         text += '\t{: <15} = {:12,}원 → {:12,}원({:+02.2f}%)\n'.format('start-end', self.start_balance,
@@ -0,0 +1,234 @@
+import concurrent.futures
+import datetime
+import glob
+import locale
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .mydata_row import MyDataRow
+from .transaction_table import TransactionTable
+from .transcation_type import TransactionType
+
+epoch_ordinal = datetime.date(1970, 1, 1).toordinal()
+
+
+def default_encoding() -> str:
+    # What exports are read as unless told otherwise: the system's, which is cp949 on the Korean Windows setups
+    # Daegu Bank's exports come from
+    return locale.getpreferredencoding(False)
+
+
+class MyDataReader:
+    footer_keyword = '합계'
+    default_chunk_size = 1 << 20
+
+    def __init__(self, source, encoding: str = None, chunk_size: int = default_chunk_size, skip_header=True,
+                 header_line: str = None, start_line_number: int = 1):
+        # source is a path or a file object opened in binary or text mode. To read the tail of a ledger, pass a
+        # file object positioned at a previous reader's offset along with its header_line and line_count + 1.
+        # Exports appended one after another are read through: their header and 합계 footer lines are skipped,
+        # whether the whole ledger is read or only its tail, so both see the same rows.
+        self.source = source
+        self.encoding = encoding if encoding is not None else default_encoding()
+        self.chunk_size = chunk_size
+        self.skip_header = skip_header
+        self.header_line = header_line
+        self.start_line_number = start_line_number
+
+        self.malformed_lines: List[Tuple[int, str, str]] = []
+        self.line_count = start_line_number - 1
+        self.offset = 0
+
+        self._day_seconds = {}
+        self._time_seconds = {}
+        self._type_codes = {}
+
+    def __iter__(self) -> Iterator[MyDataRow]:
+        for [line_number, line, cells] in self.iter_cells():
+            try:
+                row = MyDataRow.from_row(cells)
+            except (ValueError, AssertionError) as e:
+                self.malformed_lines.append((line_number, line, str(e)))
+                continue
+            yield row
+
+    def read_table(self, table: TransactionTable = None) -> TransactionTable:
+        # Fast path: parses straight into the table's columns without building MyDataRow objects
+        if table is None:
+            table = TransactionTable()
+        columns = table.columns
+        append_pk = columns['pk'].append
+        append_timestamp = columns['timestamp'].append
+        append_type_code = columns['type_code'].append
+        append_income = columns['income'].append
+        append_loss = columns['loss'].append
+        append_balance = columns['balance'].append
+        append_note = columns['note'].append
+        append_memo = columns['memo'].append
+        append_transaction_branch = columns['transaction_branch'].append
+        type_codes = self._type_codes
+
+        for [line_number, line, cells] in self.iter_cells():
+            try:
+                pk = int(cells[0])
+                timestamp = self.parse_timestamp(cells[1])
+                type_code = type_codes.get(cells[2])
+                if type_code is None:
+                    type_code = type_codes[cells[2]] = TransactionType.translate_keyword(cells[2]).value
+                loss = int(cells[3].replace(',', ''))
+                income = int(cells[4].replace(',', ''))
+                balance = int(cells[5].replace(',', ''))
+            except (ValueError, AssertionError) as e:
+                self.malformed_lines.append((line_number, line, str(e)))
+                continue
+            append_pk(pk)
+            append_timestamp(timestamp)
+            append_type_code(type_code)
+            append_income(income)
+            append_loss(loss)
+            append_balance(balance)
+            append_note(cells[6])
+            append_memo(cells[7])
+            append_transaction_branch(cells[8])
+        return table
+
+    def parse_timestamp(self, text: str) -> int:
+        # Fixed layout '%Y-%m-%d [%H:%M:%S]'; both halves are cached since rows share few distinct days and times
+        day_seconds = self._day_seconds.get(text[:12])
+        if day_seconds is None:
+            if text[4:5] != '-' or text[7:8] != '-' or text[10:12] != ' [':
+                raise ValueError(f'time data {text!r} does not match format \'%Y-%m-%d [%H:%M:%S]\'')
+            day = datetime.date(int(text[0:4]), int(text[5:7]), int(text[8:10]))
+            day_seconds = self._day_seconds[text[:12]] = (day.toordinal() - epoch_ordinal) * 86400
+        time_seconds = self._time_seconds.get(text[12:])
+        if time_seconds is None:
+            if len(text) != 21 or text[14] != ':' or text[17] != ':' or text[20] != ']':
+                raise ValueError(f'time data {text!r} does not match format \'%Y-%m-%d [%H:%M:%S]\'')
+            [hour, minute, second] = [int(text[12:14]), int(text[15:17]), int(text[18:20])]
+            if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60):
+                raise ValueError(f'time data {text!r} is out of range')
+            time_seconds = self._time_seconds[text[12:]] = hour * 3600 + minute * 60 + second
+        return day_seconds + time_seconds
+
+    def iter_cells(self) -> Iterator[Tuple[int, str, List[str]]]:
+        # self.offset ends up at the end of the source
+        for [line_number, offset, raw_lines] in self.iter_line_batches():
+            lines = self._decode_batch(line_number, raw_lines)
+            for [index, line] in enumerate(lines):
+                if line is None:
+                    continue
+                if line_number + index == self.start_line_number and self.skip_header:
+                    self.header_line = line
+                    continue
+                if len(line) == 0 or line == self.header_line:
+                    continue
+                cells = line.split('|')
+                if cells[0] == MyDataReader.footer_keyword:
+                    continue
+                if len(cells) != 9:
+                    self.malformed_lines.append((line_number + index, line, f'{len(cells)} cells, expected 9'))
+                    continue
+                yield line_number + index, line, cells
+
+    def iter_line_batches(self) -> Iterator[Tuple[int, int, List[Union[bytes, str]]]]:
+        # Yields (first line number, offset of the first line, lines) once per chunk read
+        if isinstance(self.source, str):
+            with open(self.source, 'rb') as file:
+                yield from self._split_chunks(file)
+        else:
+            yield from self._split_chunks(self.source)
+
+    def _split_chunks(self, file) -> Iterator[Tuple[int, int, List[Union[bytes, str]]]]:
+        # Offsets count bytes for binary sources and characters for text sources
+        line_number = self.start_line_number
+        remainder = None
+        while True:
+            chunk = file.read(self.chunk_size)
+            if not chunk:
+                break
+            if remainder:
+                chunk = remainder + chunk
+            lines = chunk.split(b'\n' if isinstance(chunk, bytes) else '\n')
+            remainder = lines.pop()
+            if len(lines) == 0:
+                continue
+            offset = self.offset
+            self.offset += len(chunk) - len(remainder)
+            self.line_count = line_number + len(lines) - 1
+            yield line_number, offset, lines
+            line_number += len(lines)
+        if remainder:
+            offset = self.offset
+            self.offset += len(remainder)
+            self.line_count = line_number
+            yield line_number, offset, [remainder]
+
+    def _decode_batch(self, line_number: int, raw_lines: List[Union[bytes, str]]) -> List[str]:
+        # Decodes a whole chunk at once and falls back to line by line decoding to report bad lines
+        if isinstance(raw_lines[0], bytes):
+            try:
+                lines = b'\n'.join(raw_lines).decode(self.encoding).split('\n')
+                if len(lines) == len(raw_lines):
+                    raw_lines = lines
+            except UnicodeDecodeError:
+                pass
+        lines = []
+        for [index, raw_line] in enumerate(raw_lines):
+            if isinstance(raw_line, bytes):
+                try:
+                    raw_line = raw_line.decode(self.encoding)
+                except UnicodeDecodeError as e:
+                    self.malformed_lines.append((line_number + index, repr(raw_line), str(e)))
+                    lines.append(None)
+                    continue
+            lines.append(raw_line[:-1] if raw_line[-1:] == '\r' else raw_line)
+        return lines
+
+
+def expand_sources(sources) -> List[str]:
+    # Accepts a path, a glob pattern or a list of either
+    if isinstance(sources, str):
+        sources = [sources]
+    filenames = []
+    for source in sources:
+        if os.path.exists(source):
+            filenames.append(source)
+        else:
+            matches = sorted(glob.glob(source))
+            assert len(matches) > 0, f'{source} matches no file'
+            filenames.extend(matches)
+    return filenames
+
+
+class ReadPosition(NamedTuple):
+    # Where a reader stopped in a ledger, so its tail can be read later
+    offset: int
+    line_count: int
+    header_line: Optional[str]
+
+
+def read_my_data_table(filename: str) -> Tuple[TransactionTable, List[Tuple[str, int, str, str]], ReadPosition]:
+    reader = MyDataReader(filename)
+    table = reader.read_table()
+    return table, [(filename, *malformed_line) for malformed_line in reader.malformed_lines], \
+        ReadPosition(reader.offset, reader.line_count, reader.header_line)
+
+
+def load_my_data_tables(sources, max_workers: int = None) -> \
+        Tuple[TransactionTable, List[Tuple[str, int, str, str]], Dict[str, ReadPosition]]:
+    # Parses every export in its own process and merges the rows in datetime and pk order
+    filenames = expand_sources(sources)
+    if len(filenames) == 1:
+        [table, malformed_lines, read_position] = read_my_data_table(filenames[0])
+        return table, malformed_lines, {filenames[0]: read_position}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(read_my_data_table, filenames))
+    table = TransactionTable.concatenate([result[0] for result in results])
+    malformed_lines = [malformed_line for result in results for malformed_line in result[1]]
+    read_positions = {filename: result[2] for [filename, result] in zip(filenames, results)}
+
+    timestamps = table.columns['timestamp']
+    pks = table.columns['pk']
+    order = sorted(range(len(table)), key=lambda index: (timestamps[index], pks[index]))
+    return table.take(order), malformed_lines, read_positions
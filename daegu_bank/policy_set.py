@@ -0,0 +1,151 @@
+import argparse
+import datetime
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from defs import ClassificationPolicies, special_exceptions
+from .classification_engine import ClassificationEngine, combinable
+from .classification_policy import ClassificationModel, IncomePolicy, LossPolicy
+from .transaction_table import to_timestamp
+from .transcation_type import TransactionType
+
+# A policy file is JSON of the form
+#     {"income": [{"name": "급여", "note_filter": ["..."], "note_regex": ["..."]}, ...],
+#      "loss": [...],
+#      "special_exceptions": {"2021-01-19 11:58:01": "L외화매수", ...}}
+# where the first policy of a list that matches a note wins, as the first one defined in a ClassificationModel does.
+flows = {'income': ('I', IncomePolicy), 'loss': ('L', LossPolicy)}
+
+Rule = Tuple[str, Tuple[str, ...], Tuple[str, ...]]
+
+
+def build_model(model_name: str, policy_class: type, rules: List[Rule]) -> type:
+    # A ClassificationModel subclass holding one policy class per rule, in rule order
+    policies = {}
+    for [index, [name, note_filter, note_regex]] in enumerate(rules):
+        policies[f'Policy{index:04d}'] = type(f'Policy{index:04d}', (policy_class,), {
+            '_name': name, '_note_filter': list(note_filter), '_note_regex': list(note_regex)})
+    return type(model_name, (ClassificationModel,), policies)
+
+
+class PolicySet:
+    # The classification rules in effect: an income and a loss model plus the special exceptions, which name the
+    # class of single rows by their datetime
+
+    def __init__(self, income_model: type, loss_model: type, special_exceptions: Dict[str, str],
+                 engines: Optional[Dict[str, ClassificationEngine]] = None):
+        self.models = {'I': income_model, 'L': loss_model}
+        self.engines = engines if engines is not None else {flow: ClassificationEngine(model) for [flow, model] in
+                                                            self.models.items()}
+        self.special_exceptions = dict(special_exceptions)
+        self.special_exception_names = {to_timestamp(datetime.datetime.fromisoformat(date)): name for
+                                        [date, name] in self.special_exceptions.items()}
+
+    @staticmethod
+    def from_defs():
+        return PolicySet(ClassificationPolicies.Income, ClassificationPolicies.Loss, special_exceptions,
+                         {'I': ClassificationEngine.of(ClassificationPolicies.Income),
+                          'L': ClassificationEngine.of(ClassificationPolicies.Loss)})
+
+    @staticmethod
+    def from_dict(data: dict):
+        models = {}
+        for [key, [flow, policy_class]] in flows.items():
+            rules = [(policy['name'], tuple(policy.get('note_filter', [])), tuple(policy.get('note_regex', []))) for
+                     policy in data.get(key, [])]
+            # A malformed regex fails here, before the set can be swapped in
+            for [name, note_filter, note_regex] in rules:
+                for regex in note_regex:
+                    re.compile(regex)
+            models[flow] = build_model(key.capitalize(), policy_class, rules)
+        # The engines compile the regexes together as classification will, so a set they cannot run also fails here
+        engines = {flow: ClassificationEngine(model) for [flow, model] in models.items()}
+        return PolicySet(models['I'], models['L'], data.get('special_exceptions', {}), engines)
+
+    @staticmethod
+    def load(filename: str):
+        with open(filename, encoding='utf-8') as file:
+            return PolicySet.from_dict(json.load(file))
+
+    def to_dict(self) -> dict:
+        data = {}
+        for [key, [flow, policy_class]] in flows.items():
+            data[key] = [{'name': name, 'note_filter': list(note_filter), 'note_regex': list(note_regex)} for
+                         [name, note_filter, note_regex] in self.rules(flow)]
+        data['special_exceptions'] = self.special_exceptions
+        return data
+
+    def store(self, filename: str):
+        with open(filename + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+            print(file=file)
+        os.replace(filename + '.tmp', filename)
+
+    def rules(self, flow: str) -> List[Rule]:
+        # The policies of a flow ('I' or 'L') in the order they are tried, by their undecorated names
+        return [(policy._name, tuple(policy._note_filter), tuple(policy._note_regex)) for policy in
+                self.engines[flow].policies]
+
+    def classify(self, income: int, loss: int, transaction_type: TransactionType, note: str) -> str:
+        if income > 0 and loss == 0:
+            money_flow_type = 'I'
+        elif income == 0 and loss > 0:
+            money_flow_type = 'L'
+        elif income == 0 and loss == 0:
+            money_flow_type = 'N'
+        else:
+            assert False, f'income={income} and loss={loss} are both set'
+        if money_flow_type in self.engines:
+            policy_name = self.engines[money_flow_type].classify(note)
+            if policy_name is not None:
+                return policy_name
+        if transaction_type in [TransactionType.cash_dispenser, TransactionType.cash_dispenser_partner]:
+            return f'{money_flow_type}-ATM'
+        return f'{money_flow_type}-other'
+
+    def affected_notes(self, other, notes: Iterable[str]) -> Set[str]:
+        # The notes whose rows can classify differently under other: those an added, removed or edited policy
+        # matches exactly or by regex. When policies kept by both change places, which of two overlapping ones wins
+        # may change for any note, so every note is affected.
+        notes = set(notes)
+        exact_notes = set()
+        regexes = []
+        for flow in self.engines:
+            [mine, theirs] = [self.rules(flow), other.rules(flow)]
+            kept = set(mine).intersection(theirs)
+            if [rule for rule in mine if rule in kept] != [rule for rule in theirs if rule in kept]:
+                return notes
+            for [name, note_filter, note_regex] in kept.symmetric_difference(set(mine).union(theirs)):
+                exact_notes.update(note_filter)
+                regexes.extend(note_regex)
+        affected = notes.intersection(exact_notes)
+        # As in ClassificationEngine, regexes that refer to their own groups are matched one by one
+        separate_regexes = [re.compile(regex) for regex in regexes if not combinable(regex)]
+        regexes = [regex for regex in regexes if combinable(regex)]
+        if len(regexes) > 0:
+            try:
+                separate_regexes.append(re.compile('|'.join(f'(?:{regex})' for regex in regexes)))
+            except re.error:
+                separate_regexes.extend(re.compile(regex) for regex in regexes)
+        for regex in separate_regexes:
+            affected.update(note for note in notes if regex.match(note) is not None)
+        return affected
+
+    def changed_exceptions(self, other) -> Set[int]:
+        # Timestamps whose special exception other adds, removes or renames
+        return {timestamp for timestamp in set(self.special_exception_names).union(other.special_exception_names) if
+                self.special_exception_names.get(timestamp) != other.special_exception_names.get(timestamp)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Writes the policies and special exceptions of defs.py as a policy '
+                                                 'file, to be edited and loaded with --policies.')
+    parser.add_argument('output')
+    args = parser.parse_args()
+    PolicySet.from_defs().store(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+import datetime
+import itertools
+from array import array
+from typing import Iterable, Iterator, Sequence
+
+from .mydata_row import MyDataRow
+from .transcation_type import TransactionType
+
+epoch = datetime.datetime(1970, 1, 1)
+one_second = datetime.timedelta(seconds=1)
+
+
+def to_timestamp(transaction_datetime: datetime.datetime) -> int:
+    return (transaction_datetime - epoch) // one_second
+
+
+def from_timestamp(timestamp: int) -> datetime.datetime:
+    return epoch + datetime.timedelta(seconds=timestamp)
+
+
+class SequenceView(Sequence):
+    __slots__ = ('base', 'start', 'stop')
+
+    def __init__(self, base: Sequence, start: int, stop: int):
+        self.base = base
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            [start, stop, step] = item.indices(len(self))
+            assert step == 1, f'{step} == 1'
+            return SequenceView(self.base, self.start + start, self.start + max(start, stop))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return self.base[self.start + item]
+
+    def __iter__(self):
+        return itertools.islice(self.base, self.start, self.stop)
+
+
+class TransactionTable:
+    numeric_columns = {'pk': 'q', 'timestamp': 'q', 'type_code': 'b', 'income': 'q', 'loss': 'q', 'balance': 'q'}
+    string_columns = ('note', 'memo', 'transaction_branch')
+
+    class Row:
+        # A MyDataRow look-alike that reads straight out of the table's columns
+        __slots__ = ('columns', 'index')
+
+        def __init__(self, columns: dict, index: int):
+            self.columns = columns
+            self.index = index
+
+        @property
+        def pk(self) -> int:
+            return self.columns['pk'][self.index]
+
+        @property
+        def timestamp(self) -> int:
+            return self.columns['timestamp'][self.index]
+
+        @property
+        def transaction_datetime(self) -> datetime.datetime:
+            return from_timestamp(self.columns['timestamp'][self.index])
+
+        @property
+        def transaction_type(self) -> TransactionType:
+            return TransactionType(self.columns['type_code'][self.index])
+
+        @property
+        def income(self) -> int:
+            return self.columns['income'][self.index]
+
+        @property
+        def loss(self) -> int:
+            return self.columns['loss'][self.index]
+
+        @property
+        def balance(self) -> int:
+            return self.columns['balance'][self.index]
+
+        @property
+        def note(self) -> str:
+            return self.columns['note'][self.index]
+
+        @property
+        def memo(self) -> str:
+            return self.columns['memo'][self.index]
+
+        @property
+        def transaction_branch(self) -> str:
+            return self.columns['transaction_branch'][self.index]
+
+        __repr__ = MyDataRow.__repr__
+
+    def __init__(self, columns: dict = None, start: int = 0, stop: int = None):
+        if columns is None:
+            columns = {name: array(typecode) for [name, typecode] in TransactionTable.numeric_columns.items()}
+            columns.update({name: [] for name in TransactionTable.string_columns})
+        self.columns = columns
+        self.start = start
+        self._stop = stop
+
+    @staticmethod
+    def from_rows(rows: Iterable[MyDataRow]):
+        table = TransactionTable()
+        table.extend(rows)
+        return table
+
+    @staticmethod
+    def concatenate(tables: Iterable):
+        table = TransactionTable()
+        for name in TransactionTable.numeric_columns:
+            for other in tables:
+                table.columns[name].extend(other.column(name))
+        for name in TransactionTable.string_columns:
+            for other in tables:
+                table.columns[name].extend(other.column(name))
+        return table
+
+    @property
+    def stop(self) -> int:
+        return len(self.columns['pk']) if self._stop is None else self._stop
+
+    @property
+    def is_view(self) -> bool:
+        return self.start != 0 or self._stop is not None
+
+    def append(self, row: MyDataRow):
+        assert not self.is_view, 'Cannot append to a TransactionTable view'
+        columns = self.columns
+        columns['pk'].append(row.pk)
+        columns['timestamp'].append(to_timestamp(row.transaction_datetime))
+        columns['type_code'].append(row.transaction_type.value)
+        columns['income'].append(row.income)
+        columns['loss'].append(row.loss)
+        columns['balance'].append(row.balance)
+        columns['note'].append(row.note)
+        columns['memo'].append(row.memo)
+        columns['transaction_branch'].append(row.transaction_branch)
+
+    def extend(self, rows: Iterable[MyDataRow]):
+        for row in rows:
+            self.append(row)
+
+    def column(self, name: str) -> Sequence:
+        # Numeric columns come back as memoryviews, string columns as SequenceViews; neither copies
+        base = self.columns[name]
+        if name in TransactionTable.numeric_columns:
+            return memoryview(base)[self.start:self.stop]
+        return SequenceView(base, self.start, self.stop)
+
+    def __getattr__(self, name: str):
+        if name in TransactionTable.numeric_columns or name in TransactionTable.string_columns:
+            return self.column(name)
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self) -> Iterator[Row]:
+        columns = self.columns
+        for index in range(self.start, self.stop):
+            yield TransactionTable.Row(columns, index)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            [start, stop, step] = item.indices(len(self))
+            assert step == 1, f'{step} == 1'
+            return TransactionTable(self.columns, self.start + start, self.start + max(start, stop))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError(item)
+        return TransactionTable.Row(self.columns, self.start + item)
+
+    def take(self, indices: Iterable[int]):
+        # Gathers rows by position (relative to this table) into a new, owning table
+        indices = [self.start + index for index in indices]
+        columns = {}
+        for [name, typecode] in TransactionTable.numeric_columns.items():
+            base = self.columns[name]
+            columns[name] = array(typecode, [base[index] for index in indices])
+        for name in TransactionTable.string_columns:
+            base = self.columns[name]
+            columns[name] = [base[index] for index in indices]
+        return TransactionTable(columns)
+
+    def sorted_by(self, name: str):
+        values = self.column(name)
+        if all(values[index] <= values[index + 1] for index in range(len(values) - 1)):
+            return self
+        return self.take(sorted(range(len(values)), key=values.__getitem__))
@@ -0,0 +1,45 @@
+import collections
+import heapq
+from typing import List, Tuple
+
+from .transaction_table import TransactionTable
+
+
+class UnclassifiedReport:
+    # The rows no policy matched, kept within bounds: the top_k largest rows by amount, and a row count and an
+    # amount total per distinct note, so the notes a new policy would cover best can be read off directly
+
+    def __init__(self, top_k: int = 100):
+        self.top_k = top_k
+        self.largest_rows = []
+        self.row_count = 0
+        self.note_counts = collections.Counter()
+        self.note_amounts = collections.Counter()
+
+    @staticmethod
+    def amount(row: TransactionTable.Row) -> int:
+        return abs(row.income) + abs(row.loss)
+
+    def add(self, row: TransactionTable.Row):
+        amount = UnclassifiedReport.amount(row)
+        self.row_count += 1
+        self.note_counts[row.note] += 1
+        self.note_amounts[row.note] += amount
+        if self.top_k <= 0:
+            return
+        # row_count breaks ties between equal amounts so that rows themselves are never compared
+        entry = (amount, self.row_count, row)
+        if len(self.largest_rows) < self.top_k:
+            heapq.heappush(self.largest_rows, entry)
+        elif entry > self.largest_rows[0]:
+            heapq.heapreplace(self.largest_rows, entry)
+
+    def top_rows(self) -> List[TransactionTable.Row]:
+        # Largest amount first
+        return [row for [amount, order, row] in sorted(self.largest_rows, reverse=True)]
+
+    def top_notes_by_count(self, n: int = None) -> List[Tuple[str, int]]:
+        return self.note_counts.most_common(n)
+
+    def top_notes_by_amount(self, n: int = None) -> List[Tuple[str, int]]:
+        return self.note_amounts.most_common(n)
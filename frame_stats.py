@@ -0,0 +1,61 @@
+import collections
+import json
+import time
+from typing import Dict, Optional
+
+
+class FrameStats:
+    # Durations of the most recent frames, in seconds, split into drawing (composing the back buffer) and
+    # presenting (flipping it to the window)
+
+    def __init__(self, history: int = 1000):
+        self.frame_times = collections.deque(maxlen=history)
+        self.draw_times = collections.deque(maxlen=history)
+        self.present_times = collections.deque(maxlen=history)
+        self.frame_count = 0
+        self.started = None
+        self.drawn = None
+
+    def begin(self):
+        self.started = time.perf_counter()
+
+    def end_draw(self):
+        self.drawn = time.perf_counter()
+
+    def end(self):
+        ended = time.perf_counter()
+        self.frame_times.append(ended - self.started)
+        self.draw_times.append(self.drawn - self.started)
+        self.present_times.append(ended - self.drawn)
+        self.frame_count += 1
+
+    @staticmethod
+    def summarize(times) -> Optional[Dict[str, float]]:
+        if len(times) == 0:
+            return None
+        ordered = sorted(times)
+        return {
+            'p50': ordered[(len(ordered) - 1) * 50 // 100],
+            'p95': ordered[(len(ordered) - 1) * 95 // 100],
+            'max': ordered[-1]
+        }
+
+    def summary(self) -> dict:
+        return {
+            'frame_count': self.frame_count,
+            'frame': self.summarize(self.frame_times),
+            'draw': self.summarize(self.draw_times),
+            'present': self.summarize(self.present_times)
+        }
+
+    def overlay_lines(self) -> list:
+        lines = [f'frames: {self.frame_count}']
+        for [name, times] in self.summary().items():
+            if isinstance(times, dict):
+                lines.append('{}: p50 {:.1f}ms p95 {:.1f}ms max {:.1f}ms'.format(
+                    name, times['p50'] * 1000, times['p95'] * 1000, times['max'] * 1000))
+        return lines
+
+    def dump(self, filename: str):
+        with open(filename, 'w', encoding='utf-8') as file:
+            json.dump(self.summary(), file, indent=2)
@@ -0,0 +1,74 @@
+import concurrent.futures
+from typing import Dict, List, Optional
+
+from daegu_bank.aggregation_engine import PeriodAggregate
+from daegu_bank.monthly_statistics import MonthlyStatistics
+from daegu_bank.transaction_table import TransactionTable
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+class AccountShard:
+    # What one account's analysis sends back to the household: period spans and aggregates, no rows
+    __slots__ = ('source', 'analysis_target_dates', 'aggregates', 'row_count', 'outside_row_count',
+                 'malformed_lines')
+
+    def __init__(self, source, analysis_target_dates: dict, aggregates: Dict[str, PeriodAggregate], row_count: int,
+                 outside_row_count: int, malformed_lines: list):
+        self.source = source
+        self.analysis_target_dates = analysis_target_dates
+        self.aggregates = aggregates
+        self.row_count = row_count
+        self.outside_row_count = outside_row_count
+        self.malformed_lines = malformed_lines
+
+    def carried_aggregates(self) -> Dict[str, PeriodAggregate]:
+        # A period without rows still holds the balance the account ended the previous period with
+        carried = {}
+        balance = None
+        for date in self.analysis_target_dates:
+            aggregate = self.aggregates[date]
+            if aggregate.row_count == 0 and balance is not None:
+                aggregate = PeriodAggregate()
+                [aggregate.start_balance, aggregate.end_balance] = [balance, balance]
+            elif aggregate.row_count > 0:
+                balance = aggregate.end_balance
+            carried[date] = aggregate
+        return carried
+
+
+def analyze_account(source, cache_dir: Optional[str] = '.pfa_cache') -> AccountShard:
+    pfa = PersonalFinancialAnalyzer(source, cache_dir=cache_dir, prefetch=False)
+    return AccountShard(source, pfa.analysis_target_dates, pfa.aggregation_engine.aggregates,
+                        len(pfa.transaction_table), pfa.outside_row_count, pfa.malformed_lines)
+
+
+class HouseholdAnalyzer:
+    # Analyzes every account in its own process and merges the per-period aggregates into household statistics.
+    # Each source is whatever PersonalFinancialAnalyzer accepts for one account: a path, a glob or a list.
+
+    def __init__(self, sources: List, cache_dir: Optional[str] = '.pfa_cache', max_workers: int = None):
+        self.sources = list(sources)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            self.shards = list(executor.map(analyze_account, self.sources, [cache_dir] * len(self.sources)))
+        self.analysis_target_dates = self.shards[0].analysis_target_dates
+        self.malformed_lines = [malformed_line for shard in self.shards for malformed_line in shard.malformed_lines]
+        self.outside_row_count = sum(shard.outside_row_count for shard in self.shards)
+        self.aggregates = self.merge(self.shards)
+        self.monthly_statistics_folder = {date: self.build_monthly_statistics(date) for date in
+                                          self.analysis_target_dates}
+
+    @staticmethod
+    def merge(shards: List[AccountShard]) -> Dict[str, PeriodAggregate]:
+        # combine() is associative and commutative, so shards can be merged in any grouping and order
+        aggregates = {date: PeriodAggregate() for date in shards[0].analysis_target_dates}
+        for shard in shards:
+            for [date, aggregate] in shard.carried_aggregates().items():
+                aggregates[date].combine(aggregate)
+        return aggregates
+
+    def build_monthly_statistics(self, date: str) -> MonthlyStatistics:
+        # Household months carry no rows; their figures and classes all come from the merged aggregate
+        aggregate = self.aggregates[date]
+        return MonthlyStatistics(TransactionTable(), date=date, span=self.analysis_target_dates[date],
+                                 aggregate=aggregate, class_codes=[], class_names=list(aggregate.categories),
+                                 aggregate_only=True)
@@ -1,3 +1,6 @@
+import argparse
+import collections
+import datetime
 import math
 import os
 import sys
@@ -9,8 +12,11 @@ import pygame.gfxdraw
 import pygame.gfxdraw
 import pygame.locals
 
-from daegu_bank.classification_statistics import ClassificationStatistics
+from analysis_worker import AnalysisWorker
 from daegu_bank.monthly_statistics import MonthlyStatistics
+from daegu_bank.instrumentation import instrumentation
+from frame_stats import FrameStats
+from pie_geometry import unit_circle
 from personal_financial_analyzer import PersonalFinancialAnalyzer
 
 
@@ -19,10 +25,42 @@ class Viewer:
     client_h = 1080 * 2 // 3
     client_x = - (client_w - 1920) // 2 - 1920
     client_y = - (client_h - 1080) // 2
-
-    def __init__(self, pfa: PersonalFinancialAnalyzer):
-        self.pfa = pfa
+    background_color = [0xAf, 0xAf, 0xAf]
+    timeline_canvas = [0, client_h - 200, 300, 200]
+    # Rotates the pie so that its first slice starts towards the legend
+    pie_bias_degree = round(270) - round(math.atan2(10 - client_h / 2, client_w - 430 - client_w / 2) * 180 / math.pi)
+    idle_timeout_ms = 60 * 1000
+    # How often the window wakes up to poll for a snapshot and move the progress line while jobs are pending
+    busy_timeout_ms = 100
+    policy_check_event = pygame.USEREVENT + 1
+    policy_check_interval_ms = 1000
+
+    def __init__(self, worker: AnalysisWorker, month_layer_cache_size=8, text_cache_size=512, fps_limit=60,
+                 show_frame_stats=False, frame_stats_file=None):
+        # Frames are composed from cached layers: one per month (summary, pie and legend) and one for the timeline.
+        # They are rebuilt only when the data or the selection changes; dirty marks that the window needs a redraw.
+        # fps_limit caps redraws per second (0 for no cap); F3 toggles the frame time overlay and frame_stats_file
+        # receives a frame time summary on exit. +/- zoom the timeline, the arrow keys pan it and Home resets it.
+        # Analysis runs on worker's thread: the window draws the latest snapshot it published, swapping to a newer
+        # one between frames, and shows a progress line while jobs are pending. F5 and policy file edits (checked
+        # about once a second) only queue jobs.
+        self.worker = worker
+        self.snapshot = None
+        self.drawn_progress = False
         self.running = True
+        self.dirty = True
+        self.drawn_day = None
+        self.fps_limit = fps_limit
+        self.frame_stats = FrameStats()
+        self.show_frame_stats = show_frame_stats
+        self.frame_stats_file = frame_stats_file
+        self.month_layers = collections.OrderedDict()
+        self.month_layer_cache_size = month_layer_cache_size
+        self.timeline_layer = None
+        self.timeline_zoom = None
+        self.text_cache = collections.OrderedDict()
+        self.text_cache_size = text_cache_size
+        [self.good_colors, self.bad_colors] = self.build_palettes()
         os.environ['SDL_VIDEO_WINDOW_POS'] = f'{Viewer.client_x},{Viewer.client_y}'
         pygame.init()
 
@@ -34,47 +72,102 @@ class Viewer:
         pygame.display.init()
         pygame.display.set_mode([Viewer.client_w, Viewer.client_h])
         self.surf = pygame.display.get_surface()
+        self.canvas = self.surf
 
         self.selected_date_index = 0
+        self.swap_snapshot()
 
         def filled_pie(surface, x, y, r, start_angle, stop_angle, color):
-            polygon = [[x, y]]
-            delta_radian = (stop_angle - start_angle) / 180 * math.pi
-            precision = max(30, int(abs(stop_angle - start_angle)))
-            for z in range(precision + 1):
-                polygon.append(([
-                    x + int(math.cos(z / precision * delta_radian + start_angle / 180 * math.pi) * r),
-                    y + int(math.sin(z / precision * delta_radian + start_angle / 180 * math.pi) * r)
-                ]))
-            pygame.gfxdraw.filled_polygon(surface, polygon, color)
+            pygame.gfxdraw.filled_polygon(surface, unit_circle.pie(x, y, r, start_angle, stop_angle), color)
             # pygame.gfxdraw.pie(surface, x, y, r, start_angle, stop_angle, color)
 
         pygame.gfxdraw.filled_pie = filled_pie
 
     @property
     def target_date(self) -> str:
-        return [k for k in pfa.analysis_target_dates.keys()][self.selected_date_index]
+        return self.snapshot.dates[self.selected_date_index]
 
     @property
     def monthly_statistics(self) -> MonthlyStatistics:
-        return pfa.monthly_statistics_folder[self.target_date]
+        return self.snapshot.monthly_statistics[self.target_date]
+
+    def swap_snapshot(self):
+        snapshot = self.worker.latest()
+        if snapshot is None:
+            return
+        if self.snapshot is None and snapshot.policy_file is not None:
+            pygame.time.set_timer(Viewer.policy_check_event, Viewer.policy_check_interval_ms)
+        self.snapshot = snapshot
+        self.selected_date_index = min(self.selected_date_index, len(snapshot.dates) - 1)
+        self.month_layers.clear()
+        self.timeline_layer = None
+        self.dirty = True
 
     def button_up_target_date(self):
-        if self.selected_date_index + 1 < len(pfa.analysis_target_dates):
+        if self.snapshot is not None and self.selected_date_index + 1 < len(self.snapshot.dates):
             self.selected_date_index += 1
+            self.dirty = True
 
     def button_down_target_date(self):
         if self.selected_date_index > 0:
             self.selected_date_index -= 1
+            self.dirty = True
+
+    @property
+    def timeline_span(self) -> list:
+        # Seconds since the first row shown across the timeline; by default the whole ledger fills three quarters
+        if self.timeline_zoom is None:
+            return [0, self.snapshot.total_seconds / 0.75]
+        return self.timeline_zoom
+
+    def zoom_timeline(self, scale: float):
+        [start_t, stop_t] = self.timeline_span
+        center = (start_t + stop_t) / 2
+        half_width = max(3600.0, (stop_t - start_t) * scale / 2)
+        self.timeline_zoom = [center - half_width, center + half_width]
+        self.timeline_layer = None
+        self.dirty = True
+
+    def pan_timeline(self, fraction: float):
+        [start_t, stop_t] = self.timeline_span
+        shift = (stop_t - start_t) * fraction
+        self.timeline_zoom = [start_t + shift, stop_t + shift]
+        self.timeline_layer = None
+        self.dirty = True
+
+    def reset_timeline(self):
+        self.timeline_zoom = None
+        self.timeline_layer = None
+        self.dirty = True
+
+    def button_refresh(self):
+        self.worker.refresh()
+        self.dirty = True
+
+    def check_policies(self):
+        # Skipped while jobs are pending, so that checks never pile up behind a long job
+        if not self.worker.busy:
+            self.worker.reload_policies()
 
     def main_loop(self):
         self.event_step()
         pygame.font.quit()
         pygame.quit()
+        if self.frame_stats_file is not None:
+            self.frame_stats.dump(self.frame_stats_file)
 
     def event_step(self):
+        clock = pygame.time.Clock()
         while self.running:
-            for e in pygame.event.get():
+            if self.dirty:
+                events = pygame.event.get()
+            elif self.worker.busy:
+                events = [pygame.event.wait(Viewer.busy_timeout_ms)] + pygame.event.get()
+                self.dirty = True
+            else:
+                # Nothing to redraw: sleep until an event arrives, waking up once in a while to notice a new day
+                events = [pygame.event.wait(Viewer.idle_timeout_ms)] + pygame.event.get()
+            for e in events:
                 if e.type == pygame.locals.QUIT:
                     self.running = False
                 elif e.type == pygame.locals.KEYUP:
@@ -84,20 +177,107 @@ class Viewer:
                         self.button_up_target_date()
                     elif e.key == pygame.locals.K_PAGEUP:
                         self.button_down_target_date()
-            self.surf.fill([0xAf, 0xAf, 0xAf])
-            self.event_draw()
-            pygame.display.update()
+                    elif e.key == pygame.locals.K_F5:
+                        self.button_refresh()
+                    elif e.key in [pygame.locals.K_EQUALS, pygame.locals.K_KP_PLUS]:
+                        self.zoom_timeline(0.5)
+                    elif e.key in [pygame.locals.K_MINUS, pygame.locals.K_KP_MINUS]:
+                        self.zoom_timeline(2)
+                    elif e.key == pygame.locals.K_LEFT:
+                        self.pan_timeline(-0.25)
+                    elif e.key == pygame.locals.K_RIGHT:
+                        self.pan_timeline(0.25)
+                    elif e.key == pygame.locals.K_HOME:
+                        self.reset_timeline()
+                    elif e.key == pygame.locals.K_F3:
+                        self.show_frame_stats = not self.show_frame_stats
+                        self.dirty = True
+                elif e.type == Viewer.policy_check_event:
+                    self.check_policies()
+                elif e.type in [pygame.locals.VIDEOEXPOSE, pygame.locals.ACTIVEEVENT]:
+                    self.dirty = True
+            self.swap_snapshot()
+            if self.drawn_progress and not self.worker.busy:
+                self.dirty = True
+            if self.drawn_day != datetime.date.today():
+                self.dirty = True
+                # The forecasts on screen start from the day they were simulated on
+                if self.snapshot is not None and self.snapshot.forecast_day != datetime.date.today():
+                    self.worker.refresh_forecasts()
+            if self.dirty and self.running:
+                self.frame_stats.begin()
+                self.drawn_day = datetime.date.today()
+                if self.snapshot is not None:
+                    self.surf.blit(self.month_layer(), [0, 0])
+                    self.surf.blit(self.timeline(), Viewer.timeline_canvas[:2], area=Viewer.timeline_canvas)
+                else:
+                    self.surf.fill(Viewer.background_color)
+                self.draw_progress()
+                if self.show_frame_stats:
+                    for [index, line] in enumerate(self.frame_stats.overlay_lines()):
+                        self.draw_h3(line, 4, Viewer.client_h - 280 + 18 * index, background=[255, 255, 255])
+                self.frame_stats.end_draw()
+                pygame.display.update()
+                self.frame_stats.end()
+                self.dirty = False
+                clock.tick(self.fps_limit)
+
+    def draw_progress(self):
+        progress_text = self.worker.progress_text()
+        self.drawn_progress = progress_text is not None
+        if progress_text is not None:
+            self.draw_h3(f'분석 중: {progress_text}', 4, Viewer.client_h - 20, background=[255, 255, 255])
+        elif self.worker.error is not None:
+            self.draw_h3(self.worker.error, 4, Viewer.client_h - 20, color=[150, 0, 0], background=[255, 255, 255])
+
+    def month_layer(self) -> pygame.Surface:
+        # Keyed by today as well, since the days left in a month change at midnight
+        key = (self.snapshot.version, self.target_date, datetime.date.today())
+        layer = self.month_layers.get(key)
+        if layer is None:
+            with instrumentation.stage('render.month_layer'):
+                layer = self.month_layers[key] = self.render_layer(self.event_draw)
+            while len(self.month_layers) > self.month_layer_cache_size:
+                self.month_layers.popitem(last=False)
+        self.month_layers.move_to_end(key)
+        return layer
+
+    def timeline(self) -> pygame.Surface:
+        if self.timeline_layer is None:
+            with instrumentation.stage('render.timeline'):
+                self.timeline_layer = self.render_layer(self.render_graph)
+        return self.timeline_layer
+
+    def render_layer(self, draw) -> pygame.Surface:
+        layer = pygame.Surface([Viewer.client_w, Viewer.client_h]).convert()
+        layer.fill(Viewer.background_color)
+        self.canvas = layer
+        try:
+            draw()
+        finally:
+            self.canvas = self.surf
+        return layer
+
+    def render_text(self, font: pygame.font.Font, text: str, color, background) -> pygame.Surface:
+        key = (font, text, tuple(color), tuple(background) if background is not None else None)
+        font_surf = self.text_cache.get(key)
+        if font_surf is None:
+            font_surf = self.text_cache[key] = font.render(text, True, color, background)
+            while len(self.text_cache) > self.text_cache_size:
+                self.text_cache.popitem(last=False)
+        self.text_cache.move_to_end(key)
+        return font_surf
 
     def draw_text(self, font: pygame.font.Font, text: str, x: int, y: int, color=None, background=None, center=False):
         if color is None:
             color = [0, 0, 0]
-        font_surf = font.render(str(text), True, color, background)
+        font_surf = self.render_text(font, str(text), color, background)
         pos = [x, y]
         if center:
             rect = font_surf.get_rect()
             pos[0] -= rect[2] // 2
             pos[1] -= rect[3] // 2
-        self.surf.blit(font_surf, pos)
+        self.canvas.blit(font_surf, pos)
 
     def draw_h1(self, text, x, y, **kwargs):
         self.draw_text(self.font_title, text, x, y, **kwargs)
@@ -146,26 +326,19 @@ class Viewer:
                                 self.monthly_statistics.end_balance - self.monthly_statistics.start_balance) / self.monthly_statistics.left_day_count)
             self.draw_h3('일일소진액(이월잔액 도달): {: >12,}원'.format(x), 4, 140 + 18 * 7,
                          color=[0, 0, 0] if x > 0 else [255, 0, 0])
+        forecast = self.snapshot.forecasts.get(self.target_date)
+        if forecast is not None:
+            self.draw_h3('예상종료예금(5~95%): {:,}~{:,}원'.format(forecast.bands[5], forecast.bands[95]), 4,
+                         140 + 18 * 8)
+            self.draw_h3('전액소진확률: {:.1%}'.format(forecast.below_probability), 4, 140 + 18 * 9,
+                         color=[0, 0, 0] if forecast.below_probability < 0.05 else [255, 0, 0])
 
-        self.render_pie_graph()
-        self.render_graph()
+        self.render_pie_graph(total_abstract_balance)
 
         pass
 
-    def render_pie_graph(self):
-        total_abstract_balance = sum([abs(classified_transaction.balance) \
-                                      for classified_transaction in
-                                      self.monthly_statistics.classification_statistics.classified_transactions_folder.values()])
-        total_abstract_balance += self.monthly_statistics.start_balance
-        increment_abstract_balance = 0
-        graph_radius = int(Viewer.client_h * 0.9 / 2)
-        graph_center = [Viewer.client_w // 2, Viewer.client_h // 2]
-
-        # pygame.draw.circle(self.surf, (200, 200, 200), graph_center, graph_radius)
-
-        text_buffer = []
-        outline_y = 10
-
+    @staticmethod
+    def build_palettes():
         good_colors = []
         bad_colors = []
         main_tone = 255
@@ -181,14 +354,27 @@ class Viewer:
                         [main_tone - x * main_linear, sub_tone - y * sub_linear, sub_tone - z * sub_linear])
         good_colors.sort(key=lambda t: t[0] + t[1] * 2 + t[2])
         bad_colors.sort(key=lambda t: t[0] * 2 + t[1] + t[2])
+        return good_colors, bad_colors
+
+    def render_pie_graph(self, total_abstract_balance):
+        total_abstract_balance += self.monthly_statistics.start_balance
+        increment_abstract_balance = 0
+        graph_radius = int(Viewer.client_h * 0.9 / 2)
+        graph_center = [Viewer.client_w // 2, Viewer.client_h // 2]
+
+        # pygame.draw.circle(self.canvas, (200, 200, 200), graph_center, graph_radius)
+
+        text_buffer = []
+        outline_y = 10
+
+        [good_colors, bad_colors] = [iter(self.good_colors), iter(self.bad_colors)]
 
         for [class_name,
              classified_transaction] in sorted(
             self.monthly_statistics.classification_statistics.classified_transactions_folder.items(),
             key=lambda item: abs(item[1].balance)):
             abstract_balance = abs(classified_transaction.balance)
-            bias_degree = round(270) - round(
-                math.atan2(10 - Viewer.client_h / 2, Viewer.client_w - 430 - Viewer.client_w / 2) * 180 / math.pi)
+            bias_degree = Viewer.pie_bias_degree
             start_degree = round(increment_abstract_balance / total_abstract_balance * 360)
             end_degree = round((increment_abstract_balance + abstract_balance) / total_abstract_balance * 360)
             mid_degree = (start_degree + end_degree) / 2
@@ -200,22 +386,18 @@ class Viewer:
                 pie_color = [90, 90, 90]
             else:
                 if classified_transaction.balance > 0:
-                    pie_color = good_colors[0]
-                    del good_colors[0]
+                    pie_color = next(good_colors)
                 else:
-                    pie_color = bad_colors[0]
-                    del bad_colors[0]
+                    pie_color = next(bad_colors)
 
-            text_center = [int(round(p)) for p in [
-                graph_center[0] + graph_radius * 0.7 * math.cos((mid_degree + bias_degree) / 180 * math.pi),
-                graph_center[1] + graph_radius * 0.7 * math.sin((mid_degree + bias_degree) / 180 * math.pi)
-            ]]
+            text_center = [int(round(p)) for p in
+                           unit_circle.point(*graph_center, graph_radius * 0.7, mid_degree + bias_degree)]
 
             if delta_degree > 360 * 0.05:
-                pygame.gfxdraw.filled_pie(self.surf, graph_center[0], graph_center[1], graph_radius,
+                pygame.gfxdraw.filled_pie(self.canvas, graph_center[0], graph_center[1], graph_radius,
                                           start_degree + bias_degree,
                                           end_degree + bias_degree, pie_color)
-                # pygame.gfxdraw.pie(self.surf, graph_center[0], graph_center[1], graph_radius,
+                # pygame.gfxdraw.pie(self.canvas, graph_center[0], graph_center[1], graph_radius,
                 #                   start_degree + bias_degree, end_degree + bias_degree,
                 #                   [100, 255, 100] if classified_transaction.balance > 0 else [255, 100, 100])
                 text_buffer.append({
@@ -227,24 +409,24 @@ class Viewer:
                 })
 
                 if classified_transaction.income > 0 and classified_transaction.loss > 0:
-                    font_rect = self.font_small_title.render(class_name, False, [0, 0, 0]).get_rect()
+                    font_rect = pygame.Rect([0, 0], self.font_small_title.size(class_name))
                     font_rect[0] += text_center[0] - font_rect[2] // 2
                     font_rect[1] += text_center[1] - 12 + font_rect[3] // 2
                     green_bar_width = classified_transaction.income / (
                             classified_transaction.income + classified_transaction.loss)
-                    pygame.draw.rect(self.surf, [0, 255, 0], [
+                    pygame.draw.rect(self.canvas, [0, 255, 0], [
                         font_rect[0], font_rect[1],
                         int(font_rect[2] * green_bar_width), 2
                     ])
-                    pygame.draw.rect(self.surf, [255, 0, 0], [
+                    pygame.draw.rect(self.canvas, [255, 0, 0], [
                         font_rect[0] + int(font_rect[2] * green_bar_width), font_rect[1],
                         int(font_rect[2] * (1 - green_bar_width)), 2
                     ])
             elif delta_degree / 360 * 100 >= 0.01:
-                pygame.gfxdraw.filled_pie(self.surf, graph_center[0], graph_center[1], graph_radius,
+                pygame.gfxdraw.filled_pie(self.canvas, graph_center[0], graph_center[1], graph_radius,
                                           start_degree + bias_degree,
                                           end_degree + bias_degree, pie_color)
-                '''pygame.gfxdraw.pie(self.surf, graph_center[0], graph_center[1], graph_radius,
+                '''pygame.gfxdraw.pie(self.canvas, graph_center[0], graph_center[1], graph_radius,
                                    start_degree + bias_degree,
                                    end_degree + bias_degree,
                                    [100, 255, 100] if classified_transaction.balance > 0 else [255, 100, 100])'''
@@ -256,34 +438,29 @@ class Viewer:
                 self.draw_h3(target_text, Viewer.client_w - 250, outline_y,
                              background=pie_color)
 
-                circle_end_point = [
-                    graph_center[0] + graph_radius * math.cos((mid_degree + bias_degree) / 180 * math.pi),
-                    graph_center[1] + graph_radius * math.sin((mid_degree + bias_degree) / 180 * math.pi)
-                ]
+                circle_end_point = unit_circle.point(*graph_center, graph_radius, mid_degree + bias_degree)
 
-                circle_extend_point = [
-                    graph_center[0] + (graph_radius + 32) * math.cos((mid_degree + bias_degree) / 180 * math.pi),
-                    graph_center[1] + (graph_radius + 32) * math.sin((mid_degree + bias_degree) / 180 * math.pi)
-                ]
+                circle_extend_point = unit_circle.point(*graph_center, graph_radius + 32,
+                                                        mid_degree + bias_degree)
 
                 text_point = [Viewer.client_w - 250, outline_y + 10]
 
-                pygame.draw.line(self.surf, [0, 0, 0], [int(f) for f in circle_end_point],
+                pygame.draw.line(self.canvas, [0, 0, 0], [int(f) for f in circle_end_point],
                                  [int(f) for f in circle_extend_point])
-                pygame.draw.line(self.surf, [0, 0, 0], [int(f) for f in circle_extend_point],
+                pygame.draw.line(self.canvas, [0, 0, 0], [int(f) for f in circle_extend_point],
                                  [int(f) for f in text_point])
 
                 if classified_transaction.income > 0 and classified_transaction.loss > 0:
-                    font_rect = self.font_desc.render(target_text, False, [0, 0, 0]).get_rect()
+                    font_rect = pygame.Rect([0, 0], self.font_desc.size(target_text))
                     font_rect[0] += text_point[0] + 5
                     font_rect[1] += text_point[1] + font_rect[3] // 2 - 2
                     green_bar_width = classified_transaction.income / (
                             classified_transaction.income + classified_transaction.loss)
-                    pygame.draw.rect(self.surf, [0, 255, 0], [
+                    pygame.draw.rect(self.canvas, [0, 255, 0], [
                         font_rect[0], font_rect[1],
                         int(font_rect[2] * green_bar_width), 2
                     ])
-                    pygame.draw.rect(self.surf, [255, 0, 0], [
+                    pygame.draw.rect(self.canvas, [255, 0, 0], [
                         font_rect[0] + int(font_rect[2] * green_bar_width), font_rect[1],
                         int(font_rect[2] * (1 - green_bar_width)), 2
                     ])
@@ -293,19 +470,16 @@ class Viewer:
             increment_abstract_balance += abstract_balance
         if self.monthly_statistics.start_balance / total_abstract_balance >= 0.01:  # Draw balance
             abstract_balance = abs(self.monthly_statistics.start_balance)
-            bias_degree = round(270) - round(
-                math.atan2(10 - Viewer.client_h / 2, Viewer.client_w - 430 - Viewer.client_w / 2) * 180 / math.pi)
+            bias_degree = Viewer.pie_bias_degree
             start_degree = round(increment_abstract_balance / total_abstract_balance * 360)
             end_degree = round((increment_abstract_balance + abstract_balance) / total_abstract_balance * 360)
-            pygame.gfxdraw.filled_pie(self.surf, graph_center[0], graph_center[1], graph_radius,
+            pygame.gfxdraw.filled_pie(self.canvas, graph_center[0], graph_center[1], graph_radius,
                                       start_degree + bias_degree,
                                       end_degree + bias_degree, [200, 200, 200])
             delta_degree = end_degree - start_degree
             mid_degree = (start_degree + end_degree) / 2
-            text_center = [int(round(p)) for p in [
-                graph_center[0] + graph_radius * 0.7 * math.cos((mid_degree + bias_degree) / 180 * math.pi),
-                graph_center[1] + graph_radius * 0.7 * math.sin((mid_degree + bias_degree) / 180 * math.pi)
-            ]]
+            text_center = [int(round(p)) for p in
+                           unit_circle.point(*graph_center, graph_radius * 0.7, mid_degree + bias_degree)]
             text_buffer.append({
                 'x': text_center[0],
                 'y': text_center[1],
@@ -320,45 +494,74 @@ class Viewer:
                          text_data['y'] + 12, center=True)
 
     def render_graph(self):
-        canvas = [0, Viewer.client_h - 200, 300, 200]
-        pygame.draw.rect(self.surf, (255, 255, 255), canvas)
+        canvas = Viewer.timeline_canvas
+        pygame.draw.rect(self.canvas, (255, 255, 255), canvas)
         for x in range(3):
-            pygame.draw.line(self.surf, (80, 80, 80), (canvas[0], canvas[1] + int(canvas[3] * (x + 1) / 4)), (
+            pygame.draw.line(self.canvas, (80, 80, 80), (canvas[0], canvas[1] + int(canvas[3] * (x + 1) / 4)), (
                 canvas[0] + canvas[2], canvas[1] + int(canvas[3] * (x + 1) / 4)), 2)
         for x in range(23):
-            pygame.draw.line(self.surf, (160, 160, 160), (canvas[0], canvas[1] + int(canvas[3] * (x + 1) / 20)), (
+            pygame.draw.line(self.canvas, (160, 160, 160), (canvas[0], canvas[1] + int(canvas[3] * (x + 1) / 20)), (
                 canvas[0] + canvas[2], canvas[1] + int(canvas[3] * (x + 1) / 20)))
 
         '''x = ((self.monthly_statistics.start_date - self.pfa.start_datetime).total_seconds() / (
                 self.pfa.end_datetime - self.pfa.start_datetime
         ).total_seconds() * 0.75
         if 0 < x < 1:
-            pygame.draw.line(self.surf, (80, 80, 80), (canvas[0] + int(canvas[2] * x), canvas[1]),
+            pygame.draw.line(self.canvas, (80, 80, 80), (canvas[0] + int(canvas[2] * x), canvas[1]),
                              (canvas[0] + int(canvas[2] * x), canvas[1] + canvas[3]))
         x = (datetime.datetime(self.monthly_statistics.end_date, 0) - self.pfa.start_datetime).total_seconds() / (
                 self.pfa.end_datetime - self.pfa.start_datetime
         ).total_seconds() * 0.75'''
         if 0 < x < 1:
-            pygame.draw.line(self.surf, (80, 80, 80), (canvas[0] + int(canvas[2] * x), canvas[1]),
+            pygame.draw.line(self.canvas, (80, 80, 80), (canvas[0] + int(canvas[2] * x), canvas[1]),
                              (canvas[0] + int(canvas[2] * x), canvas[1] + canvas[3]))
 
-        last_point = [canvas[0], canvas[1] + int(canvas[3] * (1 - self.pfa.deposit_size_timeline[0]['y'] / 4000000))]
-        for timeline in self.pfa.deposit_size_timeline:
-            new_point = [canvas[0] + int(canvas[2] * timeline['x'] * 0.75),
-                         canvas[1] + int(canvas[3] * (1 - timeline['y'] / 4000000))]
-            pygame.draw.line(self.surf, (80, 255, 80) if -new_point[1] >= -last_point[1] else (255, 80, 80),
+        # The pyramid hands back about two points per pixel of the visible span, extremes included
+        [start_t, stop_t] = self.timeline_span
+        last_point = None
+        for [t, y] in self.snapshot.timeline_pyramid.query(start_t, stop_t, canvas[2]):
+            new_point = [canvas[0] + int(canvas[2] * (t - start_t) / (stop_t - start_t)),
+                         canvas[1] + int(canvas[3] * (1 - y / 4000000))]
+            if last_point is None:
+                last_point = new_point
+            pygame.draw.line(self.canvas, (80, 255, 80) if -new_point[1] >= -last_point[1] else (255, 80, 80),
                              last_point, new_point, 2)
             last_point = new_point
 
 
-try:
-    pfa = PersonalFinancialAnalyzer()
-    for x in sorted(ClassificationStatistics.unclassified_rows, key=lambda row: abs(row.income) + abs(row.loss)):
-        if abs(x.income) + abs(x.loss) >= 10:
-            print(f'"{x}"')
-    viewer = Viewer(pfa)
-    viewer.main_loop()
-except:
-    sys.stdout.flush()
-    time.sleep(0.01)
-    print(traceback.format_exc(), file=sys.stderr)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fps', type=int, default=60, help='redraw at most this many times a second, 0 for no cap')
+    parser.add_argument('--frame-stats', help='write a frame time summary (p50/p95/max) to this JSON file on exit')
+    parser.add_argument('--trace', help='write stage timings and counters to this JSON file (or set PFA_TRACE)')
+    parser.add_argument('--profile-stage', help='also run this stage under cProfile (or set PFA_PROFILE)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record peak memory per stage, which slows stages down (or set PFA_TRACE_MEMORY)')
+    parser.add_argument('--policies', help='classify with this policy file instead of defs.py and apply its edits live')
+    args = parser.parse_args()
+    if args.trace is not None:
+        instrumentation.enable(args.trace, args.profile_stage, args.trace_memory)
+    try:
+        def analyze() -> PersonalFinancialAnalyzer:
+            # Runs on the worker's thread while the window is already up
+            pfa = PersonalFinancialAnalyzer(policy_file=args.policies, prefetch=False)
+            for [filename, line_number, line, reason] in pfa.malformed_lines:
+                print(f'{filename}:{line_number}: {reason}: "{line}"', file=sys.stderr)
+            if pfa.outside_row_count > 0:
+                print(f'{pfa.outside_row_count} rows fall outside every analysis period', file=sys.stderr)
+            for x in reversed(pfa.unclassified_report.top_rows()):
+                if abs(x.income) + abs(x.loss) >= 10:
+                    print(f'"{x}"')
+            for [note, count] in pfa.unclassified_report.top_notes_by_count(20):
+                print(f'{count: 6,} rows {pfa.unclassified_report.note_amounts[note]: 14,}원 "{note}"')
+            return pfa
+
+        worker = AnalysisWorker()
+        worker.analyze(analyze)
+        viewer = Viewer(worker, fps_limit=args.fps, frame_stats_file=args.frame_stats)
+        viewer.main_loop()
+        worker.stop()
+    except:
+        sys.stdout.flush()
+        time.sleep(0.01)
+        print(traceback.format_exc(), file=sys.stderr)
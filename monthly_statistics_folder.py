@@ -0,0 +1,88 @@
+import collections
+import collections.abc
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from daegu_bank.monthly_statistics import MonthlyStatistics
+
+
+class MonthlyStatisticsFolder(collections.abc.Mapping):
+    # A date -> MonthlyStatistics mapping that builds each month on first access and keeps the most recently
+    # used ones. max_entries caps the number of cached months and max_rows the rows they cover together;
+    # prefetch builds the months next to an accessed one on a background thread. The month accessed last is pinned:
+    # no prefetched neighbour evicts it, and a neighbour that only fits by doing so is dropped again.
+
+    def __init__(self, dates: Iterable[str], build: Callable[[str], MonthlyStatistics],
+                 max_entries: Optional[int] = None, max_rows: Optional[int] = None, prefetch: bool = True):
+        self.dates = list(dates)
+        self.positions = {date: position for [position, date] in enumerate(self.dates)}
+        self.build = build
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.cache = collections.OrderedDict()
+        # Held while a month is built, so that the analyzer can keep the tables still while it changes them
+        self.lock = threading.RLock()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch') if prefetch else None
+        self.pinned: Optional[str] = None
+        # Months submitted for prefetching and not built yet, so that none is submitted twice
+        self.in_flight = set()
+        self.in_flight_lock = threading.Lock()
+
+    def __getitem__(self, date: str) -> MonthlyStatistics:
+        if date not in self.positions:
+            raise KeyError(date)
+        self.pinned = date
+        monthly_statistics = self.get_or_build(date)
+        if self.executor is not None:
+            position = self.positions[date]
+            for neighbour in self.dates[max(0, position - 1):position + 2]:
+                with self.in_flight_lock:
+                    if neighbour in self.cache or neighbour in self.in_flight:
+                        continue
+                    self.in_flight.add(neighbour)
+                self.executor.submit(self.prefetch, neighbour)
+        return monthly_statistics
+
+    def prefetch(self, date: str):
+        try:
+            self.get_or_build(date)
+        finally:
+            with self.in_flight_lock:
+                self.in_flight.discard(date)
+
+    def get_or_build(self, date: str) -> MonthlyStatistics:
+        with self.lock:
+            monthly_statistics = self.cache.get(date)
+            if monthly_statistics is None:
+                monthly_statistics = self.cache[date] = self.build(date)
+                self.evict(keep=date)
+            else:
+                self.cache.move_to_end(date)
+            return monthly_statistics
+
+    def evict(self, keep: str):
+        # Drops least recently used months until both limits hold again, never the pinned one nor the one just
+        # built; when only those two are left, the one just built goes unless it is the pinned one
+        while len(self.cache) > 1:
+            over_entries = self.max_entries is not None and len(self.cache) > self.max_entries
+            over_rows = self.max_rows is not None and \
+                sum(len(monthly_statistics.data) for monthly_statistics in self.cache.values()) > self.max_rows
+            if not over_entries and not over_rows:
+                break
+            oldest = next((date for date in self.cache if date not in [keep, self.pinned]), None)
+            if oldest is None:
+                if keep != self.pinned:
+                    del self.cache[keep]
+                break
+            del self.cache[oldest]
+
+    def cached(self, date: str) -> Optional[MonthlyStatistics]:
+        # The month if it is already built, without building it or marking it as used
+        return self.cache.get(date)
+
+    def __iter__(self):
+        return iter(self.dates)
+
+    def __len__(self):
+        return len(self.dates)
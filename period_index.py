@@ -0,0 +1,50 @@
+import bisect
+from array import array
+from typing import List, Optional, Sequence, Tuple
+
+from daegu_bank.mydata_reader import epoch_ordinal
+
+
+class PeriodIndex:
+    # Payday spans as sorted boundary arrays of day ordinals, so a day is assigned in O(log periods)
+
+    def __init__(self, analysis_target_dates: dict):
+        periods = sorted(analysis_target_dates.items(), key=lambda item: item[1][0])
+        self.dates = [date for [date, span] in periods]
+        self.start_ordinals = array('l', [span[0].toordinal() for [date, span] in periods])
+        self.end_ordinals = array('l', [span[1].toordinal() for [date, span] in periods])
+        for index in range(1, len(periods)):
+            assert self.end_ordinals[index - 1] < self.start_ordinals[index], \
+                f'{self.dates[index - 1]} and {self.dates[index]} overlap'
+
+    def find(self, timestamp: int) -> Optional[int]:
+        # Returns the position of the period that contains the timestamp, or None
+        ordinal = timestamp // 86400 + epoch_ordinal
+        index = bisect.bisect_right(self.start_ordinals, ordinal) - 1
+        if index >= 0 and ordinal <= self.end_ordinals[index]:
+            return index
+        return None
+
+    def bounds(self) -> Tuple[int, int]:
+        # The [start, stop) timestamps covering every period
+        return ((self.start_ordinals[0] - epoch_ordinal) * 86400,
+                (self.end_ordinals[-1] + 1 - epoch_ordinal) * 86400)
+
+    def split(self, timestamps: Sequence[int]) -> Tuple[List[Tuple[int, int]], int]:
+        # For timestamps sorted ascending: one linear pass giving a [start, stop) row range per period,
+        # plus the number of rows that fall outside every period
+        ranges = []
+        position = 0
+        outside_row_count = 0
+        for index in range(len(self.dates)):
+            start_timestamp = (self.start_ordinals[index] - epoch_ordinal) * 86400
+            stop_timestamp = (self.end_ordinals[index] + 1 - epoch_ordinal) * 86400
+            while position < len(timestamps) and timestamps[position] < start_timestamp:
+                position += 1
+                outside_row_count += 1
+            start = position
+            while position < len(timestamps) and timestamps[position] < stop_timestamp:
+                position += 1
+            ranges.append((start, position))
+        outside_row_count += len(timestamps) - position
+        return ranges, outside_row_count
@@ -1,70 +1,520 @@
-import calendar
 import datetime
+import os
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
 import defs
+from balance_forecast import BalanceForecast, BalanceForecaster
+from business_calendar import business_calendar
+from daegu_bank.aggregation_engine import AggregationEngine, PeriodAggregate
+from daegu_bank.binary_ledger import BinaryLedger, is_binary_ledger
+from daegu_bank.classification_statistics import ClassificationStatistics
+from daegu_bank.instrumentation import instrumentation
 from daegu_bank.monthly_statistics import MonthlyStatistics
-from daegu_bank.mydata_row import MyDataRow
+from daegu_bank.mydata_reader import MyDataReader, ReadPosition, expand_sources, load_my_data_tables
+from daegu_bank.policy_set import PolicySet
+from daegu_bank.transaction_table import SequenceView, TransactionTable, from_timestamp, to_timestamp
+from daegu_bank.unclassified_report import UnclassifiedReport
+from monthly_statistics_folder import MonthlyStatisticsFolder
+from period_index import PeriodIndex
+from range_index import RangeIndex
+from rolling_window import RollingWindows
+from row_index import RowIndex
+from snapshot_cache import SnapshotCache
+from timeline_pyramid import TimelinePyramid
 
 
 class PersonalFinancialAnalyzer:
-    calendar = calendar.Calendar()
+    # Pay arrives on this day of the month, or the business day before it; the analysis periods start there
+    payday_of_month = 21
 
-    def __init__(self):
-        my_data_rows = self.load_my_data('mydata.txt')
+    def __init__(self, filename='mydata.txt', cache_dir: Optional[str] = '.pfa_cache',
+                 max_cached_months: Optional[int] = None, max_cached_rows: Optional[int] = None,
+                 prefetch: bool = True, unclassified_top_k: int = 100, policy_file: Optional[str] = None):
+        # filename may also be a glob pattern or a list of exports, which are parsed in parallel.
+        # Results are cached in cache_dir until the exports or defs.py change; pass None to always reparse.
+        # Monthly statistics are built on first access; see MonthlyStatisticsFolder for the cache limits.
+        # unclassified_report keeps the unclassified_top_k largest rows no policy matched; it is built on first use.
+        # A binary ledger (see daegu_bank.binary_ledger) is memory-mapped instead of parsed; its snapshot keeps only
+        # what was derived from the rows, which are mapped again on restore.
+        # policy_file names a policy file (see daegu_bank.policy_set) to classify with instead of defs.py;
+        # reload_policies() picks up edits to it.
+        # With filename None nothing is analyzed until analyze() is called.
         self.analysis_target_dates = self.define_analysis_target_dates()
-        self.deposit_size_timeline = []
-
-        my_data_rows_group_by_date = {k: [] for k in self.analysis_target_dates}
-
-        total_seconds = (my_data_rows[-1].transaction_datetime - my_data_rows[0].transaction_datetime).total_seconds()
-        for row in my_data_rows:
-            date = row.transaction_datetime.date()
-            for [target_date, target_span] in self.analysis_target_dates.items():
-                if target_span[0] <= date <= target_span[1]:
-                    my_data_rows_group_by_date[target_date].append(row)
-                    self.deposit_size_timeline.append({
-                        'x': (row.transaction_datetime - my_data_rows[
-                            0].transaction_datetime).total_seconds() / total_seconds,
-                        'y': row.balance
-                    })
-                    break
-        self.start_datetime = my_data_rows[0].transaction_datetime
-        self.end_datetime = my_data_rows[-1].transaction_datetime
-        self.monthly_statistics_folder = {
-            date: MonthlyStatistics(my_data_rows_group_by_date[date], date=date, span=span) for
-            [date, span] in self.analysis_target_dates.items()}
+        self.policy_file = policy_file
+        self.policy_mtime_ns = os.stat(policy_file).st_mtime_ns if policy_file is not None else None
+        self.policy_set = PolicySet.load(policy_file) if policy_file is not None else \
+            ClassificationStatistics.default_policy_set()
+        self.unclassified_top_k = unclassified_top_k
+        self.monthly_statistics_folder = MonthlyStatisticsFolder(self.analysis_target_dates,
+                                                                 self.build_monthly_statistics,
+                                                                 max_entries=max_cached_months,
+                                                                 max_rows=max_cached_rows, prefetch=prefetch)
+        if filename is None:
+            return
+
+        sources = expand_sources(filename)
+        snapshot_cache = SnapshotCache(cache_dir) if cache_dir is not None else None
+        if snapshot_cache is not None:
+            snapshot_key = snapshot_cache.key(sources, policy_file)
+            with instrumentation.stage('snapshot.load'):
+                snapshot = snapshot_cache.load(snapshot_key)
+            if snapshot is not None:
+                with instrumentation.stage('snapshot.restore') as stage:
+                    self.restore_snapshot(*snapshot)
+                    stage['rows'] = len(self.transaction_table)
+                return
+
+        self.analyze(filename)
+        if snapshot_cache is not None:
+            with instrumentation.stage('snapshot.store', len(self.transaction_table)):
+                snapshot_cache.store(snapshot_key, *self.dump_snapshot())
+
+    def analyze(self, filename):
+        with self.monthly_statistics_folder.lock:
+            self._analyze(filename)
+
+    def _analyze(self, filename):
+        # The stages run in this order; benchmarks time them one by one
+        with instrumentation.stage('load') as stage:
+            self.load(filename)
+            stage['rows'] = len(self.transaction_table)
+        for [name, run] in [['bucket', self.bucket], ['classify', self.classify], ['aggregate', self.aggregate]]:
+            with instrumentation.stage(name, len(self.transaction_table)):
+                run()
         # for monthly_statistics in self.monthly_statistics_folder.values():
         #     print(monthly_statistics)
 
-    def find_payday(self, date: str) -> datetime.date:
-        target_payday = 21
+    def load(self, filename):
+        sources = expand_sources(filename)
+        if len(sources) == 1 and is_binary_ledger(sources[0]):
+            self.load_binary_ledger(sources[0])
+            return
+        [self.transaction_table, self.malformed_lines, self.read_positions] = self.load_my_data(filename)
+        assert len(self.transaction_table) > 0, f'{filename} has no valid rows'
 
-        year = int(date[0:4])
-        month = int(date[5:7])
-        days_of_month = [x for x in self.calendar.itermonthdays(year=year, month=month)]
-        idx = days_of_month.index(target_payday)
-        while True:
-            day = days_of_month[idx]
-            some_date = datetime.date(year=year, month=month, day=day)
-            weekday = some_date.weekday()
-            if weekday in [5, 6]:
-                idx -= 1
+        timestamps = self.transaction_table.columns['timestamp']
+        self.start_datetime = from_timestamp(timestamps[0])
+        self.end_datetime = from_timestamp(timestamps[-1])
+        self.origin_timestamp = timestamps[0]
+        self.last_pk = max(self.transaction_table.columns['pk'])
+        self.binary_ledger = None
+        self.skipped_row_count = 0
+
+    def load_binary_ledger(self, filename: str):
+        # Only the rows inside the analysis periods become the transaction table; being sorted, they are found by
+        # bisection and the columns are views into the mapping, so rows outside the periods are never read
+        ledger = self.binary_ledger = BinaryLedger(filename)
+        assert ledger.row_count > 0, f'{filename} has no valid rows'
+        [start, stop] = ledger.window(*PeriodIndex(self.analysis_target_dates).bounds())
+        self.transaction_table = ledger.table(start, stop)
+        self.malformed_lines = []
+        self.read_positions = {}
+        self.start_datetime = from_timestamp(ledger.min_timestamp)
+        self.end_datetime = from_timestamp(ledger.max_timestamp)
+        self.origin_timestamp = ledger.min_timestamp
+        self.last_pk = ledger.max_pk
+        self.skipped_row_count = ledger.row_count - len(self.transaction_table)
+
+    def bucket(self):
+        self.period_index = PeriodIndex(self.analysis_target_dates)
+        self.period_rows = self.split_into_periods()
+        self.outside_row_count += self.skipped_row_count
+        self.period_codes = self.build_period_codes()
+        self.timeline_pyramid = self.build_timeline_pyramid()
+
+    def classify(self):
+        self.class_names = []
+        self.class_codes = ClassificationStatistics.classify_table(self.transaction_table, self.class_names,
+                                                                   policy_set=self.policy_set)
+
+    def aggregate(self):
+        # Every period is aggregated in a single grouped pass; the monthly statistics are views over the result
+        self.aggregation_engine = AggregationEngine(self.period_index.dates)
+        self.aggregation_engine.add_rows(self.transaction_table, self.period_codes, self.class_codes,
+                                         self.class_names)
+        self.built_unclassified_report = None
+        self.built_range_index = None
+        self.built_rolling_windows = None
+        self.built_balance_forecaster = None
+        self.built_row_index = None
+        self.monthly_statistics_folder.cache.clear()
+
+    def split_into_periods(self) -> Dict[str, Union[slice, array]]:
+        # Gives each period a row slice when the ledger is in time order, otherwise an array of row indices
+        period_index = self.period_index
+        timestamps = self.transaction_table.columns['timestamp']
+        if all(timestamps[index] <= timestamps[index + 1] for index in range(len(timestamps) - 1)):
+            [ranges, self.outside_row_count] = period_index.split(timestamps)
+            return {date: slice(*row_range) for [date, row_range] in zip(period_index.dates, ranges)}
+
+        period_rows = {date: array('q') for date in period_index.dates}
+        self.outside_row_count = 0
+        for index in range(len(timestamps)):
+            position = period_index.find(timestamps[index])
+            if position is None:
+                self.outside_row_count += 1
+            else:
+                period_rows[period_index.dates[position]].append(index)
+        return period_rows
+
+    def period_table(self, date: str) -> TransactionTable:
+        rows = self.period_rows[date]
+        if isinstance(rows, slice):
+            return self.transaction_table[rows]
+        return self.transaction_table.take(rows)
+
+    def period_positions(self, date: str) -> Sequence[int]:
+        rows = self.period_rows[date]
+        return range(len(self.transaction_table))[rows] if isinstance(rows, slice) else rows
+
+    def period_class_codes(self, date: str) -> Sequence[int]:
+        rows = self.period_rows[date]
+        if isinstance(rows, slice):
+            return SequenceView(self.class_codes, rows.start, rows.stop)
+        return array('H', [self.class_codes[index] for index in rows])
+
+    def build_period_codes(self) -> array:
+        # The position of each row's period in period_index.dates, or -1 for rows outside every period
+        period_codes = array('h', [-1]) * len(self.transaction_table)
+        for [period_code, date] in enumerate(self.period_index.dates):
+            for index in self.period_positions(date):
+                period_codes[index] = period_code
+        return period_codes
+
+    @property
+    def unclassified_report(self) -> UnclassifiedReport:
+        # Built the first time it is read rather than on every start, then kept up to date by refresh()
+        with self.monthly_statistics_folder.lock:
+            if self.built_unclassified_report is None:
+                with instrumentation.stage('unclassified_report', len(self.transaction_table)):
+                    self.built_unclassified_report = self.build_unclassified_report()
+            return self.built_unclassified_report
+
+    def build_unclassified_report(self, dates: Iterable[str] = None, top_k: int = None) -> UnclassifiedReport:
+        # Covers the given periods, or every period
+        report = UnclassifiedReport(self.unclassified_top_k if top_k is None else top_k)
+        self.collect_unclassified_rows(report, range(len(self.transaction_table)), dates)
+        return report
+
+    def collect_unclassified_rows(self, report: UnclassifiedReport, positions: Iterable[int],
+                                  dates: Iterable[str] = None):
+        other_codes = {class_code for [class_code, class_name] in enumerate(self.class_names) if
+                       class_name.endswith('-other')}
+        period_codes = set(range(len(self.period_index.dates)) if dates is None else
+                           [self.period_index.dates.index(date) for date in dates])
+        for position in positions:
+            if self.class_codes[position] in other_codes and self.period_codes[position] in period_codes:
+                report.add(self.transaction_table[position])
+
+    def build_monthly_statistics(self, date: str) -> MonthlyStatistics:
+        with instrumentation.stage('monthly_statistics') as stage:
+            data = self.period_table(date)
+            stage['rows'] = len(data)
+            return MonthlyStatistics(data, date=date, span=self.analysis_target_dates[date],
+                                     aggregate=self.aggregation_engine.aggregates[date],
+                                     class_codes=self.period_class_codes(date), class_names=self.class_names)
+
+    def build_timeline_pyramid(self) -> TimelinePyramid:
+        # t counts seconds from origin_timestamp so that appending rows never moves existing points
+        row_indices = []
+        for date in self.period_rows:
+            row_indices.extend(self.period_positions(date))
+        row_indices.sort()
+        return TimelinePyramid.from_columns(self.transaction_table.columns['timestamp'],
+                                            self.transaction_table.columns['balance'], row_indices,
+                                            self.origin_timestamp)
+
+    @property
+    def deposit_size_timeline(self) -> List[dict]:
+        # The balance after every row inside the periods as {'t', 'y'} points, made from the pyramid on each access
+        return [{'t': t, 'y': y} for [t, y] in zip(self.timeline_pyramid.ts, self.timeline_pyramid.ys)]
+
+    def range_index(self) -> RangeIndex:
+        # Built on the first range query, then kept up to date by refresh()
+        with self.monthly_statistics_folder.lock:
+            if self.built_range_index is None:
+                with instrumentation.stage('range_index', len(self.transaction_table)):
+                    self.built_range_index = RangeIndex(self.transaction_table, self.class_codes, self.class_names)
+            return self.built_range_index
+
+    def query_range(self, start: datetime.date, stop: datetime.date, by_category: bool = False) -> PeriodAggregate:
+        # Income, loss, delta and start/end balance of the rows in [start, stop), for any window rather than just
+        # the payday periods, in O(log n). start and stop are dates (from midnight) or datetimes. Categories are
+        # filled in when by_category.
+        # A binary ledger only loads the rows inside the analysis periods, so only those are covered.
+        [start_timestamp, stop_timestamp] = [to_timestamp(moment if isinstance(moment, datetime.datetime) else
+                                                          datetime.datetime.combine(moment, datetime.time()))
+                                             for moment in [start, stop]]
+        return self.range_index().query(start_timestamp, stop_timestamp, by_category)
+
+    def rolling_windows(self) -> RollingWindows:
+        # Rolling 7 and 30 day income and spend for every day of the history; built on first use, then kept up to
+        # date by refresh()
+        with self.monthly_statistics_folder.lock:
+            if self.built_rolling_windows is None:
+                with instrumentation.stage('rolling_windows', len(self.transaction_table)):
+                    self.built_rolling_windows = RollingWindows(self.transaction_table, self.class_codes,
+                                                                self.class_names)
+            return self.built_rolling_windows
+
+    def balance_forecaster(self) -> BalanceForecaster:
+        # Built on the first forecast over rolling_windows(); refresh() drops the forecasts it kept
+        with self.monthly_statistics_folder.lock:
+            if self.built_balance_forecaster is None:
+                self.built_balance_forecaster = BalanceForecaster(self.rolling_windows(), self.analysis_target_dates,
+                                                                   self.payday_of_month)
+            return self.built_balance_forecaster
+
+    def forecast_balance(self, date: str, threshold: int = 0, today: datetime.date = None,
+                         end_date: datetime.date = None) -> BalanceForecast:
+        # Percentile bands of the balance period date ends at, or end_date when given, and the chance it ends below
+        # threshold, simulating the days from today (by default the actual one) on from the balance before today.
+        # Paydays past the period's end bring the pay they brought before. As with
+        # MonthlyStatistics.left_day_count the period's first day has always passed.
+        with self.monthly_statistics_folder.lock, instrumentation.stage('forecast'):
+            [start_date, last_date] = self.analysis_target_dates[date]
+            today = datetime.date.today() if today is None else today
+            first_left_day = max(start_date + datetime.timedelta(days=1), today)
+            stop = min(first_left_day, last_date + datetime.timedelta(days=1))
+            start_balance = self.query_range(start_date, stop).end_balance
+            return self.balance_forecaster().forecast(date, first_left_day, start_balance, threshold, end_date)
+
+    def row_index(self) -> RowIndex:
+        # Built on the first policy change, then kept up to date by refresh()
+        with self.monthly_statistics_folder.lock:
+            if self.built_row_index is None:
+                with instrumentation.stage('row_index', len(self.transaction_table)):
+                    self.built_row_index = RowIndex(self.transaction_table)
+            return self.built_row_index
+
+    def reload_policies(self) -> int:
+        # Applies policy_file again if it changed since it was read. A file that fails to parse raises, and is not
+        # retried until it changes again. Returns the number of rows that changed class.
+        if self.policy_file is None:
+            return 0
+        mtime_ns = os.stat(self.policy_file).st_mtime_ns
+        if mtime_ns == self.policy_mtime_ns:
+            return 0
+        self.policy_mtime_ns = mtime_ns
+        return self.apply_policy_set(PolicySet.load(self.policy_file))
+
+    def apply_policy_set(self, policy_set: PolicySet) -> int:
+        # Reclassifies only the rows the change can affect, found through the row index, and moves the rows that
+        # changed class between the categories of their periods. Returns the number of rows that changed class.
+        with self.monthly_statistics_folder.lock, instrumentation.stage('reclassify') as stage:
+            stage['rows'] = self._apply_policy_set(policy_set)
+            return stage['rows']
+
+    def _apply_policy_set(self, policy_set: PolicySet) -> int:
+        row_index = self.row_index()
+        notes = self.policy_set.affected_notes(policy_set, row_index.notes())
+        positions = sorted(set(row_index.rows_with_notes(notes)).union(
+            row_index.rows_at(self.policy_set.changed_exceptions(policy_set))))
+        class_codes = ClassificationStatistics.classify_table(self.transaction_table, self.class_names, positions,
+                                                              policy_set)
+        # Only swapped in once it has classified every affected row, so that a set that fails leaves the old one
+        self.policy_set = policy_set
+        changes = [(position, self.class_codes[position]) for [position, class_code] in zip(positions, class_codes)
+                   if class_code != self.class_codes[position]]
+        if len(changes) == 0:
+            return 0
+        for [position, class_code] in zip(positions, class_codes):
+            self.class_codes[position] = class_code
+
+        touched_dates = self.aggregation_engine.reclassify_rows(self.transaction_table, self.period_codes,
+                                                                self.class_codes, self.class_names, changes,
+                                                                self.period_positions)
+        if any(self.class_names[class_code].endswith('-other') for [position, old_class_code] in changes for
+               class_code in [old_class_code, self.class_codes[position]]):
+            self.built_unclassified_report = None
+        self.built_range_index = None
+        self.built_rolling_windows = None
+        self.built_balance_forecaster = None
+        for date in touched_dates:
+            monthly_statistics = self.monthly_statistics_folder.cached(date)
+            if monthly_statistics is not None:
+                monthly_statistics.update_data(self.period_table(date), self.period_class_codes(date))
+        return len(changes)
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.end_datetime - self.start_datetime).total_seconds()
+
+    def refresh(self) -> int:
+        # Parses only what was appended to the ledger since it was read and folds the new rows into the affected
+        # months. Returns the number of new rows.
+        with self.monthly_statistics_folder.lock, instrumentation.stage('refresh') as stage:
+            stage['rows'] = self._refresh()
+            return stage['rows']
+
+    def _refresh(self) -> int:
+        if self.binary_ledger is not None:
+            # A converted ledger is rewritten whole, and re-mapping it reads no more than the first analysis did
+            row_count = len(self.transaction_table)
+            self._analyze(self.binary_ledger.filename)
+            return max(0, len(self.transaction_table) - row_count)
+        assert len(self.read_positions) == 1, 'refresh() supports a single ledger file'
+        [[filename, read_position]] = self.read_positions.items()
+        if os.path.getsize(filename) < read_position.offset:
+            self._analyze(filename)
+            return len(self.transaction_table)
+
+        with open(filename, 'rb') as file:
+            file.seek(read_position.offset)
+            reader = MyDataReader(file, skip_header=False, header_line=read_position.header_line,
+                                  start_line_number=read_position.line_count + 1)
+            tail = reader.read_table()
+        self.read_positions[filename] = ReadPosition(read_position.offset + reader.offset, reader.line_count,
+                                                     read_position.header_line)
+        self.malformed_lines.extend((filename, *malformed_line) for malformed_line in reader.malformed_lines)
+
+        tail = tail.take(index for [index, pk] in enumerate(tail.column('pk')) if pk > self.last_pk)
+        if len(tail) == 0:
+            return 0
+        first_index = len(self.transaction_table)
+        self.transaction_table.extend(tail)
+        self.last_pk = max(self.last_pk, max(tail.column('pk')))
+
+        new_positions = range(first_index, len(self.transaction_table))
+        self.class_codes.extend(ClassificationStatistics.classify_table(self.transaction_table, self.class_names,
+                                                                        new_positions, self.policy_set))
+
+        timestamps = self.transaction_table.columns['timestamp']
+        balances = self.transaction_table.columns['balance']
+        self.end_datetime = from_timestamp(timestamps[-1])
+        touched_dates = set()
+        for index in new_positions:
+            position = self.period_index.find(timestamps[index])
+            self.period_codes.append(-1 if position is None else position)
+            if position is None:
+                self.outside_row_count += 1
                 continue
+            date = self.period_index.dates[position]
+            rows = self.period_rows[date]
+            if isinstance(rows, slice) and rows.start == rows.stop:
+                self.period_rows[date] = slice(index, index + 1)
+            elif isinstance(rows, slice) and rows.stop == index:
+                self.period_rows[date] = slice(rows.start, index + 1)
             else:
-                break
-        pay_date = datetime.date(year=year, month=month, day=days_of_month[idx])
-        return pay_date
+                if isinstance(rows, slice):
+                    rows = self.period_rows[date] = array('q', range(rows.start, rows.stop))
+                rows.append(index)
+            touched_dates.add(date)
+            self.timeline_pyramid.append(timestamps[index] - self.origin_timestamp, balances[index])
 
-    def find_payday_span(self, date: str):
-        next_date = [int(date[0:4]), int(date[5:7])]
-        next_date[1] += 1
-        if next_date[1] > 12:
-            next_date[1] = 1
-            next_date[0] += 1
+        self.aggregation_engine.add_rows(self.transaction_table, self.period_codes, self.class_codes,
+                                         self.class_names, new_positions)
+        if self.built_unclassified_report is not None:
+            self.collect_unclassified_rows(self.built_unclassified_report, new_positions)
+        if self.built_range_index is not None:
+            self.built_range_index.add_rows(self.transaction_table, self.class_codes, new_positions)
+        if self.built_rolling_windows is not None:
+            self.built_rolling_windows.add_rows(self.transaction_table, self.class_codes, new_positions)
+        if self.built_balance_forecaster is not None:
+            self.built_balance_forecaster.invalidate()
+        if self.built_row_index is not None:
+            self.built_row_index.add_rows(self.transaction_table, new_positions)
+        for date in touched_dates:
+            # Months not built yet pick the new rows up when they are
+            monthly_statistics = self.monthly_statistics_folder.cached(date)
+            if monthly_statistics is not None:
+                monthly_statistics.update_data(self.period_table(date), self.period_class_codes(date))
+        return len(tail)
+
+    def dump_snapshot(self) -> Tuple[dict, Dict[str, bytes]]:
+        payload = {
+            'read_positions': self.read_positions,
+            'last_pk': self.last_pk,
+            'malformed_lines': self.malformed_lines,
+            'outside_row_count': self.outside_row_count,
+            'class_names': self.class_names,
+            'period_slices': {},
+            'aggregates': {date: aggregate.to_dict() for [date, aggregate] in
+                           self.aggregation_engine.aggregates.items()}
+        }
+        blobs = {}
+        if self.binary_ledger is not None:
+            # The rows stay in the ledger; the window locates them again
+            [start, stop] = self.binary_ledger.window(*self.period_index.bounds())
+            payload['binary_ledger'] = [self.binary_ledger.filename, start, stop]
+        else:
+            for name in TransactionTable.numeric_columns:
+                blobs[f'column.{name}'] = self.transaction_table.columns[name].tobytes()
+            for name in TransactionTable.string_columns:
+                blobs[f'column.{name}'] = '\n'.join(self.transaction_table.columns[name]).encode('utf-8')
+        blobs['class_codes'] = self.class_codes.tobytes()
+        blobs['period_codes'] = self.period_codes.tobytes()
+        blobs.update(self.timeline_pyramid.dump())
+        for [date, rows] in self.period_rows.items():
+            if isinstance(rows, slice):
+                payload['period_slices'][date] = [rows.start, rows.stop]
+            else:
+                blobs[f'month.{date}.indices'] = rows.tobytes()
+        return payload, blobs
+
+    def restore_snapshot(self, payload: dict, blobs: Dict[str, bytes]):
+        if 'binary_ledger' in payload:
+            [filename, start, stop] = payload['binary_ledger']
+            self.binary_ledger = BinaryLedger(filename)
+            self.transaction_table = self.binary_ledger.table(start, stop)
+        else:
+            columns = {}
+            for [name, typecode] in TransactionTable.numeric_columns.items():
+                columns[name] = array(typecode)
+                columns[name].frombytes(blobs[f'column.{name}'])
+            for name in TransactionTable.string_columns:
+                columns[name] = blobs[f'column.{name}'].decode('utf-8').split('\n')
+            self.transaction_table = TransactionTable(columns)
+            self.binary_ledger = None
+        self.read_positions = {filename: ReadPosition(*read_position) for [filename, read_position] in
+                               payload['read_positions'].items()}
+        self.last_pk = payload['last_pk']
+        self.malformed_lines = [tuple(malformed_line) for malformed_line in payload['malformed_lines']]
+        self.outside_row_count = payload['outside_row_count']
+
+        if self.binary_ledger is not None:
+            ledger = self.binary_ledger
+            [self.start_datetime, self.end_datetime] = [from_timestamp(ledger.min_timestamp),
+                                                        from_timestamp(ledger.max_timestamp)]
+            self.origin_timestamp = ledger.min_timestamp
+            self.skipped_row_count = ledger.row_count - len(self.transaction_table)
+        else:
+            timestamps = self.transaction_table.columns['timestamp']
+            self.start_datetime = from_timestamp(timestamps[0])
+            self.end_datetime = from_timestamp(timestamps[-1])
+            self.origin_timestamp = timestamps[0]
+            self.skipped_row_count = 0
+        self.timeline_pyramid = TimelinePyramid.restore(blobs)
+
+        self.period_index = PeriodIndex(self.analysis_target_dates)
+        self.period_rows = {}
+        for date in self.analysis_target_dates:
+            if date in payload['period_slices']:
+                self.period_rows[date] = slice(*payload['period_slices'][date])
+            else:
+                self.period_rows[date] = array('q')
+                self.period_rows[date].frombytes(blobs[f'month.{date}.indices'])
+
+        self.class_names = payload['class_names']
+        [self.class_codes, self.period_codes] = [array('H'), array('h')]
+        self.class_codes.frombytes(blobs['class_codes'])
+        self.period_codes.frombytes(blobs['period_codes'])
+        self.aggregation_engine = AggregationEngine(self.period_index.dates)
+        self.aggregation_engine.aggregates = {date: PeriodAggregate.from_dict(aggregate) for [date, aggregate] in
+                                              payload['aggregates'].items()}
+        self.built_unclassified_report = None
+        self.built_range_index = None
+        self.built_rolling_windows = None
+        self.built_balance_forecaster = None
+        self.built_row_index = None
 
-        this_pay_date = self.find_payday(date)
-        next_pay_date = self.find_payday(f'{next_date[0]}-{next_date[1]}') - datetime.timedelta(days=1)
-        return [this_pay_date, next_pay_date]
+    def find_payday(self, date: str) -> datetime.date:
+        # The 21st, or the last business day before it when it falls on a weekend or public holiday
+        return business_calendar.payday(int(date[0:4]), int(date[5:7]), self.payday_of_month)
+
+    def find_payday_span(self, date: str):
+        return list(business_calendar.payday_span(int(date[0:4]), int(date[5:7]), self.payday_of_month))
 
     @staticmethod
     def convert_to_mm_yy_format(data):
@@ -95,14 +545,5 @@ class PersonalFinancialAnalyzer:
         return analysis_target_dates
 
     @staticmethod
-    def load_my_data(filename: str):
-        my_data_rows = []
-        buffer_my_data = open(filename).read()
-
-        for row in buffer_my_data.split('\n')[1:]:
-            cells = row.split('|')
-            if cells[0] == '합계':
-                break
-            assert len(cells) == 9, f'{len(cells)} == 9'
-            my_data_rows.append(MyDataRow.from_row(cells))
-        return my_data_rows
+    def load_my_data(filename) -> Tuple[TransactionTable, list, Dict[str, ReadPosition]]:
+        return load_my_data_tables(filename)
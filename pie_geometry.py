@@ -0,0 +1,58 @@
+import functools
+import math
+from typing import Tuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class UnitCircle:
+    # cos and sin of every 1/resolution degree around the circle, so that pie slices and label anchors are table
+    # lookups instead of trigonometry
+
+    def __init__(self, resolution: int = 8):
+        self.resolution = resolution
+        self.size = 360 * resolution
+        angles = [step / resolution / 180 * math.pi for step in range(self.size)]
+        if numpy is not None:
+            self.cos = numpy.cos(numpy.array(angles))
+            self.sin = numpy.sin(numpy.array(angles))
+        else:
+            self.cos = [math.cos(angle) for angle in angles]
+            self.sin = [math.sin(angle) for angle in angles]
+
+    def step(self, degree: float) -> int:
+        return round(degree * self.resolution) % self.size
+
+    def point(self, x: float, y: float, r: float, degree: float) -> Tuple[float, float]:
+        step = self.step(degree)
+        return x + self.cos[step] * r, y + self.sin[step] * r
+
+    def arc_steps(self, start_degree: float, stop_degree: float) -> list:
+        # Table positions from start to stop, about one vertex per degree and never fewer than 30
+        start = round(start_degree * self.resolution)
+        stop = round(stop_degree * self.resolution)
+        span = abs(stop - start)
+        if span == 0:
+            return [start % self.size]
+        precision = max(30, span // self.resolution)
+        return [(start + (stop - start) * z // precision) % self.size for z in range(precision + 1)]
+
+    @functools.lru_cache(maxsize=4096)
+    def pie(self, x: int, y: int, r: int, start_degree: float, stop_degree: float) -> tuple:
+        # The filled polygon of a slice: the centre, then the arc. Slices repeat across months and redraws, so
+        # the polygons are kept.
+        steps = self.arc_steps(start_degree, stop_degree)
+        if numpy is not None:
+            steps = numpy.array(steps)
+            xs = x + (self.cos[steps] * r).astype(int)
+            ys = y + (self.sin[steps] * r).astype(int)
+            arc = tuple(zip(xs.tolist(), ys.tolist()))
+        else:
+            arc = tuple((x + int(self.cos[step] * r), y + int(self.sin[step] * r)) for step in steps)
+        return ((x, y),) + arc
+
+
+unit_circle = UnitCircle()
@@ -0,0 +1,123 @@
+import bisect
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from daegu_bank.aggregation_engine import CategoryAggregate, PeriodAggregate
+from daegu_bank.transaction_table import TransactionTable
+
+
+class PrefixSums:
+    # One stream of rows in (timestamp, pk) order with running totals, so that the sums over any time range are
+    # two subtractions once bisection has found its rows. incomes[i] and losses[i] sum rows [0, i).
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.pks = array('q')
+        self.incomes = array('q', [0])
+        self.losses = array('q', [0])
+
+    def append(self, timestamp: int, pk: int, income: int, loss: int):
+        self.timestamps.append(timestamp)
+        self.pks.append(pk)
+        self.incomes.append(self.incomes[-1] + income)
+        self.losses.append(self.losses[-1] + loss)
+
+    def rows(self, start_timestamp: int, stop_timestamp: int) -> range:
+        return range(bisect.bisect_left(self.timestamps, start_timestamp),
+                     bisect.bisect_left(self.timestamps, stop_timestamp))
+
+    def category(self, rows: range) -> CategoryAggregate:
+        return CategoryAggregate(self.incomes[rows.stop] - self.incomes[rows.start],
+                                 self.losses[rows.stop] - self.losses[rows.start], len(rows),
+                                 self.pks[rows.start])
+
+
+class RangeIndex:
+    # Answers "income, loss, balances and categories between two timestamps" for any range in O(log n) per
+    # stream, over a table's rows and their class codes. Rows appended in time order extend the index in O(1).
+
+    def __init__(self, table: TransactionTable, class_codes: Sequence[int], class_names: List[str]):
+        self.class_names = class_names
+        self.overall = PrefixSums()
+        # Balance before and after each row of the overall stream
+        self.start_balances = array('q')
+        self.end_balances = array('q')
+        self.categories: Dict[int, PrefixSums] = {}
+        self.add_rows(table, class_codes)
+
+    def add_rows(self, table: TransactionTable, class_codes: Sequence[int], positions: Iterable[int] = None):
+        # class_codes covers every row of table; only the rows at positions are added when given
+        [timestamps, pks] = [table.column('timestamp'), table.column('pk')]
+        positions = range(len(table)) if positions is None else list(positions)
+        if not all((timestamps[positions[index]], pks[positions[index]]) <=
+                   (timestamps[positions[index + 1]], pks[positions[index + 1]]) for index in
+                   range(len(positions) - 1)):
+            positions = sorted(positions, key=lambda position: (timestamps[position], pks[position]))
+        overall = self.overall
+        if len(positions) > 0 and len(overall.timestamps) > 0 and \
+                (timestamps[positions[0]], pks[positions[0]]) < (overall.timestamps[-1], overall.pks[-1]):
+            self.rebuild(table, class_codes)
+            return
+
+        [incomes, losses, balances] = [table.column('income'), table.column('loss'), table.column('balance')]
+        for position in positions:
+            [timestamp, pk, income, loss] = [timestamps[position], pks[position], incomes[position], losses[position]]
+            overall.append(timestamp, pk, income, loss)
+            self.start_balances.append(balances[position] - income + loss)
+            self.end_balances.append(balances[position])
+            category = self.categories.get(class_codes[position])
+            if category is None:
+                category = self.categories[class_codes[position]] = PrefixSums()
+            category.append(timestamp, pk, income, loss)
+
+    def rebuild(self, table: TransactionTable, class_codes: Sequence[int]):
+        # Rows arrived out of order: the running totals after them all move, so start over
+        self.overall = PrefixSums()
+        self.start_balances = array('q')
+        self.end_balances = array('q')
+        self.categories = {}
+        self.add_rows(table, class_codes)
+
+    def __len__(self):
+        return len(self.overall.timestamps)
+
+    def query(self, start_timestamp: int, stop_timestamp: int, by_category: bool = False) -> PeriodAggregate:
+        # Totals of the rows in [start_timestamp, stop_timestamp). An empty range keeps the balance it sits at.
+        overall = self.overall
+        rows = overall.rows(start_timestamp, stop_timestamp)
+        aggregate = PeriodAggregate()
+        aggregate.total_income = overall.incomes[rows.stop] - overall.incomes[rows.start]
+        aggregate.total_loss = overall.losses[rows.stop] - overall.losses[rows.start]
+        aggregate.row_count = len(rows)
+        if len(rows) > 0:
+            [aggregate.first_pk, aggregate.last_pk] = [overall.pks[rows.start], overall.pks[rows.stop - 1]]
+            aggregate.start_balance = self.start_balances[rows.start]
+            aggregate.end_balance = self.end_balances[rows.stop - 1]
+        elif rows.start > 0:
+            aggregate.start_balance = aggregate.end_balance = self.end_balances[rows.start - 1]
+        elif rows.start < len(self):
+            aggregate.start_balance = aggregate.end_balance = self.start_balances[rows.start]
+        if by_category:
+            aggregate.categories = self.query_categories(start_timestamp, stop_timestamp)
+        return aggregate
+
+    def query_categories(self, start_timestamp: int, stop_timestamp: int) -> Dict[str, CategoryAggregate]:
+        # In the order each category's first row in the range appears, as PeriodAggregate lists them
+        categories = []
+        for [class_code, category] in self.categories.items():
+            rows = category.rows(start_timestamp, stop_timestamp)
+            if len(rows) > 0:
+                categories.append((self.class_names[class_code], category.category(rows)))
+        categories.sort(key=lambda item: item[1].first_pk)
+        return dict(categories)
+
+    def query_category(self, class_name: str, start_timestamp: int, stop_timestamp: int) -> CategoryAggregate:
+        class_code = self.class_code(class_name)
+        category = self.categories.get(class_code) if class_code is not None else None
+        if category is None:
+            return CategoryAggregate()
+        rows = category.rows(start_timestamp, stop_timestamp)
+        return category.category(rows) if len(rows) > 0 else CategoryAggregate()
+
+    def class_code(self, class_name: str) -> Optional[int]:
+        return self.class_names.index(class_name) if class_name in self.class_names else None
@@ -0,0 +1,166 @@
+import argparse
+import csv
+import json
+import math
+import sys
+
+# Only the standard library is imported up front; the analyzer is imported in main() and nothing here touches
+# pygame or main.py, so a report starts without SDL or fonts.
+
+summary_names = ('start_date', 'end_date', 'day_count', 'start_balance', 'end_balance', 'increase_rate',
+                 'total_income', 'total_loss', 'total_delta', 'income_by_day', 'loss_by_day', 'delta_by_day')
+class_names = ('income', 'loss', 'balance', 'row_count')
+
+
+def summarize(monthly_statistics) -> dict:
+    summary = {'date': monthly_statistics.date}
+    for name in summary_names:
+        value = getattr(monthly_statistics, name)
+        if name.endswith('_date'):
+            value = value.isoformat()
+        elif isinstance(value, float) and math.isnan(value):
+            value = None
+        summary[name] = value
+    summary['classes'] = {
+        class_name: {
+            'income': classified_transactions.income,
+            'loss': classified_transactions.loss,
+            'balance': classified_transactions.balance,
+            'row_count': classified_transactions.row_count
+        } for [class_name, classified_transactions] in
+        monthly_statistics.classification_statistics.classified_transactions_folder.items()}
+    return summary
+
+
+def write_text(months: list, unclassified_report, file):
+    for monthly_statistics in months:
+        print(repr(monthly_statistics), file=file)
+    if unclassified_report is not None:
+        for row in unclassified_report.top_rows():
+            print(f'"{row}"', file=file)
+        for [note, count] in unclassified_report.top_notes_by_count():
+            print(f'{count: 6,} rows {unclassified_report.note_amounts[note]: 14,}원 "{note}"', file=file)
+
+
+def write_json(months: list, unclassified_report, file):
+    report = {'months': [summarize(monthly_statistics) for monthly_statistics in months]}
+    if unclassified_report is not None:
+        report['unclassified'] = {
+            'row_count': unclassified_report.row_count,
+            'largest_rows': [repr(row) for row in unclassified_report.top_rows()],
+            'notes': [{'note': note, 'row_count': count, 'amount': unclassified_report.note_amounts[note]} for
+                      [note, count] in unclassified_report.top_notes_by_count()]
+        }
+    json.dump(report, file, ensure_ascii=False, indent=2)
+    print(file=file)
+
+
+def write_csv(months: list, by_class: bool, file):
+    writer = csv.writer(file, lineterminator='\n')
+    if by_class:
+        writer.writerow(('date', 'class_name') + class_names)
+        for monthly_statistics in months:
+            summary = summarize(monthly_statistics)
+            for [class_name, figures] in summary['classes'].items():
+                writer.writerow([summary['date'], class_name] + [figures[name] for name in class_names])
+    else:
+        writer.writerow(('date',) + summary_names)
+        for monthly_statistics in months:
+            summary = summarize(monthly_statistics)
+            writer.writerow([summary['date']] + ['' if summary[name] is None else summary[name] for name in
+                                                 summary_names])
+
+
+def rolling_rows(rolling_windows, window: int, by_class: bool, first_date: str, last_date: str) -> list:
+    # One row per day (and per class when by_class) whose month lies within [first_date, last_date]
+    class_names = [None] + (rolling_windows.class_names_present() if by_class else [])
+    series = {class_name: rolling_windows.series(window, class_name) for class_name in class_names}
+    rows = []
+    for [day, date] in enumerate(rolling_windows.dates()):
+        month = date.isoformat()[:7]
+        if (first_date is not None and month < first_date) or (last_date is not None and month > last_date):
+            continue
+        for class_name in class_names:
+            [incomes, losses] = series[class_name]
+            rows.append({'date': date.isoformat(), 'class_name': class_name, 'income': incomes[day],
+                         'loss': losses[day]})
+    return rows
+
+
+def write_rolling(rows: list, window: int, output_format: str, file):
+    if output_format == 'json':
+        json.dump({'window': window, 'days': rows}, file, ensure_ascii=False, indent=2)
+        print(file=file)
+    elif output_format == 'csv':
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(('date', 'class_name', 'income', 'loss'))
+        for row in rows:
+            writer.writerow([row['date'], row['class_name'] or '', row['income'], row['loss']])
+    else:
+        for row in rows:
+            print(f'{row["date"]} {row["class_name"] or "전체":<24} {window}일 수입 {row["income"]: 14,}원 '
+                  f'{window}일 지출 {row["loss"]: 14,}원', file=file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prints monthly statistics of a ledger without opening the viewer.')
+    parser.add_argument('source', nargs='*', default=['mydata.txt'], help='ledger exports, paths or glob patterns')
+    parser.add_argument('--format', choices=['text', 'json', 'csv'], default='text')
+    parser.add_argument('--from', dest='first_date', help='first month to report, YYYY-MM')
+    parser.add_argument('--to', dest='last_date', help='last month to report, YYYY-MM')
+    parser.add_argument('--by-class', action='store_true',
+                        help='csv: one row per month and class; with --rolling: one row per day and class')
+    parser.add_argument('--rolling', type=int, choices=[7, 30],
+                        help='instead of months, the rolling income and spend over this many days for every day')
+    parser.add_argument('--unclassified', action='store_true',
+                        help='text/json: the largest rows no policy matched and their notes by frequency')
+    parser.add_argument('--top', type=int, default=100,
+                        help='number of unclassified rows listed; 0 lists only their notes')
+    parser.add_argument('--policies', help='classify with this policy file instead of defs.py')
+    parser.add_argument('--cache-dir', default='.pfa_cache')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--output', help='write to this file instead of stdout')
+    parser.add_argument('--trace', help='write stage timings and counters to this JSON file (or set PFA_TRACE)')
+    parser.add_argument('--profile-stage', help='also run this stage under cProfile (or set PFA_PROFILE)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record peak memory per stage, which slows stages down (or set PFA_TRACE_MEMORY)')
+    args = parser.parse_args()
+    if args.top < 0:
+        parser.error('--top must not be negative')
+
+    from daegu_bank.instrumentation import instrumentation
+    from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+    if args.trace is not None:
+        instrumentation.enable(args.trace, args.profile_stage, args.trace_memory)
+
+    source = args.source[0] if len(args.source) == 1 else args.source
+    pfa = PersonalFinancialAnalyzer(source, cache_dir=None if args.no_cache else args.cache_dir, prefetch=False,
+                                    policy_file=args.policies)
+    for [filename, line_number, line, reason] in pfa.malformed_lines:
+        print(f'{filename}:{line_number}: {reason}: "{line}"', file=sys.stderr)
+
+    dates = [date for date in pfa.analysis_target_dates if
+             (args.first_date is None or date >= args.first_date) and
+             (args.last_date is None or date <= args.last_date)]
+    months = [pfa.monthly_statistics_folder[date] for date in dates] if args.rolling is None else []
+    unclassified_report = pfa.build_unclassified_report(dates, top_k=args.top) if args.unclassified else None
+
+    file = open(args.output, 'w', encoding='utf-8', newline='') if args.output is not None else sys.stdout
+    try:
+        if args.rolling is not None:
+            write_rolling(rolling_rows(pfa.rolling_windows(), args.rolling, args.by_class, args.first_date,
+                                       args.last_date), args.rolling, args.format, file)
+        elif args.format == 'text':
+            write_text(months, unclassified_report, file)
+        elif args.format == 'json':
+            write_json(months, unclassified_report, file)
+        else:
+            write_csv(months, args.by_class, file)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+
+if __name__ == '__main__':
+    main()
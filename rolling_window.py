@@ -0,0 +1,115 @@
+import datetime
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from daegu_bank.mydata_reader import epoch_ordinal
+from daegu_bank.transaction_table import TransactionTable
+
+
+class RollingSeries:
+    # Daily income and loss sums of one stream, and for each window w their trailing sums over days (d - w, d]
+
+    __slots__ = ('incomes', 'losses', 'windows')
+
+    def __init__(self, windows: Iterable[int]):
+        self.incomes = array('q')
+        self.losses = array('q')
+        self.windows: Dict[int, Tuple[array, array]] = {window: (array('q'), array('q')) for window in windows}
+
+    @property
+    def rolled_day_count(self) -> int:
+        # Days the windows have been slid over; days past it were added since
+        return min((len(rolling_incomes) for [rolling_incomes, rolling_losses] in self.windows.values()),
+                   default=len(self.incomes))
+
+    def extend(self, day_count: int):
+        zeros = array('q', [0]) * (day_count - len(self.incomes))
+        self.incomes.extend(zeros)
+        self.losses.extend(zeros)
+
+    def slide(self, first_day: int):
+        # Recomputes every window from first_day on, which is all a change at first_day or later can move; days
+        # before it keep their sums, so appending to the last days costs O(new days), not O(history)
+        for [window, [rolling_incomes, rolling_losses]] in self.windows.items():
+            del rolling_incomes[first_day:]
+            del rolling_losses[first_day:]
+            for [daily, rolling] in [[self.incomes, rolling_incomes], [self.losses, rolling_losses]]:
+                total = rolling[-1] if first_day > 0 else 0
+                for day in range(first_day, len(daily)):
+                    total += daily[day]
+                    if day >= window:
+                        total -= daily[day - window]
+                    rolling.append(total)
+
+
+class RollingWindows:
+    # Rolling income and spend for every day from the first row's day to the last row's, overall and per class
+    # code. Rows are first summed per day in one pass, then each window slides over the days, so building costs
+    # O(rows + days) per stream rather than O(days * window).
+
+    def __init__(self, table: TransactionTable, class_codes: Sequence[int], class_names: List[str],
+                 windows: Sequence[int] = (7, 30)):
+        self.class_names = class_names
+        self.window_sizes = tuple(windows)
+        self.rebuild(table, class_codes)
+
+    def rebuild(self, table: TransactionTable, class_codes: Sequence[int]):
+        timestamps = table.column('timestamp')
+        self.first_ordinal = min(timestamps) // 86400 + epoch_ordinal if len(table) > 0 else None
+        self.overall = RollingSeries(self.window_sizes)
+        self.categories: Dict[int, RollingSeries] = {}
+        self.add_rows(table, class_codes)
+
+    def add_rows(self, table: TransactionTable, class_codes: Sequence[int], positions: Iterable[int] = None):
+        # class_codes covers every row of table; only the rows at positions are added when given
+        [timestamps, incomes, losses] = [table.column('timestamp'), table.column('income'), table.column('loss')]
+        positions = range(len(table)) if positions is None else list(positions)
+        if self.first_ordinal is None and len(table) > 0:
+            self.first_ordinal = min(timestamps) // 86400 + epoch_ordinal
+        if any(timestamps[position] // 86400 + epoch_ordinal < self.first_ordinal for position in positions):
+            # Days before the first one shift every index, so start over
+            self.rebuild(table, class_codes)
+            return
+
+        first_days = {}
+        first_day_offset = self.first_ordinal - epoch_ordinal
+        for position in positions:
+            day = timestamps[position] // 86400 - first_day_offset
+            class_code = class_codes[position]
+            category = self.categories.get(class_code)
+            if category is None:
+                category = self.categories[class_code] = RollingSeries(self.window_sizes)
+            for series in [self.overall, category]:
+                if day >= len(series.incomes):
+                    series.extend(day + 1)
+                series.incomes[day] += incomes[position]
+                series.losses[day] += losses[position]
+            first_days[None] = min(first_days.get(None, day), day)
+            first_days[class_code] = min(first_days.get(class_code, day), day)
+
+        # Every stream covers the same days, so streams without new rows are only padded
+        day_count = len(self.overall.incomes)
+        for [class_code, series] in [[None, self.overall]] + list(self.categories.items()):
+            first_day = min(first_days.get(class_code, series.rolled_day_count), series.rolled_day_count)
+            series.extend(day_count)
+            series.slide(first_day)
+
+    def __len__(self):
+        return len(self.overall.incomes)
+
+    def dates(self) -> List[datetime.date]:
+        return [datetime.date.fromordinal(self.first_ordinal + day) for day in range(len(self))]
+
+    def series(self, window: int, class_name: Optional[str] = None) -> Tuple[array, array]:
+        # Rolling incomes and losses aligned with dates(); losses are positive amounts spent
+        if class_name is None:
+            return self.overall.windows[window]
+        class_code = self.class_names.index(class_name) if class_name in self.class_names else None
+        category = self.categories.get(class_code)
+        if category is None:
+            zeros = array('q', [0]) * len(self)
+            return zeros, array('q', zeros)
+        return category.windows[window]
+
+    def class_names_present(self) -> List[str]:
+        return [self.class_names[class_code] for class_code in sorted(self.categories)]
@@ -0,0 +1,48 @@
+import bisect
+from array import array
+from typing import Dict, Iterable, List, Sequence
+
+from daegu_bank.transaction_table import TransactionTable
+
+
+class RowIndex:
+    # Inverted indexes over a table's rows: each distinct note to the positions of its rows, and timestamps to
+    # positions through the positions sorted by timestamp. A policy edit then finds the rows it can reclassify
+    # without a scan.
+
+    def __init__(self, table: TransactionTable):
+        self.note_rows: Dict[str, array] = {}
+        self.timestamps = array('q')
+        self.order = array('q')
+        self.add_rows(table)
+
+    def add_rows(self, table: TransactionTable, positions: Iterable[int] = None):
+        [notes, timestamps] = [table.column('note'), table.column('timestamp')]
+        positions = range(len(table)) if positions is None else positions
+        in_order = True
+        for position in positions:
+            rows = self.note_rows.get(notes[position])
+            if rows is None:
+                rows = self.note_rows[notes[position]] = array('q')
+            rows.append(position)
+            in_order = in_order and (len(self.timestamps) == 0 or self.timestamps[-1] <= timestamps[position])
+            self.timestamps.append(timestamps[position])
+            self.order.append(position)
+        if not in_order:
+            pairs = sorted(zip(self.timestamps, self.order))
+            self.timestamps = array('q', [timestamp for [timestamp, position] in pairs])
+            self.order = array('q', [position for [timestamp, position] in pairs])
+
+    def notes(self) -> Sequence[str]:
+        return list(self.note_rows)
+
+    def rows_with_notes(self, notes: Iterable[str]) -> List[int]:
+        return [position for note in notes for position in self.note_rows.get(note, ())]
+
+    def rows_at(self, timestamps: Iterable[int]) -> List[int]:
+        rows = []
+        for timestamp in timestamps:
+            start = bisect.bisect_left(self.timestamps, timestamp)
+            stop = bisect.bisect_right(self.timestamps, timestamp, start)
+            rows.extend(self.order[start:stop])
+        return rows
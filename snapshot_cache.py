@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import business_calendar
+import defs
+from daegu_bank.binary_ledger import is_binary_ledger, read_header
+
+
+def file_digest(filename: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, 'rb') as file:
+        while True:
+            chunk = file.read(1 << 20)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SnapshotCache:
+    # A snapshot file is: magic, u32 header length, JSON header, then the binary blobs listed in the header
+    magic = b'PFASNAP\x05'
+
+    def __init__(self, cache_dir: str = '.pfa_cache'):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(filenames: List[str], policy_file: Optional[str] = None) -> dict:
+        inputs = []
+        for filename in filenames:
+            stat = os.stat(filename)
+            # A binary ledger is only ever rewritten whole, so its header stands for its rows and the rest of what
+            # may be gigabytes is not read
+            digest = hashlib.blake2b(read_header(filename), digest_size=16).hexdigest() if is_binary_ledger(
+                filename) else file_digest(filename)
+            inputs.append([os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, digest])
+        key = {'inputs': inputs, 'defs': file_digest(defs.__file__),
+               'calendar': file_digest(business_calendar.__file__)}
+        if policy_file is not None:
+            key['policies'] = file_digest(policy_file)
+        return key
+
+    def path(self, key: dict) -> str:
+        # Named after the input paths only, so a changed input overwrites its stale snapshot
+        names = json.dumps([source[0] for source in key['inputs']]).encode('utf-8')
+        return os.path.join(self.cache_dir, hashlib.blake2b(names, digest_size=8).hexdigest() + '.snapshot')
+
+    def load(self, key: dict) -> Optional[Tuple[dict, Dict[str, bytes]]]:
+        try:
+            with open(self.path(key), 'rb') as file:
+                if file.read(len(SnapshotCache.magic)) != SnapshotCache.magic:
+                    return None
+                [header_size] = struct.unpack('<I', file.read(4))
+                header = json.loads(file.read(header_size).decode('utf-8'))
+                if header['key'] != key:
+                    return None
+                blobs = {}
+                for [name, size] in header['blobs']:
+                    blobs[name] = file.read(size)
+                    if len(blobs[name]) != size:
+                        return None
+                return header['payload'], blobs
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+    def store(self, key: dict, payload: dict, blobs: Dict[str, bytes]):
+        header = json.dumps({
+            'key': key,
+            'payload': payload,
+            'blobs': [[name, len(blob)] for [name, blob] in blobs.items()]
+        }, ensure_ascii=False).encode('utf-8')
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(key)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(SnapshotCache.magic)
+            file.write(struct.pack('<I', len(header)))
+            file.write(header)
+            for blob in blobs.values():
+                file.write(blob)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,116 @@
+import json
+import random
+from collections import defaultdict
+
+import pytest
+
+import daegu_bank.aggregation_engine as aggregation_engine
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.aggregation_engine import AggregationEngine, PeriodAggregate
+from daegu_bank.mydata_reader import MyDataReader
+from daegu_bank.transcation_type import TransactionType
+from defs import ClassificationPolicies, special_exceptions
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def grouping(request, monkeypatch):
+    # Runs a test over the NumPy grouping and over the pure-Python one
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(aggregation_engine, 'numpy', None)
+    return request.param
+
+
+def legacy_class_name(row) -> str:
+    # How the original ClassificationStatistics filed a row
+    if str(row.transaction_datetime) in special_exceptions:
+        return special_exceptions[str(row.transaction_datetime)]
+    money_flow_type = 'I' if row.income > 0 else 'L' if row.loss > 0 else 'N'
+    model = {'I': ClassificationPolicies.Income, 'L': ClassificationPolicies.Loss}.get(money_flow_type)
+    for policy in model.get_policies() if model is not None else []:
+        if policy.pass_filter(row):
+            return policy.name()
+    if row.transaction_type in [TransactionType.cash_dispenser, TransactionType.cash_dispenser_partner]:
+        return f'{money_flow_type}-ATM'
+    return f'{money_flow_type}-other'
+
+
+def legacy_totals(rows: list) -> dict:
+    # The totals the original MonthlyStatistics and ClassificationStatistics computed from a month's rows
+    rows = sorted(rows, key=lambda row: row.pk)
+    categories = defaultdict(lambda: [0, 0])
+    for row in rows:
+        categories[legacy_class_name(row)][0] += row.income
+        categories[legacy_class_name(row)][1] += row.loss
+    return {
+        'start_balance': rows[0].balance - rows[0].income + rows[0].loss,
+        'end_balance': rows[-1].balance,
+        'total_income': sum(row.income for row in rows),
+        'total_loss': sum(row.loss for row in rows),
+        'row_count': len(rows),
+        'categories': [[class_name, income, loss] for [class_name, [income, loss]] in categories.items()]
+    }
+
+
+def summary(aggregate: PeriodAggregate) -> dict:
+    data = aggregate.to_dict()
+    return {
+        'start_balance': data['start_balance'], 'end_balance': data['end_balance'],
+        'total_income': data['total_income'], 'total_loss': data['total_loss'], 'row_count': data['row_count'],
+        'categories': [[class_name, category[0], category[1]] for [class_name, category] in data['categories']]
+    }
+
+
+@pytest.fixture(scope='module')
+def ledger(tmp_path_factory) -> str:
+    filename = str(tmp_path_factory.mktemp('ledger') / 'mydata.txt')
+    write_ledger(filename, 4000, unknown_ratio=0.3)
+    return filename
+
+
+def test_aggregates_match_the_original_monthly_totals(ledger, grouping):
+    pfa = PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False)
+    rows = list(MyDataReader(ledger))
+    for [date, [start_date, end_date]] in pfa.analysis_target_dates.items():
+        month_rows = [row for row in rows if start_date <= row.transaction_datetime.date() <= end_date]
+        aggregate = pfa.aggregation_engine.aggregates[date]
+        if len(month_rows) == 0:
+            assert aggregate.row_count == 0
+            continue
+        assert summary(aggregate) == legacy_totals(month_rows), date
+
+
+def test_merge_does_not_depend_on_the_order_of_slices(ledger, grouping):
+    pfa = PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False)
+    arguments = [pfa.transaction_table, pfa.period_codes, pfa.class_codes, pfa.class_names]
+    whole = AggregationEngine(pfa.period_index.dates)
+    whole.add_rows(*arguments)
+    expected = {date: aggregate.to_dict() for [date, aggregate] in whole.aggregates.items()}
+    assert expected == {date: aggregate.to_dict() for [date, aggregate] in pfa.aggregation_engine.aggregates.items()}
+
+    rng = random.Random(0)
+    positions = list(range(len(pfa.transaction_table)))
+    for _ in range(3):
+        rng.shuffle(positions)
+        cuts = sorted(rng.sample(range(1, len(positions)), 5))
+        sliced = AggregationEngine(pfa.period_index.dates)
+        for [start, stop] in zip([0] + cuts, cuts + [len(positions)]):
+            sliced.add_rows(*arguments, positions=positions[start:stop])
+        assert {date: aggregate.to_dict() for [date, aggregate] in sliced.aggregates.items()} == expected
+
+
+def test_aggregates_survive_the_snapshot_format(ledger, grouping, tmp_path):
+    pfa = PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False)
+    for aggregate in pfa.aggregation_engine.aggregates.values():
+        # Through JSON, as the snapshot header stores them
+        restored = PeriodAggregate.from_dict(json.loads(json.dumps(aggregate.to_dict())))
+        assert restored.to_dict() == aggregate.to_dict()
+        assert list(restored.categories) == list(aggregate.categories)
+
+    cache_dir = str(tmp_path / 'cache')
+    PersonalFinancialAnalyzer(ledger, cache_dir=cache_dir, prefetch=False)
+    warm = PersonalFinancialAnalyzer(ledger, cache_dir=cache_dir, prefetch=False)
+    assert {date: aggregate.to_dict() for [date, aggregate] in warm.aggregation_engine.aggregates.items()} == \
+        {date: aggregate.to_dict() for [date, aggregate] in pfa.aggregation_engine.aggregates.items()}
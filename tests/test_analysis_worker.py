@@ -0,0 +1,79 @@
+import datetime
+import time
+
+from analysis_worker import AnalysisWorker
+from benchmarks.synthetic_ledger import analysis_span, write_ledger
+from daegu_bank.mydata_reader import default_encoding
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+def wait(worker: AnalysisWorker):
+    while worker.busy:
+        time.sleep(0.01)
+    assert worker.error is None
+
+
+def months(monthly_statistics) -> list:
+    return [repr(monthly_statistics[date]) for date in monthly_statistics]
+
+
+def test_snapshot_months_are_built_from_the_snapshot(tmp_path):
+    filename = str(tmp_path / 'mydata.txt')
+    [start, stop] = analysis_span()
+    middle = datetime.datetime(2021, 1, 10)
+    write_ledger(filename, 3000, start=start, stop=middle)
+    before = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+
+    worker = AnalysisWorker()
+    worker.analyze(lambda: PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False))
+    wait(worker)
+    first = worker.latest()
+    # Nothing is built until the viewer asks, then the neighbours follow in the background
+    assert len(first.monthly_statistics.cache) == 0
+    first.monthly_statistics[first.dates[1]]
+    deadline = time.perf_counter() + 10
+    while len(first.monthly_statistics.cache) < 3 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert set(first.monthly_statistics.cache) == set(first.dates[0:3])
+
+    export = tmp_path / 'export.txt'
+    write_ledger(str(export), 1000, start=middle, stop=stop, first_pk=3001)
+    with open(filename, 'a', encoding=default_encoding()) as file:
+        file.write(export.read_text(encoding=default_encoding()))
+    worker.refresh()
+    wait(worker)
+    second = worker.latest()
+    worker.stop()
+
+    # Months of the first snapshot built only now still show the rows it was published with
+    assert second.version == first.version + 1
+    assert months(first.monthly_statistics) == months(before.monthly_statistics_folder)
+    assert months(second.monthly_statistics) == months(PersonalFinancialAnalyzer(
+        filename, cache_dir=None, prefetch=False).monthly_statistics_folder)
+
+
+def test_forecasts_are_published_again_on_a_new_day(tmp_path):
+    filename = str(tmp_path / 'mydata.txt')
+    write_ledger(filename, 3000)
+    pfa = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+    worker = AnalysisWorker(pfa)
+    first = worker.latest()
+    assert first.forecast_day == datetime.date.today()
+
+    # Nothing is published for the day the forecasts already start from
+    worker.refresh_forecasts(first.forecast_day)
+    wait(worker)
+    assert worker.latest() is None
+
+    date = first.dates[-2]
+    day = first.spans[date][0] + datetime.timedelta(days=3)
+    worker.refresh_forecasts(day)
+    worker.refresh_forecasts(day)
+    wait(worker)
+    second = worker.latest()
+    worker.stop()
+    assert second.version == first.version + 1
+    assert second.forecast_day == day
+    assert repr(second.forecasts[date]) == repr(pfa.forecast_balance(date, today=day))
+    assert set(second.forecasts) == {date for [date, [start_date, end_date]] in second.spans.items() if
+                                     end_date >= max(start_date + datetime.timedelta(days=1), day)}
@@ -0,0 +1,88 @@
+import datetime
+
+import pytest
+
+import balance_forecast
+from benchmarks.synthetic_ledger import analysis_span, footer, header, policy_notes, write_ledger
+from business_calendar import business_calendar
+from daegu_bank.mydata_reader import default_encoding
+from defs import ClassificationPolicies
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+[daily_spend, pay] = [10000, 3000000]
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def simulation(request, monkeypatch):
+    # Runs a test over the NumPy simulation and over the pure-Python one
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(balance_forecast, 'numpy', None)
+    return request.param
+
+
+def write_salaried_ledger(filename: str):
+    # The same spend every day and the same pay every payday, so every simulated run ends at the same balance
+    [start, stop] = analysis_span()
+    paydays = set(business_calendar.paydays(start.date(), stop.date(), PersonalFinancialAnalyzer.payday_of_month))
+    [income_note, loss_note] = [policy_notes(ClassificationPolicies.Income)[0],
+                                policy_notes(ClassificationPolicies.Loss)[0]]
+    [balance, pk, lines] = [1000000, 0, [header + '\n']]
+    for day in range((stop - start).days):
+        date = start.date() + datetime.timedelta(days=day)
+        flows = [(0, pay, income_note, 9)] if date in paydays else []
+        for [loss, income, note, hour] in flows + [(daily_spend, 0, loss_note, 12)]:
+            [balance, pk] = [balance + income - loss, pk + 1]
+            lines.append(f'{pk}|{date:%Y-%m-%d} [{hour:02d}:00:00]|대체|{loss:,}|{income:,}|{balance:,}|{note}|memo|'
+                         f'branch\n')
+    lines.append(footer + '\n')
+    with open(filename, 'w', encoding=default_encoding()) as file:
+        file.writelines(lines)
+
+
+def test_forecast_adds_paydays(tmp_path, simulation):
+    filename = str(tmp_path / 'mydata.txt')
+    write_salaried_ledger(filename)
+    pfa = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+    date = list(pfa.analysis_target_dates)[-1]
+    [start_date, end_date] = pfa.analysis_target_dates[date]
+    today = start_date + datetime.timedelta(days=5)
+
+    within = pfa.forecast_balance(date, today=today)
+    assert within.payday_count == 0
+    assert set(within.bands.values()) == {within.start_balance - within.left_day_count * daily_spend}
+
+    beyond_date = end_date + datetime.timedelta(days=40)
+    beyond = pfa.forecast_balance(date, today=today, end_date=beyond_date)
+    assert beyond.payday_count == len(business_calendar.paydays(today, beyond_date, pfa.payday_of_month))
+    assert beyond.payday_count > 0
+    assert set(beyond.bands.values()) == {beyond.start_balance - beyond.left_day_count * daily_spend +
+                                          beyond.payday_count * pay}
+    assert beyond.below_probability == 0
+
+
+
+def test_both_simulations_agree(tmp_path, monkeypatch):
+    pytest.importorskip('numpy')
+    filename = str(tmp_path / 'mydata.txt')
+    write_ledger(filename, 3000)
+    forecasts = []
+    for simulation in ['numpy', 'python']:
+        if simulation == 'python':
+            monkeypatch.setattr(balance_forecast, 'numpy', None)
+        # A fresh analyzer each time, since the forecaster keeps its forecasts
+        pfa = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+        date = list(pfa.analysis_target_dates)[-2]
+        today = pfa.analysis_target_dates[date][0] + datetime.timedelta(days=3)
+        forecasts.append(pfa.forecast_balance(date, today=today))
+    for forecast in forecasts:
+        assert list(forecast.bands.values()) == sorted(forecast.bands.values())
+        assert 0 <= forecast.below_probability <= 1
+    [numpy_forecast, python_forecast] = forecasts
+    assert [numpy_forecast.start_balance, numpy_forecast.left_day_count, numpy_forecast.payday_count] == \
+        [python_forecast.start_balance, python_forecast.left_day_count, python_forecast.payday_count]
+    # Different generators, so only the distributions agree
+    spread = numpy_forecast.bands[95] - numpy_forecast.bands[5]
+    assert spread > 0
+    assert abs(numpy_forecast.bands[50] - python_forecast.bands[50]) <= spread / 2
@@ -0,0 +1,38 @@
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.binary_ledger import convert
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+def summarize(pfa: PersonalFinancialAnalyzer) -> dict:
+    return {
+        'rows': len(pfa.transaction_table),
+        'pks': list(pfa.transaction_table.column('pk')),
+        'classes': [pfa.class_names[class_code] for class_code in pfa.class_codes],
+        'aggregates': {date: aggregate.to_dict() for [date, aggregate] in pfa.aggregation_engine.aggregates.items()},
+        'outside_row_count': pfa.outside_row_count,
+        'span': [pfa.start_datetime, pfa.end_datetime],
+        'months': [repr(pfa.monthly_statistics_folder[date]) for date in pfa.analysis_target_dates]
+    }
+
+
+def test_binary_ledger_restores_from_snapshot(tmp_path, monkeypatch):
+    text = str(tmp_path / 'mydata.txt')
+    binary = str(tmp_path / 'mydata.pfal')
+    write_ledger(text, 3000)
+    convert(text, binary)
+    cache_dir = str(tmp_path / 'cache')
+
+    cold = PersonalFinancialAnalyzer(binary, cache_dir=cache_dir, prefetch=False)
+    # Only the rows inside the analysis periods are mapped, so the figures match rather than the tables
+    [binary_summary, text_summary] = [summarize(cold), summarize(PersonalFinancialAnalyzer(text, cache_dir=None,
+                                                                                           prefetch=False))]
+    for name in ['aggregates', 'outside_row_count', 'span', 'months']:
+        assert binary_summary[name] == text_summary[name]
+
+    def analyze(self, filename):
+        raise AssertionError('a warm start must not analyze the rows again')
+
+    monkeypatch.setattr(PersonalFinancialAnalyzer, 'analyze', analyze)
+    warm = PersonalFinancialAnalyzer(binary, cache_dir=cache_dir, prefetch=False)
+    assert warm.binary_ledger is not None
+    assert summarize(warm) == summarize(cold)
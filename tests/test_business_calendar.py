@@ -0,0 +1,76 @@
+import datetime
+
+import pytest
+
+from business_calendar import BusinessCalendar, business_calendar, korean_holidays
+
+
+def dates(*isoformats: str) -> list:
+    return [datetime.date.fromisoformat(isoformat) for isoformat in isoformats]
+
+
+def substitutes(year: int) -> list:
+    return [day for [day, name] in korean_holidays(year).items() if name.startswith('대체공휴일')]
+
+
+def test_substitute_holidays_follow_the_rules_of_their_year():
+    # 설날 and 추석 on a Sunday, and 어린이날 on a weekend, since 2014; none before
+    assert substitutes(2013) == []
+    assert substitutes(2014) == dates('2014-09-10')
+    # The national days on a weekend since August 2021: 광복절 2020 fell on a Saturday, 광복절 2021 on a Sunday
+    assert substitutes(2020) == dates('2020-01-27')
+    assert substitutes(2021) == dates('2021-08-16', '2021-10-04', '2021-10-11')
+    assert substitutes(2022) == dates('2022-09-12', '2022-10-10')
+    # 설날 on a Sunday, and 부처님오신날 on a Saturday since May 2023; 추석 on a Saturday has none
+    assert substitutes(2023) == dates('2023-01-24', '2023-05-29')
+    assert substitutes(2024) == dates('2024-02-12', '2024-05-06')
+    # 어린이날 and 부처님오신날 on the same day
+    assert korean_holidays(2025)[datetime.date(2025, 5, 6)] == '대체공휴일(어린이날)'
+    assert substitutes(2025) == dates('2025-03-03', '2025-05-06', '2025-10-08')
+    assert substitutes(2026) == dates('2026-03-02', '2026-05-25', '2026-08-17', '2026-10-05')
+
+
+def test_declared_holidays_are_kept():
+    holidays = korean_holidays(2026)
+    assert holidays[datetime.date(2026, 6, 3)] == '지방선거'
+    assert not business_calendar.is_business_day(datetime.date(2026, 6, 3))
+    assert business_calendar.is_business_day(datetime.date(2026, 6, 4))
+    assert [day for [day, name] in holidays.items() if name == '추석'] == dates('2026-09-24', '2026-09-25',
+                                                                              '2026-09-26')
+
+
+def test_payday_rolls_back_across_holidays():
+    # 추석 2021 ran from Monday the 20th to Wednesday the 22nd, so pay due on the 21st came on Friday the 17th
+    assert business_calendar.payday(2021, 9, 21) == datetime.date(2021, 9, 17)
+    # 설날 2026 ran from Monday the 16th to Wednesday the 18th; the 21st is a Saturday
+    assert business_calendar.payday(2026, 2, 21) == datetime.date(2026, 2, 20)
+    # A business day is its own payday; a day past the end of a month is its last day
+    assert business_calendar.payday(2021, 10, 21) == datetime.date(2021, 10, 21)
+    assert business_calendar.payday(2021, 2, 31) == datetime.date(2021, 2, 26)
+    assert business_calendar.payday_span(2021, 9, 21) == (datetime.date(2021, 9, 17), datetime.date(2021, 10, 20))
+
+
+def test_paydays_include_those_moved_back_into_range():
+    assert business_calendar.paydays(datetime.date(2021, 9, 1), datetime.date(2021, 10, 31), 21) == \
+        dates('2021-09-17', '2021-10-21')
+    assert business_calendar.paydays(datetime.date(2021, 9, 18), datetime.date(2021, 10, 20), 21) == []
+    # Pay due on Sunday 1 May 2022 came on Friday 29 April
+    assert business_calendar.paydays(datetime.date(2022, 4, 1), datetime.date(2022, 4, 30), 1) == \
+        dates('2022-04-01', '2022-04-29')
+
+
+def test_lookups_match_a_scan():
+    calendar = BusinessCalendar(2020, 2022)
+    holidays = set(korean_holidays(2020)).union(korean_holidays(2021), korean_holidays(2022))
+    days = [datetime.date(2020, 1, 1) + datetime.timedelta(days=offset) for offset in range(3 * 365 + 1)]
+    business = [day for day in days if day.weekday() < 5 and day not in holidays]
+    for day in days:
+        assert calendar.is_business_day(day) == (day in business)
+        if day >= business[0]:
+            assert calendar.on_or_before(day) == max(other for other in business if other <= day)
+        if day <= business[-1]:
+            assert calendar.on_or_after(day) == min(other for other in business if other >= day)
+    with pytest.raises(ValueError):
+        calendar.on_or_before(datetime.date(2020, 1, 1))
+    with pytest.raises(ValueError):
+        calendar.position(datetime.date(2023, 1, 1))
@@ -0,0 +1,134 @@
+from typing import Optional
+
+from benchmarks.synthetic_ledger import header, write_ledger
+from daegu_bank.classification_engine import ClassificationEngine
+from daegu_bank.classification_policy import ClassificationModel, LossPolicy
+from daegu_bank.mydata_reader import MyDataReader, default_encoding
+from daegu_bank.mydata_row import MyDataRow
+from defs import ClassificationPolicies
+
+# Notes the synthetic ledger never writes: regex matches, near misses of exact notes and of anchored regexes, and
+# notes that an income and a loss policy both match
+extra_notes = ['한국철도공사        서울', '한국철도공사', '한국철도공사        ', 'GS25 불로점', '지에스25드림병원점',
+               'GS25 수성점', '씨유', '씨유수성롯데캐슬', '씨유다른점', '이마트24 S대구은', '팔공E-마트', '다이소대구이시점',
+               '토스＿홍길동', '토스＿홍길', '***** 2021년 01월 영플러스통장 수수료 면', '**** 2021년 01월 영플러스통장 수수료 면',
+               '농협윤재상', '11번가 ', ' 11번가', '', '모름']
+
+
+class Overlapping(ClassificationModel):
+    # Policies whose notes overlap, so that which one is tried first decides the class
+    class Convenience(LossPolicy):
+        _name = '편의점'
+        _note_regex = ['씨유.*', '(지에스|GS)25']
+
+    class Shopping(LossPolicy):
+        _name = '쇼핑'
+        _note_filter = ['씨유수성롯데캐슬', '11번가', 'GS25 불로점']
+
+    class Market(LossPolicy):
+        _name = '마트'
+        _note_regex = ['(팔공)?(E-|이)마트', '11번']
+        _note_filter = ['씨유', '이마트24 S대구은']
+
+
+def classify_by_pass_filter(model: type, row: MyDataRow) -> Optional[str]:
+    # The loop ClassificationEngine replaces: the first policy in get_policies() order whose filter passes
+    for policy in model.get_policies():
+        if policy.pass_filter(row):
+            return policy.name()
+    return None
+
+
+def read_rows(tmp_path) -> list:
+    filename = tmp_path / 'mydata.txt'
+    write_ledger(str(filename), 3000, unknown_ratio=0.3)
+    with open(filename, 'a', encoding=default_encoding()) as file:
+        file.write(header + '\n')
+        for [index, note] in enumerate(extra_notes):
+            file.write(f'{10000 + index}|2020-12-01 [12:00:00]|BC|1,000|0|1,000,000|{note}|memo|branch\n')
+    reader = MyDataReader(str(filename))
+    rows = list(reader)
+    assert len(reader.malformed_lines) == 0
+    return rows
+
+
+def test_engine_matches_pass_filter(tmp_path):
+    rows = read_rows(tmp_path)
+    for model in [ClassificationPolicies.Income, ClassificationPolicies.Loss, Overlapping]:
+        # A fresh engine, so that memoised notes of other tests cannot hide a difference
+        engine = ClassificationEngine(model)
+        for row in rows:
+            assert engine.classify(row.note) == classify_by_pass_filter(model, row), (model.__name__, row.note)
+            # The memoised answer as well
+            assert engine.classify(row.note) == classify_by_pass_filter(model, row), (model.__name__, row.note)
+
+
+def test_ledger_covers_unclassified_and_overlapping_rows(tmp_path):
+    # Guards the test above against a ledger that no longer exercises the interesting cases
+    rows = read_rows(tmp_path)
+    models = [ClassificationPolicies.Income, ClassificationPolicies.Loss]
+    assert any(all(classify_by_pass_filter(model, row) is None for model in models) for row in rows)
+    assert any(all(classify_by_pass_filter(model, row) is not None for model in models) for row in rows)
+    assert any(sum(policy.pass_filter(row) for policy in Overlapping.get_policies()) > 1 for row in rows)
+
+
+class GroupReferences(ClassificationModel):
+    # Regexes that refer to their own groups, which splicing them into one alternation would break or redirect
+    class Numbered(LossPolicy):
+        _name = '반복'
+        _note_regex = ['(.)\\1']
+
+    class Named(LossPolicy):
+        _name = '이름'
+        _note_regex = ['(?P<p0>씨유)(?P=p0)']
+
+    class SameName(LossPolicy):
+        _name = '같은이름'
+        _note_regex = ['(?P<p0>GS)25']
+
+    class Conditional(LossPolicy):
+        _name = '조건'
+        _note_regex = ['(<)?마트(?(1)>)$']
+
+    class Plain(LossPolicy):
+        _name = '평범'
+        _note_regex = ['(토스|카카오).*', '.*마트']
+
+
+class InlineFlags(ClassificationModel):
+    # An inline flag compiles on its own but not once it is no longer at the start of the pattern
+    class Plain(LossPolicy):
+        _name = '평범'
+        _note_regex = ['토스.*']
+
+    class Flagged(LossPolicy):
+        _name = '대소문자'
+        _note_regex = ['(?i)gs25']
+
+
+group_reference_notes = ['aa', 'ab', '씨유씨유', '씨유', 'GS25', 'gs25', '<마트>', '<마트', '마트', '이마트', '토스＿홍길동',
+                         '카카오', 'GS2', '']
+
+
+def check_against_pass_filter(model: type, notes: list):
+    engine = ClassificationEngine(model)
+    for note in notes:
+        row = MyDataRow('1', '2021-01-04 [09:00:00]', 'BC', '0', '1,000', '1,000', note, 'memo', 'branch')
+        assert engine.classify(note) == classify_by_pass_filter(model, row), (model.__name__, note)
+    return engine
+
+
+def test_regexes_with_group_references_are_matched_separately():
+    engine = check_against_pass_filter(GroupReferences, group_reference_notes)
+    assert [index for [index, regexes] in engine.separate_regexes] == [0, 1, 2, 3]
+    assert engine.classify('aa') == 'L반복'
+    assert engine.classify('씨유씨유') == 'L이름'
+    assert engine.classify('GS25') == 'L같은이름'
+    assert engine.classify('<마트>') == 'L조건'
+    assert engine.classify('<마트') == 'L평범'
+
+
+def test_alternation_that_does_not_compile_falls_back_to_each_policy():
+    engine = check_against_pass_filter(InlineFlags, group_reference_notes)
+    assert engine.note_regex is None
+    assert engine.classify('GS25') == 'L대소문자'
@@ -0,0 +1,67 @@
+import datetime
+
+from benchmarks.synthetic_ledger import analysis_span, write_ledger
+from household_analyzer import HouseholdAnalyzer
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+def test_household_months_are_the_sum_of_their_accounts(tmp_path):
+    [start, stop] = analysis_span()
+    middle = start + (stop - start) / 2
+    # The second account stops half way, so its balance has to be carried into the months after
+    sources = [str(tmp_path / f'account_{index}.txt') for index in range(3)]
+    write_ledger(sources[0], 1500, seed=0)
+    write_ledger(sources[1], 800, seed=1, stop=middle)
+    write_ledger(sources[2], 600, seed=2, start=middle - datetime.timedelta(days=40))
+    household = HouseholdAnalyzer(sources, cache_dir=None, max_workers=2)
+    accounts = [PersonalFinancialAnalyzer(source, cache_dir=None, prefetch=False) for source in sources]
+    assert household.outside_row_count == sum(account.outside_row_count for account in accounts)
+
+    balances = [None] * len(accounts)
+    carried_any = False
+    for date in household.analysis_target_dates:
+        monthly_statistics = household.monthly_statistics_folder[date]
+        [start_balance, end_balance, total_income, total_loss, row_count] = [0, 0, 0, 0, 0]
+        categories = {}
+        for [index, account] in enumerate(accounts):
+            aggregate = account.aggregation_engine.aggregates[date]
+            if aggregate.row_count > 0:
+                start_balance += aggregate.start_balance
+                end_balance += aggregate.end_balance
+                balances[index] = aggregate.end_balance
+            elif balances[index] is not None:
+                carried_any = True
+                start_balance += balances[index]
+                end_balance += balances[index]
+            total_income += aggregate.total_income
+            total_loss += aggregate.total_loss
+            row_count += aggregate.row_count
+            for [class_name, category] in aggregate.categories.items():
+                [income, loss, count] = categories.get(class_name, [0, 0, 0])
+                categories[class_name] = [income + category.income, loss + category.loss, count + category.row_count]
+
+        assert [monthly_statistics.start_balance, monthly_statistics.end_balance] == [start_balance, end_balance]
+        assert [monthly_statistics.total_income, -monthly_statistics.total_loss] == [total_income, total_loss]
+        assert monthly_statistics.aggregate.row_count == row_count
+        folder = monthly_statistics.classification_statistics.classified_transactions_folder
+        assert {class_name: [classified_transactions.income, classified_transactions.loss,
+                             classified_transactions.row_count] for
+                [class_name, classified_transactions] in folder.items()} == categories
+        # No rows are held, and the sequences say so consistently
+        assert monthly_statistics.aggregate_only
+        for classified_transactions in folder.values():
+            assert len(classified_transactions) == len(list(classified_transactions)) == 0
+    assert carried_any
+
+
+def test_account_months_hold_their_rows(tmp_path):
+    filename = str(tmp_path / 'mydata.txt')
+    write_ledger(filename, 1500)
+    pfa = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+    for monthly_statistics in pfa.monthly_statistics_folder.values():
+        assert not monthly_statistics.aggregate_only
+        folder = monthly_statistics.classification_statistics.classified_transactions_folder
+        for classified_transactions in folder.values():
+            rows = list(classified_transactions)
+            assert len(classified_transactions) == len(rows) == classified_transactions.row_count
+            assert classified_transactions[-1].pk == rows[-1].pk
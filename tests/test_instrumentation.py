@@ -0,0 +1,22 @@
+import tracemalloc
+
+from daegu_bank.instrumentation import Instrumentation
+
+
+def test_memory_is_traced_only_when_asked(tmp_path, monkeypatch):
+    monkeypatch.delenv('PFA_TRACE_MEMORY', raising=False)
+    timing = Instrumentation()
+    timing.enable(str(tmp_path / 'timing.json'))
+    with timing.stage('load', 10):
+        assert not tracemalloc.is_tracing()
+    assert 'peak_memory_bytes' not in timing.stages[0]
+    assert timing.stages[0]['wall_seconds'] >= 0
+
+    memory = Instrumentation()
+    memory.enable(str(tmp_path / 'memory.json'), trace_memory=True)
+    try:
+        with memory.stage('load', 10):
+            [bytes(1 << 20)]
+        assert memory.stages[0]['peak_memory_bytes'] >= 1 << 20
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,27 @@
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.mydata_reader import MyDataReader, load_my_data_tables
+from daegu_bank.transaction_table import TransactionTable
+
+
+def rows(table: TransactionTable) -> list:
+    return list(zip(*(table.column(name) for name in table.columns)))
+
+
+def test_parallel_load_matches_one_sequential_read(tmp_path):
+    # Overlapping exports, so that merging has to interleave their rows
+    filenames = [str(tmp_path / f'mydata_{index}.txt') for index in range(3)]
+    for [index, filename] in enumerate(filenames):
+        write_ledger(filename, 700 + index * 100, seed=index, first_pk=1 + index * 10000)
+
+    sequential = TransactionTable()
+    for filename in filenames:
+        MyDataReader(filename).read_table(sequential)
+    order = sorted(range(len(sequential)),
+                   key=lambda index: (sequential.column('timestamp')[index], sequential.column('pk')[index]))
+
+    [table, malformed_lines, read_positions] = load_my_data_tables(str(tmp_path / 'mydata_*.txt'), max_workers=2)
+    assert malformed_lines == []
+    assert sorted(read_positions) == filenames
+    assert rows(table) == rows(sequential.take(order))
+    keys = list(zip(table.column('timestamp'), table.column('pk')))
+    assert keys == sorted(keys)
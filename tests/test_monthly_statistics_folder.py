@@ -0,0 +1,76 @@
+import collections
+import threading
+
+from monthly_statistics_folder import MonthlyStatisticsFolder
+
+dates = ['2021-01', '2021-02', '2021-03', '2021-04', '2021-05']
+
+
+class Month:
+    # Stands in for a MonthlyStatistics; the folder only counts its rows
+    def __init__(self, date: str, row_count: int):
+        self.date = date
+        self.data = [None] * row_count
+
+
+class Builder:
+    def __init__(self, row_counts: dict = None):
+        self.row_counts = row_counts or {}
+        self.builds = collections.Counter()
+
+    def __call__(self, date: str) -> Month:
+        self.builds[date] += 1
+        return Month(date, self.row_counts.get(date, 10))
+
+
+def test_least_recently_used_months_are_evicted():
+    build = Builder()
+    folder = MonthlyStatisticsFolder(dates, build, max_entries=2, prefetch=False)
+    for date in ['2021-01', '2021-02', '2021-01', '2021-03']:
+        assert folder[date].date == date
+    assert list(folder.cache) == ['2021-01', '2021-03']
+    assert folder.cached('2021-02') is None
+    folder['2021-02']
+    assert list(folder.cache) == ['2021-03', '2021-02']
+    assert build.builds == {'2021-01': 1, '2021-02': 2, '2021-03': 1}
+
+
+def test_row_limit_evicts_until_it_holds():
+    build = Builder({'2021-01': 40, '2021-02': 40, '2021-03': 30})
+    folder = MonthlyStatisticsFolder(dates, build, max_rows=80, prefetch=False)
+    folder['2021-01']
+    folder['2021-02']
+    assert list(folder.cache) == ['2021-01', '2021-02']
+    folder['2021-03']
+    assert list(folder.cache) == ['2021-02', '2021-03']
+    # A month bigger than the limit on its own is still kept while it is the one in use
+    build.row_counts['2021-04'] = 100
+    folder['2021-04']
+    assert list(folder.cache) == ['2021-04']
+
+
+def test_prefetched_neighbours_never_evict_the_month_in_use():
+    for max_entries in [1, 2, 3]:
+        build = Builder()
+        folder = MonthlyStatisticsFolder(dates, build, max_entries=max_entries)
+        folder['2021-03']
+        folder.executor.shutdown(wait=True)
+        assert '2021-03' in folder.cache, max_entries
+        assert len(folder.cache) == max_entries
+        assert set(folder.cache) <= {'2021-02', '2021-03', '2021-04'}
+        assert folder.in_flight == set()
+
+
+def test_each_neighbour_is_prefetched_once():
+    gate = threading.Event()
+    build = Builder()
+    folder = MonthlyStatisticsFolder(dates, build)
+    # Holds the prefetch thread up, so that the neighbours are still queued while the month is asked for again
+    folder.executor.submit(gate.wait, 5)
+    for _ in range(5):
+        folder['2021-03']
+    assert folder.in_flight == {'2021-02', '2021-04'}
+    gate.set()
+    folder.executor.shutdown(wait=True)
+    assert build.builds == {'2021-02': 1, '2021-03': 1, '2021-04': 1}
+    assert folder.in_flight == set()
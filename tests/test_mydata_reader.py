@@ -0,0 +1,57 @@
+import io
+
+from benchmarks.synthetic_ledger import footer, header
+from daegu_bank.mydata_reader import MyDataReader
+
+rows = [
+    '1|2021-01-04 [09:00:00]|대체|0|3,000,000|3,000,000|급여|memo|branch',
+    '2|2021-01-04 [12:30:00]|BC|12,000|0|2,988,000|식당|memo|branch',
+    '3|2021-01-05 [08:10:00]|인터넷|5,000|0|2,983,000|교통|memo|branch'
+]
+
+
+def ledger_bytes(lines) -> bytes:
+    return ('\r\n'.join(lines) + '\r\n').encode('cp949')
+
+
+def read(data: bytes, chunk_size: int = MyDataReader.default_chunk_size) -> MyDataReader:
+    reader = MyDataReader(io.BytesIO(data), encoding='cp949', chunk_size=chunk_size)
+    reader.table = reader.read_table()
+    return reader
+
+
+def test_malformed_lines_are_reported_with_their_line_numbers():
+    lines = [header, rows[0], '2|2021-01-04 [12:30:00]|BC|12,000|0', rows[1],
+             '4|2021-13-01 [00:00:00]|BC|1|0|1|x|memo|branch', '5|2021-01-06 [00:00:00]|BC|1,2a|0|1|x|memo|branch',
+             rows[2], footer]
+    data = ledger_bytes(lines)
+    bad = '6|2021-01-06 [00:00:00]|BC|1|0|1|'.encode('cp949') + b'\xff\xfe|memo|branch'
+    data += bad + b'\r\n'
+    for chunk_size in [MyDataReader.default_chunk_size, 7]:
+        reader = read(data, chunk_size)
+        assert list(reader.table.column('pk')) == [1, 2, 3]
+        # Undecodable lines are reported as their chunk is decoded, ahead of the lines that fail to parse
+        malformed_lines = sorted(reader.malformed_lines)
+        assert [line_number for [line_number, line, reason] in malformed_lines] == [3, 5, 6, 9]
+        assert malformed_lines[0] == (3, lines[2], '5 cells, expected 9')
+        assert reader.line_count == 9
+
+
+def test_row_objects_and_table_columns_agree():
+    data = ledger_bytes([header] + rows + [footer])
+    table = read(data).table
+    objects = list(MyDataReader(io.BytesIO(data), encoding='cp949'))
+    assert [row.pk for row in objects] == list(table.column('pk'))
+    assert [row.income for row in objects] == list(table.column('income'))
+    assert [row.loss for row in objects] == list(table.column('loss'))
+    assert [row.balance for row in objects] == list(table.column('balance'))
+    assert [row.note for row in objects] == list(table.column('note'))
+
+
+def test_footer_ends_an_export_without_being_malformed():
+    # A 합계 footer is skipped rather than read as a row, and an export appended after it is read through
+    data = ledger_bytes([header, rows[0], rows[1], footer, header, rows[2], footer])
+    reader = read(data)
+    assert list(reader.table.column('pk')) == [1, 2, 3]
+    assert reader.malformed_lines == []
+    assert reader.offset == len(data)
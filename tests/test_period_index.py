@@ -0,0 +1,80 @@
+import datetime
+import random
+
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.mydata_reader import default_encoding, epoch_ordinal
+from daegu_bank.transaction_table import to_timestamp
+from period_index import PeriodIndex
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+# Periods with a gap between the second and the third, as a skipped month leaves
+spans = {
+    '2021-01': [datetime.date(2021, 1, 21), datetime.date(2021, 2, 18)],
+    '2021-02': [datetime.date(2021, 2, 19), datetime.date(2021, 3, 18)],
+    '2021-04': [datetime.date(2021, 4, 21), datetime.date(2021, 5, 20)]
+}
+
+
+def brute_force_period(timestamp: int):
+    day = datetime.date.fromordinal(timestamp // 86400 + epoch_ordinal)
+    matches = [date for [date, [start_date, end_date]] in spans.items() if start_date <= day <= end_date]
+    return matches[0] if matches else None
+
+
+def timestamps(count: int, seed: int = 0) -> list:
+    # Every boundary second, plus random seconds from a month before the first period to a month after the last
+    rng = random.Random(seed)
+    boundaries = []
+    for [start_date, end_date] in spans.values():
+        for day in [start_date, end_date + datetime.timedelta(days=1)]:
+            midnight = to_timestamp(datetime.datetime.combine(day, datetime.time()))
+            boundaries.extend([midnight - 1, midnight])
+    [first, last] = [to_timestamp(datetime.datetime(2020, 12, 21)), to_timestamp(datetime.datetime(2021, 6, 20))]
+    return sorted(boundaries + [rng.randrange(first, last) for _ in range(count)])
+
+
+def test_find_and_split_agree_with_brute_force():
+    period_index = PeriodIndex(spans)
+    moments = timestamps(3000)
+    assert [period_index.dates[position] if position is not None else None for position in
+            map(period_index.find, moments)] == [brute_force_period(moment) for moment in moments]
+
+    [ranges, outside_row_count] = period_index.split(moments)
+    for [date, [start, stop]] in zip(period_index.dates, ranges):
+        assert [brute_force_period(moment) for moment in moments[start:stop]] == [date] * (stop - start)
+    assert outside_row_count == sum(1 for moment in moments if brute_force_period(moment) is None)
+    assert outside_row_count + sum(stop - start for [start, stop] in ranges) == len(moments)
+    # Rows before the first period, in the gap and after the last one all count
+    assert 0 < outside_row_count < len(moments)
+
+
+def test_split_of_rows_outside_every_period():
+    period_index = PeriodIndex(spans)
+    assert period_index.split([]) == ([(0, 0)] * 3, 0)
+    early = [to_timestamp(datetime.datetime(2020, 12, 25))] * 4
+    assert period_index.split(early) == ([(4, 4)] * 3, 4)
+    late = [to_timestamp(datetime.datetime(2021, 6, 1))] * 2
+    assert period_index.split(late) == ([(0, 0)] * 3, 2)
+
+
+def test_analyzer_counts_rows_outside_every_period_in_and_out_of_order(tmp_path):
+    filename = tmp_path / 'mydata.txt'
+    write_ledger(str(filename), 3000)
+    lines = filename.read_text(encoding=default_encoding()).split('\n')
+    shuffled = tmp_path / 'shuffled.txt'
+    body = lines[1:-2]
+    random.Random(0).shuffle(body)
+    shuffled.write_text('\n'.join([lines[0]] + body + lines[-2:]), encoding=default_encoding())
+
+    counts = []
+    for source in [filename, shuffled]:
+        pfa = PersonalFinancialAnalyzer(str(source), cache_dir=None, prefetch=False)
+        days = [datetime.date.fromordinal(timestamp // 86400 + epoch_ordinal) for timestamp in
+                pfa.transaction_table.column('timestamp')]
+        expected = sum(1 for day in days if not any(start_date <= day <= end_date for [start_date, end_date] in
+                                                    pfa.analysis_target_dates.values()))
+        assert pfa.outside_row_count == expected
+        # The shuffled ledger takes the row-by-row path rather than split()
+        assert all(isinstance(rows, slice) == (source == filename) for rows in pfa.period_rows.values())
+        counts.append(pfa.outside_row_count)
+    assert counts[0] == counts[1] > 0
@@ -0,0 +1,71 @@
+import math
+import random
+
+import pytest
+
+import pie_geometry
+from pie_geometry import UnitCircle
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def unit_circle(request, monkeypatch) -> UnitCircle:
+    # A table built, and sliced, by the NumPy path or by the pure-Python one
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(pie_geometry, 'numpy', None)
+    return UnitCircle()
+
+
+def slices(count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    slices = [(400, 300, 200, 0.0, 360.0), (400, 300, 200, -90.0, 0.0), (10, 20, 50, 359.5, 360.5),
+              (400, 300, 200, 45.0, 45.0)]
+    for _ in range(count):
+        start = rng.uniform(-180, 360)
+        slices.append((rng.randrange(800), rng.randrange(600), rng.randrange(1, 300), start,
+                       start + rng.uniform(0, 200)))
+    return slices
+
+
+def test_table_points_match_trigonometry(unit_circle):
+    for degree in [0, 0.125, 33.3, 90, 179.99, 270.5, 359.9, -45, 720.25]:
+        [x, y] = unit_circle.point(400, 300, 200, degree)
+        # Exact at the table's angle, and within half a table step of the asked one
+        angle = unit_circle.step(degree) / unit_circle.resolution / 180 * math.pi
+        assert x == pytest.approx(400 + math.cos(angle) * 200, abs=1e-9)
+        assert y == pytest.approx(300 + math.sin(angle) * 200, abs=1e-9)
+        tolerance = 200 * math.pi / 180 / unit_circle.resolution / 2
+        assert abs(x - (400 + math.cos(degree / 180 * math.pi) * 200)) <= tolerance
+        assert abs(y - (300 + math.sin(degree / 180 * math.pi) * 200)) <= tolerance
+
+
+def test_slice_polygons_match_trigonometry(unit_circle):
+    for [x, y, r, start_degree, stop_degree] in slices(200):
+        polygon = unit_circle.pie(x, y, r, start_degree, stop_degree)
+        assert polygon[0] == (x, y)
+        steps = unit_circle.arc_steps(start_degree, stop_degree)
+        assert list(polygon[1:]) == [(x + int(math.cos(step / unit_circle.resolution / 180 * math.pi) * r),
+                                      y + int(math.sin(step / unit_circle.resolution / 180 * math.pi) * r)) for
+                                     step in steps]
+        # The viewer's original polygon, computed with trigonometry at every vertex, starts and ends within a pixel
+        # of this one, and every vertex is on the circle up to the truncation to pixels
+        if stop_degree != start_degree:
+            precision = max(30, int(abs(stop_degree - start_degree)))
+            delta_radian = (stop_degree - start_degree) / 180 * math.pi
+            original = [(x + int(math.cos(z / precision * delta_radian + start_degree / 180 * math.pi) * r),
+                         y + int(math.sin(z / precision * delta_radian + start_degree / 180 * math.pi) * r)) for
+                        z in [0, precision]]
+            for [[a, b], [c, d]] in zip(original, [polygon[1], polygon[-1]]):
+                assert abs(a - c) <= 1 and abs(b - d) <= 1
+            # A sliver narrower than a table step is a single vertex
+            assert len(steps) == 1 or abs(len(steps) - (precision + 1)) <= 2
+        assert all(r - 1.5 <= math.hypot(a - x, b - y) <= r + 0.5 for [a, b] in polygon[1:])
+
+def test_both_paths_build_the_same_polygons(monkeypatch):
+    pytest.importorskip('numpy')
+    with_numpy = UnitCircle()
+    monkeypatch.setattr(pie_geometry, 'numpy', None)
+    without_numpy = UnitCircle()
+    for arguments in slices(200, seed=1):
+        assert with_numpy.pie(*arguments) == without_numpy.pie(*arguments)
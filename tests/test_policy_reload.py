@@ -0,0 +1,115 @@
+import datetime
+import json
+import os
+import re
+
+import pytest
+
+from benchmarks.synthetic_ledger import policy_notes, write_ledger
+from daegu_bank.policy_set import PolicySet
+from daegu_bank.transaction_table import to_timestamp
+from defs import ClassificationPolicies
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+from tests.test_refresh import summarize
+
+
+@pytest.fixture
+def ledger(tmp_path) -> str:
+    filename = str(tmp_path / 'mydata.txt')
+    write_ledger(filename, 3000, unknown_ratio=0.3)
+    return filename
+
+
+def store(policy_file: str, data: dict):
+    # Bumps the modification time as well, so that a reload within the same clock tick still sees the edit
+    mtime_ns = os.stat(policy_file).st_mtime_ns if os.path.exists(policy_file) else 0
+    PolicySet.from_dict(data).store(policy_file)
+    os.utime(policy_file, ns=(mtime_ns + 10 ** 9, mtime_ns + 10 ** 9))
+
+
+def edit(data: dict) -> dict:
+    # Adds a policy, with a regex that refers to its own group, swaps two and removes one
+    loss = list(data['loss'])
+    loss.insert(0, {'name': '반복', 'note_filter': [], 'note_regex': ['(.)\\1']})
+    [loss[1], loss[2]] = [loss[2], loss[1]]
+    del loss[3]
+    data = dict(data, loss=loss, income=data['income'][1:])
+    data['special_exceptions'] = dict(list(data['special_exceptions'].items())[1:])
+    data['special_exceptions']['2021-01-04 09:00:00'] = 'L기타'
+    return data
+
+
+def test_reload_matches_a_fresh_analysis(ledger, tmp_path):
+    policy_file = str(tmp_path / 'policies.json')
+    store(policy_file, PolicySet.from_defs().to_dict())
+    pfa = PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False, policy_file=policy_file)
+    # Built before the reload, so that it has to move rows between classes
+    assert pfa.unclassified_report.row_count > 0
+    before = summarize(pfa)
+    assert pfa.reload_policies() == 0
+
+    store(policy_file, edit(PolicySet.load(policy_file).to_dict()))
+    assert pfa.reload_policies() > 0
+    assert pfa.reload_policies() == 0
+    after = summarize(pfa)
+    assert after != before
+    assert 'L반복' in after['classes']
+    assert after == summarize(PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False,
+                                                        policy_file=policy_file))
+
+
+def test_policies_that_fail_to_load_keep_the_old_ones(ledger, tmp_path):
+    policy_file = str(tmp_path / 'policies.json')
+    store(policy_file, PolicySet.from_defs().to_dict())
+    pfa = PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False, policy_file=policy_file)
+    [policy_set, before] = [pfa.policy_set, summarize(pfa)]
+    data = PolicySet.load(policy_file).to_dict()
+    data['loss'][0]['note_regex'] = ['(unclosed']
+    with open(policy_file, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.utime(policy_file, ns=(pfa.policy_mtime_ns + 10 ** 9, pfa.policy_mtime_ns + 10 ** 9))
+    with pytest.raises(re.error):
+        pfa.reload_policies()
+    assert pfa.policy_set is policy_set
+    assert summarize(pfa) == before
+    # Not retried until the file changes again
+    assert pfa.reload_policies() == 0
+
+
+def test_affected_notes_are_those_that_can_change_class():
+    policy_set = PolicySet.from_defs()
+    notes = sorted(set(policy_notes(ClassificationPolicies.Loss) + policy_notes(ClassificationPolicies.Income))) + \
+        ['aa', '모름', '']
+    data = policy_set.to_dict()
+    assert policy_set.affected_notes(PolicySet.from_dict(data), notes) == set()
+
+    # Adding and removing policies affects the notes they match, whichever of the two sets gains them
+    # A regex that refers to its own group must not see the groups of another one
+    repeated = {'name': '반복', 'note_filter': ['모름'], 'note_regex': ['(토스|카카오)x', '(.)\\1']}
+    added = dict(data, loss=[repeated] + data['loss'][:-1])
+    other = PolicySet.from_dict(added)
+    for [mine, theirs] in [[policy_set, other], [other, policy_set]]:
+        affected = mine.affected_notes(theirs, notes)
+        assert {'aa', '모름'}.issubset(affected)
+        assert affected != set(notes)
+        for note in set(notes).difference(affected):
+            for flow in ['I', 'L']:
+                assert mine.engines[flow].classify(note) == theirs.engines[flow].classify(note), note
+
+    # Swapping two kept policies can change which of them wins for any note
+    swapped = dict(data, loss=[data['loss'][1], data['loss'][0]] + data['loss'][2:])
+    assert policy_set.affected_notes(PolicySet.from_dict(swapped), notes) == set(notes)
+
+
+def test_changed_exceptions_are_added_removed_or_renamed():
+    policy_set = PolicySet.from_defs()
+    exceptions = dict(policy_set.special_exceptions)
+    [first, second] = list(exceptions)[:2]
+    del exceptions[first]
+    exceptions[second] += '변경'
+    exceptions['2021-01-04 09:00:00'] = 'L기타'
+    other = PolicySet.from_dict(dict(policy_set.to_dict(), special_exceptions=exceptions))
+    expected = {to_timestamp(datetime.datetime.fromisoformat(date)) for date in [first, second, '2021-01-04 09:00:00']}
+    assert policy_set.changed_exceptions(other) == expected
+    assert other.changed_exceptions(policy_set) == expected
+    assert policy_set.changed_exceptions(PolicySet.from_dict(policy_set.to_dict())) == set()
@@ -0,0 +1,95 @@
+import datetime
+import random
+
+import pytest
+
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.transaction_table import to_timestamp
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+from range_index import RangeIndex
+
+
+@pytest.fixture(scope='module')
+def pfa(tmp_path_factory) -> PersonalFinancialAnalyzer:
+    filename = str(tmp_path_factory.mktemp('ledger') / 'mydata.txt')
+    write_ledger(filename, 3000)
+    return PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+
+
+def brute_force(pfa: PersonalFinancialAnalyzer, start_timestamp: int, stop_timestamp: int) -> dict:
+    table = pfa.transaction_table
+    rows = sorted((row for row in (table[index] for index in range(len(table)))),
+                  key=lambda row: (row.timestamp, row.pk))
+    class_names = {row.pk: pfa.class_names[pfa.class_codes[index]] for [index, row] in
+                   enumerate(table[index] for index in range(len(table)))}
+    inside = [row for row in rows if start_timestamp <= row.timestamp < stop_timestamp]
+    before = [row for row in rows if row.timestamp < start_timestamp]
+    if len(inside) > 0:
+        balances = [inside[0].balance - inside[0].income + inside[0].loss, inside[-1].balance]
+    elif len(before) > 0:
+        balances = [before[-1].balance] * 2
+    elif len(rows) > 0:
+        balances = [rows[0].balance - rows[0].income + rows[0].loss] * 2
+    else:
+        balances = [0, 0]
+    categories = {}
+    for row in inside:
+        category = categories.setdefault(class_names[row.pk], [0, 0, 0, row.pk])
+        [category[0], category[1], category[2]] = [category[0] + row.income, category[1] + row.loss, category[2] + 1]
+    return {'total_income': sum(row.income for row in inside), 'total_loss': sum(row.loss for row in inside),
+            'row_count': len(inside), 'balances': balances,
+            'pks': [inside[0].pk, inside[-1].pk] if len(inside) > 0 else None,
+            'categories': sorted(categories.items(), key=lambda item: item[1][3])}
+
+
+def queried(range_index: RangeIndex, start_timestamp: int, stop_timestamp: int) -> dict:
+    aggregate = range_index.query(start_timestamp, stop_timestamp, by_category=True)
+    return {'total_income': aggregate.total_income, 'total_loss': aggregate.total_loss,
+            'row_count': aggregate.row_count, 'balances': [aggregate.start_balance, aggregate.end_balance],
+            'pks': [aggregate.first_pk, aggregate.last_pk] if aggregate.row_count > 0 else None,
+            'categories': [(class_name, category.to_list()) for [class_name, category] in
+                           aggregate.categories.items()]}
+
+
+def windows(pfa: PersonalFinancialAnalyzer, count: int) -> list:
+    # Random windows from before the first row to after the last, plus empty and degenerate ones
+    timestamps = pfa.transaction_table.column('timestamp')
+    [first, last] = [min(timestamps), max(timestamps)]
+    rng = random.Random(0)
+    windows = [(first - 86400, first - 1), (first, first), (first, last + 1), (last + 1, last + 86400),
+               (timestamps[10], timestamps[10] + 1), (first - 86400, last + 86400)]
+    for _ in range(count):
+        [a, b] = sorted(rng.randrange(first - 86400, last + 86400) for _ in range(2))
+        windows.append((a, b))
+    return windows
+
+
+def test_queries_match_brute_force(pfa):
+    range_index = pfa.range_index()
+    for [start_timestamp, stop_timestamp] in windows(pfa, 60):
+        assert queried(range_index, start_timestamp, stop_timestamp) == \
+            brute_force(pfa, start_timestamp, stop_timestamp), (start_timestamp, stop_timestamp)
+
+
+def test_query_range_takes_dates_and_datetimes(pfa):
+    [start, stop] = [datetime.date(2021, 1, 5), datetime.datetime(2021, 2, 3, 12, 30)]
+    expected = brute_force(pfa, to_timestamp(datetime.datetime.combine(start, datetime.time())), to_timestamp(stop))
+    aggregate = pfa.query_range(start, stop)
+    assert [aggregate.total_income, aggregate.total_loss, aggregate.row_count] == \
+        [expected['total_income'], expected['total_loss'], expected['row_count']]
+
+
+def test_rows_added_later_or_out_of_order_give_the_same_answers(pfa):
+    table = pfa.transaction_table
+    appended = RangeIndex(table[0:0], pfa.class_codes, pfa.class_names)
+    for [start, stop] in [(0, 1000), (1000, 1001), (1001, len(table))]:
+        appended.add_rows(table, pfa.class_codes, positions=range(start, stop))
+    # Rows older than the last one indexed force a rebuild
+    shuffled = RangeIndex(table[0:0], pfa.class_codes, pfa.class_names)
+    shuffled.add_rows(table, pfa.class_codes, positions=range(2000, len(table)))
+    shuffled.add_rows(table, pfa.class_codes, positions=range(0, 2000))
+    for range_index in [appended, shuffled]:
+        assert len(range_index) == len(table)
+        for [start_timestamp, stop_timestamp] in windows(pfa, 20):
+            assert queried(range_index, start_timestamp, stop_timestamp) == \
+                brute_force(pfa, start_timestamp, stop_timestamp)
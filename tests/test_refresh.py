@@ -0,0 +1,59 @@
+import datetime
+
+from benchmarks.synthetic_ledger import analysis_span, write_ledger
+from daegu_bank.mydata_reader import default_encoding
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+
+
+def summarize(pfa: PersonalFinancialAnalyzer) -> dict:
+    return {
+        'rows': len(pfa.transaction_table),
+        'pks': list(pfa.transaction_table.column('pk')),
+        'classes': [pfa.class_names[class_code] for class_code in pfa.class_codes],
+        'aggregates': {date: aggregate.to_dict() for [date, aggregate] in pfa.aggregation_engine.aggregates.items()},
+        'outside_row_count': pfa.outside_row_count,
+        'unclassified': [pfa.unclassified_report.row_count, dict(pfa.unclassified_report.note_amounts),
+                         [repr(row) for row in pfa.unclassified_report.top_rows()]]
+    }
+
+
+def append_export(filename: str, tmp_path, row_count: int, first_pk: int, start: datetime.datetime,
+                  stop: datetime.datetime):
+    # Appends a whole export, header and 합계 footer included, as a daily download is added to the ledger
+    export = tmp_path / f'export_{first_pk}.txt'
+    write_ledger(str(export), row_count, seed=first_pk, start=start, stop=stop, first_pk=first_pk)
+    with open(filename, 'a', encoding=default_encoding()) as file:
+        file.write(export.read_text(encoding=default_encoding()))
+
+
+def test_refresh_reads_appended_export(tmp_path):
+    filename = str(tmp_path / 'mydata.txt')
+    [start, stop] = analysis_span()
+    middle = datetime.datetime(2021, 2, 1)
+    write_ledger(filename, 5000, start=start, stop=middle)
+    pfa = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+    assert len(pfa.transaction_table) == 5000
+    # Built before the refresh, so that refresh() has to fold the new rows in
+    assert pfa.unclassified_report.row_count > 0
+
+    append_export(filename, tmp_path, 300, 5001, middle, stop)
+    assert pfa.refresh() == 300
+    fresh = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+    assert len(fresh.transaction_table) == 5300
+    assert summarize(pfa) == summarize(fresh)
+
+
+def test_refresh_after_several_exports(tmp_path):
+    filename = str(tmp_path / 'mydata.txt')
+    [start, stop] = analysis_span()
+    days = [start + (stop - start) * index / 4 for index in range(5)]
+    write_ledger(filename, 2000, start=days[0], stop=days[1])
+    append_export(filename, tmp_path, 1000, 2001, days[1], days[2])
+    pfa = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+    assert len(pfa.transaction_table) == 3000
+
+    append_export(filename, tmp_path, 500, 3001, days[2], days[3])
+    append_export(filename, tmp_path, 500, 3501, days[3], days[4])
+    assert pfa.refresh() == 1000
+    assert pfa.refresh() == 0
+    assert summarize(pfa) == summarize(PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False))
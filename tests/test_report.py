@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.synthetic_ledger import write_ledger
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs report.py in a fresh interpreter where importing pygame fails, then checks that neither pygame nor the
+# viewer was imported along the way
+runner = '''
+import runpy, sys
+sys.modules['pygame'] = None
+sys.argv = ['report.py'] + sys.argv[1:]
+runpy.run_path('report.py', run_name='__main__')
+assert 'main' not in sys.modules, 'the viewer was imported'
+'''
+
+
+@pytest.fixture(scope='module')
+def ledger(tmp_path_factory) -> str:
+    filename = str(tmp_path_factory.mktemp('ledger') / 'mydata.txt')
+    write_ledger(filename, 2000)
+    return filename
+
+
+def report(*args) -> str:
+    result = subprocess.run([sys.executable, '-c', runner, *args, '--no-cache'], cwd=root, capture_output=True,
+                            encoding='utf-8')
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@pytest.mark.parametrize('output_format', ['text', 'json', 'csv'])
+def test_every_format_runs_without_pygame(ledger, output_format):
+    output = report(ledger, '--format', output_format, '--unclassified', '--top', '5')
+    if output_format == 'json':
+        data = json.loads(output)
+        assert len(data['months']) > 0 and len(data['unclassified']['largest_rows']) == 5
+    elif output_format == 'csv':
+        rows = list(csv.reader(io.StringIO(output)))
+        assert rows[0][:3] == ['date', 'start_date', 'end_date'] and len(rows) > 1
+    else:
+        assert '<MonthlyStatistics' in output
+
+
+@pytest.mark.parametrize('arguments', [['--format', 'csv', '--by-class'], ['--rolling', '7'],
+                                       ['--rolling', '30', '--format', 'json', '--by-class'],
+                                       ['--rolling', '7', '--format', 'csv', '--from', '2021-01', '--to', '2021-01']])
+def test_class_and_rolling_reports_run_without_pygame(ledger, arguments):
+    assert len(report(ledger, *arguments).strip()) > 0
@@ -0,0 +1,65 @@
+import datetime
+from typing import Optional
+
+import pytest
+
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.mydata_reader import epoch_ordinal
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+from rolling_window import RollingWindows
+
+window_sizes = (1, 7, 30)
+
+
+@pytest.fixture(scope='module')
+def pfa(tmp_path_factory) -> PersonalFinancialAnalyzer:
+    filename = str(tmp_path_factory.mktemp('ledger') / 'mydata.txt')
+    write_ledger(filename, 3000)
+    return PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False)
+
+
+def brute_force(pfa: PersonalFinancialAnalyzer, dates: list, window: int, class_name: Optional[str]) -> tuple:
+    # Sums over the rows whose day falls in (d - window, d] for every day d, by scanning all rows each time
+    table = pfa.transaction_table
+    rows = [(timestamp // 86400 + epoch_ordinal, income, loss) for [timestamp, income, loss, class_code] in
+            zip(table.column('timestamp'), table.column('income'), table.column('loss'), pfa.class_codes)
+            if class_name is None or pfa.class_names[class_code] == class_name]
+    [incomes, losses] = [[], []]
+    for date in dates:
+        inside = [row for row in rows if date.toordinal() - window < row[0] <= date.toordinal()]
+        incomes.append(sum(row[1] for row in inside))
+        losses.append(sum(row[2] for row in inside))
+    return incomes, losses
+
+
+def check(pfa: PersonalFinancialAnalyzer, rolling_windows: RollingWindows):
+    dates = rolling_windows.dates()
+    ordinals = [timestamp // 86400 + epoch_ordinal for timestamp in pfa.transaction_table.column('timestamp')]
+    assert dates == [datetime.date.fromordinal(ordinal) for ordinal in range(min(ordinals), max(ordinals) + 1)]
+    class_names = rolling_windows.class_names_present()
+    assert sorted(class_names) == sorted(set(pfa.class_names[class_code] for class_code in pfa.class_codes))
+    for class_name in [None] + class_names:
+        for window in window_sizes:
+            [incomes, losses] = rolling_windows.series(window, class_name)
+            assert (list(incomes), list(losses)) == brute_force(pfa, dates, window, class_name), (class_name, window)
+
+
+def test_series_match_brute_force(pfa):
+    check(pfa, RollingWindows(pfa.transaction_table, pfa.class_codes, pfa.class_names, window_sizes))
+
+
+def test_class_without_rows_is_all_zeros(pfa):
+    rolling_windows = pfa.rolling_windows()
+    assert [list(series) for series in rolling_windows.series(7, 'I없는분류')] == [[0] * len(rolling_windows)] * 2
+
+
+def test_rows_added_later_give_the_same_series(pfa):
+    table = pfa.transaction_table
+    ordered = sorted(range(len(table)), key=lambda position: table.column('timestamp')[position])
+    # The middle days first, then later days, then the days in between, then days before the first one
+    rolling_windows = RollingWindows(table.take(ordered[1000:2000]), [pfa.class_codes[position] for position in
+                                                                      ordered[1000:2000]],
+                                     pfa.class_names, window_sizes)
+    for positions in [ordered[2500:], ordered[2000:2500], [], ordered[0:1000]]:
+        rolling_windows.add_rows(table, pfa.class_codes, positions)
+    check(pfa, rolling_windows)
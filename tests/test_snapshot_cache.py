@@ -0,0 +1,78 @@
+import shutil
+
+import pytest
+
+import snapshot_cache
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.policy_set import PolicySet
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+from tests.test_refresh import summarize
+
+
+@pytest.fixture
+def analyses(monkeypatch):
+    # Records whether each analyzer parsed its ledger or restored a snapshot
+    analyses = []
+    analyze = PersonalFinancialAnalyzer.analyze
+
+    def counting_analyze(self, filename):
+        analyses.append(filename)
+        analyze(self, filename)
+
+    monkeypatch.setattr(PersonalFinancialAnalyzer, 'analyze', counting_analyze)
+    return analyses
+
+
+def edited_copy(module, tmp_path) -> str:
+    # A copy of a module's source with a comment appended, which changes its digest but nothing else
+    copy = str(tmp_path / module.__name__) + '.py'
+    shutil.copyfile(module.__file__, copy)
+    with open(copy, 'a', encoding='utf-8') as file:
+        file.write('# edited\n')
+    return copy
+
+
+def test_snapshot_is_restored_until_an_input_changes(tmp_path, analyses, monkeypatch):
+    filename = str(tmp_path / 'mydata.txt')
+    cache_dir = str(tmp_path / 'cache')
+    write_ledger(filename, 2000)
+    cold = summarize(PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False))
+    assert len(analyses) == 1
+
+    warm = summarize(PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False))
+    assert len(analyses) == 1
+    assert warm == cold
+
+    for module in [snapshot_cache.defs, snapshot_cache.business_calendar]:
+        with monkeypatch.context() as context:
+            context.setattr(module, '__file__', edited_copy(module, tmp_path))
+            PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False)
+        # Back to the original source, whose snapshot the edited one overwrote
+        PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False)
+    assert len(analyses) == 5
+
+    write_ledger(filename, 2100)
+    assert summarize(PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False))['rows'] == 2100
+    assert len(analyses) == 6
+
+
+def test_snapshot_follows_the_policy_file(tmp_path, analyses):
+    filename = str(tmp_path / 'mydata.txt')
+    cache_dir = str(tmp_path / 'cache')
+    policy_file = str(tmp_path / 'policies.json')
+    write_ledger(filename, 2000)
+    PolicySet.from_defs().store(policy_file)
+    PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False, policy_file=policy_file)
+    PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False, policy_file=policy_file)
+    assert len(analyses) == 1
+
+    # Everything left over is now one class, which the snapshot must not hide
+    data = PolicySet.load(policy_file).to_dict()
+    data['loss'].append({'name': '나머지', 'note_filter': [], 'note_regex': ['.*']})
+    PolicySet.from_dict(data).store(policy_file)
+    pfa = PersonalFinancialAnalyzer(filename, cache_dir=cache_dir, prefetch=False, policy_file=policy_file)
+    assert len(analyses) == 2
+    assert 'L나머지' in pfa.class_names
+    assert 'L-other' not in [pfa.class_names[class_code] for class_code in pfa.class_codes]
+    fresh = PersonalFinancialAnalyzer(filename, cache_dir=None, prefetch=False, policy_file=policy_file)
+    assert summarize(pfa) == summarize(fresh)
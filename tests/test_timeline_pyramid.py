@@ -0,0 +1,51 @@
+import random
+
+from timeline_pyramid import TimelinePyramid
+
+
+def brute_force_levels(ys: list) -> list:
+    # Positions of the first lowest and first highest point of every bucket of 2 ** level points
+    levels = []
+    level = 1
+    while (len(ys) - 1) >> (level - 1) > 0:
+        size = 1 << level
+        buckets = [range(start, min(len(ys), start + size)) for start in range(0, len(ys), size)]
+        levels.append(([min(bucket, key=ys.__getitem__) for bucket in buckets],
+                       [max(bucket, key=ys.__getitem__) for bucket in buckets]))
+        level += 1
+    return levels
+
+
+def as_lists(levels: list) -> list:
+    return [(list(mins), list(maxs)) for [mins, maxs] in levels]
+
+
+def test_levels_keep_the_extremes():
+    rng = random.Random(0)
+    for count in [0, 1, 2, 3, 5, 8, 17, 1000]:
+        ys = [rng.randrange(20) for _ in range(count)]
+        pyramid = TimelinePyramid(range(count), ys)
+        assert as_lists(pyramid.levels) == brute_force_levels(ys)
+
+
+def test_append_matches_a_build():
+    rng = random.Random(1)
+    ys = [rng.randrange(100) for _ in range(300)]
+    pyramid = TimelinePyramid(range(100), ys[:100])
+    for [t, y] in enumerate(ys[100:], start=100):
+        pyramid.append(t, y)
+    assert as_lists(pyramid.levels) == as_lists(TimelinePyramid(range(300), ys).levels)
+
+
+def test_from_columns_and_restore():
+    rng = random.Random(2)
+    timestamps = [1000 + rng.randrange(10 ** 6) for _ in range(500)]
+    balances = [rng.randrange(10 ** 6) for _ in range(500)]
+    positions = list(range(0, 500, 2))
+    pyramid = TimelinePyramid.from_columns(timestamps, balances, positions, 1000)
+    points = sorted((timestamps[position] - 1000, balances[position]) for position in positions)
+    assert list(pyramid.ts) == [t for [t, y] in points]
+    restored = TimelinePyramid.restore(pyramid.dump())
+    assert list(restored.ts) == list(pyramid.ts) and list(restored.ys) == list(pyramid.ys)
+    assert as_lists(restored.levels) == as_lists(pyramid.levels)
+    assert restored.query(0, 10 ** 6, 20) == pyramid.query(0, 10 ** 6, 20)
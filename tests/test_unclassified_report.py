@@ -0,0 +1,63 @@
+import collections
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.synthetic_ledger import write_ledger
+from daegu_bank.unclassified_report import UnclassifiedReport
+from personal_financial_analyzer import PersonalFinancialAnalyzer
+from tests.test_report import report, root
+
+
+@pytest.fixture(scope='module')
+def ledger(tmp_path_factory) -> str:
+    filename = str(tmp_path_factory.mktemp('ledger') / 'mydata.txt')
+    write_ledger(filename, 3000, unknown_ratio=0.3)
+    return filename
+
+
+@pytest.fixture(scope='module')
+def pfa(ledger) -> PersonalFinancialAnalyzer:
+    return PersonalFinancialAnalyzer(ledger, cache_dir=None, prefetch=False)
+
+
+def unclassified_rows(pfa: PersonalFinancialAnalyzer) -> list:
+    # Every row filed under an -other class within a period, found the slow way
+    return [pfa.transaction_table[position] for position in range(len(pfa.transaction_table)) if
+            pfa.class_names[pfa.class_codes[position]].endswith('-other') and pfa.period_codes[position] >= 0]
+
+
+@pytest.mark.parametrize('top_k', [0, 1, 5, 100000])
+def test_report_keeps_the_largest_rows_and_every_note(pfa, top_k):
+    rows = unclassified_rows(pfa)
+    unclassified_report = pfa.build_unclassified_report(top_k=top_k)
+    assert unclassified_report.row_count == len(rows)
+    assert unclassified_report.note_counts == collections.Counter(row.note for row in rows)
+    amounts = collections.Counter()
+    for row in rows:
+        amounts[row.note] += UnclassifiedReport.amount(row)
+    assert unclassified_report.note_amounts == amounts
+
+    top_rows = unclassified_report.top_rows()
+    assert len(top_rows) == min(max(top_k, 0), len(rows))
+    # Amounts may tie, so rows are compared by amount and only the amounts must be the largest ones
+    assert [UnclassifiedReport.amount(row) for row in top_rows] == \
+        sorted((UnclassifiedReport.amount(row) for row in rows), reverse=True)[:len(top_rows)]
+
+
+def test_lazy_report_matches_a_full_build(pfa):
+    built = pfa.build_unclassified_report()
+    assert pfa.unclassified_report.row_count == built.row_count
+    assert [row.pk for row in pfa.unclassified_report.top_rows()] == [row.pk for row in built.top_rows()]
+
+
+def test_report_command_lists_notes_only_with_top_0(ledger):
+    output = json.loads(report(ledger, '--format', 'json', '--unclassified', '--top', '0'))
+    assert output['unclassified']['largest_rows'] == []
+    assert output['unclassified']['row_count'] > 0 and len(output['unclassified']['notes']) > 0
+
+    result = subprocess.run([sys.executable, 'report.py', ledger, '--unclassified', '--top', '-1'], cwd=root,
+                            capture_output=True, encoding='utf-8')
+    assert result.returncode == 2 and '--top must not be negative' in result.stderr
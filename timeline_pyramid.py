@@ -0,0 +1,127 @@
+import bisect
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+
+class TimelinePyramid:
+    # Min/max decimation of a (t, y) series sorted by t. Level k >= 1 keeps, for every bucket of 2 ** k consecutive
+    # points, the position of its lowest and of its highest point, so any time range can be drawn with about two
+    # points per pixel without losing the extremes.
+
+    def __init__(self, ts: Sequence[int], ys: Sequence[int]):
+        self.ts = array('q', ts)
+        self.ys = array('q', ys)
+        self.levels: List[Tuple[array, array]] = []
+        self.build()
+
+    @staticmethod
+    def from_columns(timestamps: Sequence[int], balances: Sequence[int], positions: Sequence[int],
+                     origin_timestamp: int):
+        # The balance after each row at positions, against seconds since origin_timestamp, straight from a table's
+        # columns
+        ts = array('q', [timestamps[position] - origin_timestamp for position in positions])
+        ys = array('q', [balances[position] for position in positions])
+        if any(ts[index] > ts[index + 1] for index in range(len(ts) - 1)):
+            order = sorted(range(len(ts)), key=ts.__getitem__)
+            [ts, ys] = [array('q', [ts[index] for index in order]), array('q', [ys[index] for index in order])]
+        return TimelinePyramid(ts, ys)
+
+    def build(self):
+        self.levels = []
+        [mins, maxs] = [range(len(self.ts)), range(len(self.ts))]
+        while len(mins) > 1:
+            [mins, maxs] = self.build_level(mins, maxs)
+            self.levels.append((mins, maxs))
+
+    def build_level(self, lower_mins: Sequence[int], lower_maxs: Sequence[int]) -> Tuple[array, array]:
+        # Pairs up the buckets of the level below; the first of two equal points wins, and an odd last bucket is
+        # carried up as it is
+        ys = self.ys
+        mins = array('q', [right if ys[right] < ys[left] else left for [left, right] in
+                           zip(lower_mins[0::2], lower_mins[1::2])])
+        maxs = array('q', [right if ys[right] > ys[left] else left for [left, right] in
+                           zip(lower_maxs[0::2], lower_maxs[1::2])])
+        if len(lower_mins) % 2 == 1:
+            mins.append(lower_mins[-1])
+            maxs.append(lower_maxs[-1])
+        return mins, maxs
+
+    def dump(self) -> Dict[str, bytes]:
+        # Snapshot blobs of the points and every level, so a restore skips the build
+        blobs = {'timeline.t': self.ts.tobytes(), 'timeline.y': self.ys.tobytes()}
+        for [level, [mins, maxs]] in enumerate(self.levels, start=1):
+            blobs[f'timeline.{level}.mins'] = mins.tobytes()
+            blobs[f'timeline.{level}.maxs'] = maxs.tobytes()
+        return blobs
+
+    @staticmethod
+    def restore(blobs: Dict[str, bytes]):
+        pyramid = TimelinePyramid.__new__(TimelinePyramid)
+        [pyramid.ts, pyramid.ys] = [array('q'), array('q')]
+        pyramid.ts.frombytes(blobs['timeline.t'])
+        pyramid.ys.frombytes(blobs['timeline.y'])
+        pyramid.levels = []
+        while f'timeline.{len(pyramid.levels) + 1}.mins' in blobs:
+            [mins, maxs] = [array('q'), array('q')]
+            mins.frombytes(blobs[f'timeline.{len(pyramid.levels) + 1}.mins'])
+            maxs.frombytes(blobs[f'timeline.{len(pyramid.levels) + 1}.maxs'])
+            pyramid.levels.append((mins, maxs))
+        return pyramid
+
+    def append(self, t: int, y: int):
+        # O(levels) for points in time order; anything else rebuilds the pyramid
+        if len(self.ts) > 0 and t < self.ts[-1]:
+            position = bisect.bisect_right(self.ts, t)
+            self.ts.insert(position, t)
+            self.ys.insert(position, y)
+            self.build()
+            return
+        self.ts.append(t)
+        self.ys.append(y)
+        position = len(self.ts) - 1
+        for [level, [mins, maxs]] in enumerate(self.levels, start=1):
+            bucket = position >> level
+            if bucket == len(mins):
+                mins.append(position)
+                maxs.append(position)
+            else:
+                if y < self.ys[mins[bucket]]:
+                    mins[bucket] = position
+                if y > self.ys[maxs[bucket]]:
+                    maxs[bucket] = position
+        top = self.levels[-1] if len(self.levels) > 0 else (range(len(self.ts)), range(len(self.ts)))
+        while len(top[0]) > 1:
+            top = self.build_level(*top)
+            self.levels.append(top)
+
+    def copy(self):
+        pyramid = TimelinePyramid.__new__(TimelinePyramid)
+        pyramid.ts = array('q', self.ts)
+        pyramid.ys = array('q', self.ys)
+        pyramid.levels = [(array('q', mins), array('q', maxs)) for [mins, maxs] in self.levels]
+        return pyramid
+
+    def __len__(self):
+        return len(self.ts)
+
+    def query(self, start_t: int, stop_t: int, width: int) -> List[Tuple[int, int]]:
+        # The points to draw [start_t, stop_t] at width pixels, with one neighbour on either side so the line
+        # runs to the edges
+        start = max(0, bisect.bisect_left(self.ts, start_t) - 1)
+        stop = min(len(self.ts), bisect.bisect_right(self.ts, stop_t) + 1)
+        if stop <= start:
+            return []
+        level = 0
+        while ((stop - start) >> level) > width and level < len(self.levels):
+            level += 1
+        if level == 0:
+            positions = range(start, stop)
+        else:
+            [mins, maxs] = self.levels[level - 1]
+            positions = []
+            for bucket in range(start >> level, ((stop - 1) >> level) + 1):
+                [low, high] = sorted([mins[bucket], maxs[bucket]])
+                positions.append(low)
+                if high != low:
+                    positions.append(high)
+        return [(self.ts[position], self.ys[position]) for position in positions]